@@ -0,0 +1,238 @@
+import os
+import numpy as np
+from datetime import datetime, timezone
+
+# --- Local columnar bar archive ---
+# Closed bars are stored per symbol/timeframe, partitioned by month, one raw
+# little-endian file per column:
+#
+#   <root>/<SYMBOL>/<TF>/<YYYY-MM>/time.bin, open.bin, high.bin, ...
+#
+# Files are append-only and read back with np.memmap, so loading years of
+# history touches only the pages actually sliced. `sync` tops the archive up
+# from the terminal with as few bars as possible, so the bots (and backtests,
+# via `load_rates`, with no terminal at all) read history locally. When more
+# history is asked for than the archive holds (e.g. after a lookback grew),
+# `backfill` adds the older bars in front, rewriting only the oldest month.
+
+COLUMNS = {
+    'time': np.dtype('<i8'), 'open': np.dtype('<f8'), 'high': np.dtype('<f8'), 'low': np.dtype('<f8'),
+    'close': np.dtype('<f8'), 'tick_volume': np.dtype('<u8'), 'spread': np.dtype('<i4'), 'real_volume': np.dtype('<u8'),
+}
+RATES_DTYPE = np.dtype(list(COLUMNS.items()))  # Same layout as mt5.copy_rates_*
+
+TIMEFRAME_NAMES = {1: "M1", 5: "M5", 15: "M15", 30: "M30", 16385: "H1", 16388: "H4", 16408: "D1",
+                   32769: "W1", 49153: "MN1"}
+TIMEFRAME_SECONDS = {1: 60, 5: 300, 15: 900, 30: 1800, 16385: 3600, 16388: 14400, 16408: 86400,
+                     32769: 604800, 49153: 2592000}
+
+FIRST_FETCH = 16  # Bars requested on a top-up; doubled until the gap to the archive is covered
+MAX_FETCH = 100000
+
+_closed_months = {}  # month dir -> {column: memmap}; months before the newest are immutable
+
+def _series_dir(root, symbol, timeframe):
+    return os.path.join(root, symbol, TIMEFRAME_NAMES.get(timeframe, str(timeframe)))
+
+def _month_of(epoch):
+    return datetime.fromtimestamp(int(epoch), timezone.utc).strftime("%Y-%m")
+
+def _months(root, symbol, timeframe):
+    path = _series_dir(root, symbol, timeframe)
+    if not os.path.isdir(path):
+        return []
+    return sorted(m for m in os.listdir(path) if len(m) == 7 and m[4] == "-")
+
+def _open_month(month_dir, immutable):
+    """Memory-maps the column files of one month partition."""
+    if immutable and month_dir in _closed_months:
+        return _closed_months[month_dir]
+    sizes = {}
+    for name, dtype in COLUMNS.items():
+        file = os.path.join(month_dir, name + ".bin")
+        sizes[name] = os.path.getsize(file) // dtype.itemsize if os.path.exists(file) else 0
+    rows = min(sizes.values())  # A crash mid-append can leave columns at different lengths
+    columns = {}
+    for name, dtype in COLUMNS.items():
+        if rows:
+            columns[name] = np.memmap(os.path.join(month_dir, name + ".bin"), dtype=dtype, mode="r", shape=(rows,))
+        else:
+            columns[name] = np.empty(0, dtype=dtype)
+    if immutable:
+        _closed_months[month_dir] = columns
+    return columns
+
+def first_time(root, symbol, timeframe):
+    """Open time of the oldest archived bar, or None if the archive is empty."""
+    directory = _series_dir(root, symbol, timeframe)
+    for month in _months(root, symbol, timeframe):
+        times = _open_month(os.path.join(directory, month), False)['time']
+        if len(times):
+            return int(times[0])
+    return None
+
+def last_time(root, symbol, timeframe):
+    """Open time of the newest archived bar, or None if the archive is empty."""
+    months = _months(root, symbol, timeframe)
+    for month in reversed(months):
+        times = _open_month(os.path.join(_series_dir(root, symbol, timeframe), month), False)['time']
+        if len(times):
+            return int(times[-1])
+    return None
+
+def load(root, symbol, timeframe, start=None, end=None):
+    """
+    Returns {column: array} for archived bars with start <= time <= end (epoch seconds).
+    A range inside one month is a zero-copy view of the memory map.
+    """
+    months = _months(root, symbol, timeframe)
+    if start is not None:
+        months = [m for m in months if m >= _month_of(start)]
+    if end is not None:
+        months = [m for m in months if m <= _month_of(end)]
+    newest = _months(root, symbol, timeframe)[-1:]
+    parts = []
+    for month in months:
+        columns = _open_month(os.path.join(_series_dir(root, symbol, timeframe), month), month not in newest)
+        times = columns['time']
+        lo = np.searchsorted(times, start, 'left') if start is not None else 0
+        hi = np.searchsorted(times, end, 'right') if end is not None else len(times)
+        if hi > lo:
+            parts.append({name: col[lo:hi] for name, col in columns.items()})
+    if not parts:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+    if len(parts) == 1:
+        return parts[0]
+    return {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+
+def load_rates(root, symbol, timeframe, start=None, end=None):
+    """Like `load`, packed into the structured array layout of mt5.copy_rates_*."""
+    columns = load(root, symbol, timeframe, start, end)
+    rates = np.empty(len(columns['time']), dtype=RATES_DTYPE)
+    for name in COLUMNS:
+        rates[name] = columns[name]
+    return rates
+
+def _split_months(rates):
+    """(month, rates of that month) pairs of ascending rates."""
+    months = np.array([_month_of(t) for t in rates['time'][[0, -1]]])
+    if months[0] == months[1]:
+        return [(months[0], rates)]
+    keys = np.array([_month_of(t) for t in rates['time']])
+    return [(m, rates[keys == m]) for m in sorted(set(keys))]
+
+def append(root, symbol, timeframe, rates):
+    """Appends closed bars (structured array, ascending time, newer than the archive) to their months."""
+    if rates is None or len(rates) == 0:
+        return 0
+    splits = _split_months(rates)
+    for month, chunk in splits:
+        month_dir = os.path.join(_series_dir(root, symbol, timeframe), month)
+        os.makedirs(month_dir, exist_ok=True)
+        for name, dtype in COLUMNS.items():
+            with open(os.path.join(month_dir, name + ".bin"), "ab") as f:
+                f.write(np.ascontiguousarray(chunk[name], dtype=dtype).tobytes())
+    # A month that just gained data can no longer be served from the immutable cache
+    _closed_months.pop(os.path.join(_series_dir(root, symbol, timeframe), splits[0][0]), None)
+    return len(rates)
+
+def prepend(root, symbol, timeframe, rates):
+    """Adds closed bars (structured array, ascending time, older than the archive) in front of their months."""
+    if rates is None or len(rates) == 0:
+        return 0
+    for month, chunk in _split_months(rates):
+        month_dir = os.path.join(_series_dir(root, symbol, timeframe), month)
+        os.makedirs(month_dir, exist_ok=True)
+        _closed_months.pop(month_dir, None)  # Drop the cached maps before their files are replaced
+        for name, dtype in COLUMNS.items():
+            file = os.path.join(month_dir, name + ".bin")
+            held = np.fromfile(file, dtype=dtype) if os.path.exists(file) else np.empty(0, dtype=dtype)
+            with open(file + ".tmp", "wb") as f:
+                f.write(np.ascontiguousarray(chunk[name], dtype=dtype).tobytes())
+                f.write(held.tobytes())
+            os.replace(file + ".tmp", file)
+    return len(rates)
+
+def backfill(mt5, root, symbol, timeframe, count):
+    """
+    Archives up to `count` bars older than the oldest archived one, fetched with copy_rates_from.
+    Returns the number added (0 if the terminal has none older), or None on a terminal error.
+    """
+    first = first_time(root, symbol, timeframe)
+    if first is None:
+        return 0
+    rates = mt5.copy_rates_from(symbol, timeframe, first - 1, count)
+    if rates is None:
+        return None
+    return prepend(root, symbol, timeframe, rates[rates['time'] < first])
+
+def fetch_newer(mt5, symbol, timeframe, after, first=FIRST_FETCH):
+    """
+    Rates with time > `after` (the last bar being the forming one), fetched with
+    copy_rates_from_pos in doubling batches until the batch reaches back to `after`.
+    `after=None` fetches the last `first` bars. Returns None on a terminal error.
+    """
+    count = first
+    while True:
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+        if rates is None:
+            return None
+        # Stop once the fetch overlaps `after` (or the terminal has nothing older)
+        if after is None or len(rates) < count or rates['time'][0] <= after or count >= MAX_FETCH:
+            break
+        count = min(count * 2, MAX_FETCH)
+    if after is not None:
+        rates = rates[rates['time'] > after]
+    return rates
+
+def sync(mt5, root, symbol, timeframe, seed_bars):
+    """
+    Archives every closed bar the terminal has that the archive lacks and returns the
+    still-forming bar (structured array of length 0 or 1), or None on a terminal error.
+    An empty archive is seeded with the last `seed_bars` bars.
+    """
+    newest = last_time(root, symbol, timeframe)
+    rates = fetch_newer(mt5, symbol, timeframe, newest, seed_bars + 1 if newest is None else FIRST_FETCH)
+    if rates is None:
+        return None
+    append(root, symbol, timeframe, rates[:-1])
+    return rates[-1:]
+
+def load_tail(root, symbol, timeframe, count):
+    """Returns {column: array} for the newest `count` archived bars."""
+    directory = _series_dir(root, symbol, timeframe)
+    months = _months(root, symbol, timeframe)
+    parts, have = [], 0
+    for month in reversed(months):
+        columns = _open_month(os.path.join(directory, month), month != months[-1])
+        take = min(count - have, len(columns['time']))
+        if take > 0:
+            parts.append({name: col[len(col) - take:] for name, col in columns.items()})
+            have += take
+        if have >= count:
+            break
+    if not parts:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+    if len(parts) == 1:
+        return parts[0]
+    return {name: np.concatenate([p[name] for p in reversed(parts)]) for name in COLUMNS}
+
+def get_bars(mt5, root, symbol, timeframe, count):
+    """
+    Tops up the archive, then returns {column: array} for the last `count` bars, the forming one included.
+    History the archive lacks is backfilled first; if the terminal fails there, it answers for all the bars.
+    """
+    forming = sync(mt5, root, symbol, timeframe, count)
+    if forming is None:
+        return None
+    archived = load_tail(root, symbol, timeframe, count - len(forming))
+    missing = count - len(forming) - len(archived['time'])
+    if missing > 0:
+        added = backfill(mt5, root, symbol, timeframe, missing)
+        if added is None:
+            return mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+        if added:
+            archived = load_tail(root, symbol, timeframe, count - len(forming))
+    if len(forming) == 0:
+        return archived
+    return {name: np.concatenate([archived[name], forming[name].astype(dtype)]) for name, dtype in COLUMNS.items()}
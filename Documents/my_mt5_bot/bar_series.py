@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# --- Array-backed bar container ---
+# The numeric core works on plain NumPy columns: int64 epoch seconds for `time`
+# and float64 for everything else. MT5's structured rates are converted once
+# when they arrive; indicators index the columns directly, and pandas is only
+# involved when a frame is wanted for reporting (`to_frame`). Live loops keep
+# their window in a BarRing, whose views are Bars without copying.
+
+COLUMNS = ('time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume')
+
+class Bars:
+    """Parallel columns of a bar series, oldest first (the last bar may still be forming)."""
+    __slots__ = COLUMNS
+
+    def __init__(self, time, open, high, low, close, tick_volume, spread, real_volume):
+        self.time = np.asarray(time, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.tick_volume = np.asarray(tick_volume, dtype=np.float64)
+        self.spread = np.asarray(spread, dtype=np.float64)
+        self.real_volume = np.asarray(real_volume, dtype=np.float64)
+
+    @classmethod
+    def from_rates(cls, rates):
+        """From a copy_rates_* structured array (or any {column: array} mapping)."""
+        return cls(*(rates[name] for name in COLUMNS))
+
+    columns = COLUMNS
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def tail(self, count):
+        """The last `count` bars, as views."""
+        start = max(0, len(self.time) - count)
+        return Bars(*(getattr(self, name)[start:] for name in COLUMNS))
+
+    def to_frame(self):
+        """pandas DataFrame indexed by bar time, for reporting."""
+        frame = pd.DataFrame({name: getattr(self, name) for name in COLUMNS[1:]})
+        frame.index = pd.to_datetime(self.time, unit='s')
+        frame.index.name = 'time'
+        return frame
+
+class BarRing:
+    """
+    Fixed-capacity bar buffer for a live symbol/timeframe. Storage is preallocated once;
+    a new bar overwrites the oldest slot and a forming bar is updated in place. Every slot
+    is written twice (at i and i + capacity), so the last N bars are always one contiguous
+    run and `view` returns them without copying.
+    """
+    __slots__ = ("capacity", "count", "buffers")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.count = 0  # bars ever written; the newest is at slot (count - 1) % capacity
+        self.buffers = {name: np.zeros(2 * capacity, dtype=np.int64 if name == 'time' else np.float64)
+                        for name in COLUMNS}
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def extend(self, rates):
+        """
+        Writes bars (oldest first, any {column: array} mapping): a bar with the same time as
+        the newest one replaces it (the forming bar), newer bars are appended, older ones ignored.
+        """
+        times = np.asarray(rates['time'])
+        start = 0
+        if self.count:
+            last = self.buffers['time'][(self.count - 1) % self.capacity]
+            start = int(np.searchsorted(times, last, 'left'))
+            if start < len(times) and times[start] == last:
+                self.count -= 1  # Rewrite the forming bar in place
+        n = len(times) - start
+        if n <= 0:
+            return
+        if n > self.capacity:  # Only the newest `capacity` bars can be kept
+            self.count += n - self.capacity
+            start, n = len(times) - self.capacity, self.capacity
+        cap = self.capacity
+        pos = self.count % cap
+        first = min(n, cap - pos)
+        for name, buffer in self.buffers.items():
+            values = rates[name][start:start + n]
+            buffer[pos:pos + first] = values[:first]
+            buffer[pos + cap:pos + cap + first] = values[:first]
+            if first < n:
+                buffer[:n - first] = values[first:]
+                buffer[cap:cap + n - first] = values[first:]
+        self.count += n
+
+    def view(self, count=None):
+        """The last `count` bars (default: all held) as Bars of views into the buffer."""
+        held = len(self)
+        count = held if count is None else min(count, held)
+        end = (self.count - 1) % self.capacity + self.capacity + 1 if self.count else self.capacity
+        return Bars(*(self.buffers[name][end - count:end] for name in COLUMNS))
@@ -0,0 +1,145 @@
+import argparse
+import contextlib
+import importlib
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+import sim_mt5
+import bar_archive
+import bot_metrics
+from bot_logging import setup_logging, stop_logging
+from trade_journal import TradeJournal
+
+# --- End-to-end replay benchmark ---
+# Replays recorded (or synthetic) bars for N symbols through the SNR bot's full
+# decision loop (`run_cycle`) against the simulated terminal and reports
+# throughput, per-cycle latency distribution and peak memory.
+#
+# Recorded data: a directory of `<SYMBOL>.npy` files saved from mt5.copy_rates_*,
+# e.g. np.save("XAUUSDm.npy", mt5.copy_rates_from_pos("XAUUSDm", mt5.TIMEFRAME_M15, 0, 5000)),
+# or a bar archive directory (see bar_archive.py), replayed with no terminal involved.
+#
+# Usage: python bench_replay.py --symbols 20 --timeframe M15 --cycles 200 [--data DIR] [--memory]
+
+TIMEFRAMES = {"M1": 1, "M5": 5, "M15": 15, "M30": 30, "H1": 16385, "H4": 16388, "D1": 16408}
+
+def load_recordings(data_dir, timeframe, count, bars):
+    """Returns `count` (symbol, rates) pairs from recorded .npy files or an archive, or synthetic walks if none."""
+    recordings = []
+    if data_dir:
+        for name in sorted(os.listdir(data_dir)):
+            if name.endswith(".npy"):
+                recordings.append((name[:-4], np.load(os.path.join(data_dir, name))))
+            elif os.path.isdir(os.path.join(data_dir, name)):
+                rates = bar_archive.load_rates(data_dir, name, timeframe)
+                if len(rates):
+                    recordings.append((name, rates))
+    timeframe_seconds = sim_mt5.TIMEFRAME_SECONDS[timeframe]
+    if not recordings:
+        return [(f"SIM{i:03d}", sim_mt5.synthetic_rates(bars, timeframe_seconds, seed=i)) for i in range(count)]
+    # Reuse recordings under suffixed names when asked for more symbols than were recorded
+    return [(f"{recordings[i % len(recordings)][0]}_{i}", recordings[i % len(recordings)][1]) for i in range(count)]
+
+def run_benchmark(symbols, timeframe, cycles, history, data_dir=None, bot_module="my_snr_bot", trace_memory=False,
+                  log_level="INFO", log_file=os.devnull, journal_path=None, archive_dir=None):
+    """Replays `cycles` bars for `symbols` symbols through the bot and returns the collected stats."""
+    terminal = sim_mt5.install(sim_mt5.SimTerminal())
+    bot = importlib.import_module(bot_module)
+    bot.mt5 = bot_metrics.instrument(terminal)
+    bot.TIMEFRAME = timeframe
+    bot.ORDER_PAUSE_SECONDS = 0
+    # Log through the same background writer the live bot uses, without console output
+    setup_logging(bot.log.name, log_file, log_level, console=False)
+    bot.journal = TradeJournal(journal_path) if journal_path else None
+    # The live bots read history through the bar archive; give the replay its own
+    bot.ARCHIVE_DIR = archive_dir or tempfile.mkdtemp(prefix="bench_archive_")
+
+    for name, rates in load_recordings(data_dir, timeframe, symbols, history + cycles):
+        terminal.add_symbol(name, timeframe, rates, start=min(history, len(rates) - 1))
+    names = list(terminal.specs)
+    infos = {name: terminal.symbol_info(name) for name in names}
+
+    latencies = []
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        for _ in range(cycles):
+            for name in names:
+                t0 = time.perf_counter()
+                with bot_metrics.timed(symbol=name):
+                    bot.run_cycle(name, infos[name])
+                latencies.append(time.perf_counter() - t0)
+            if not terminal.advance():
+                break
+    elapsed = time.perf_counter() - started
+    stop_logging(bot.log.name)
+    if bot.journal:
+        bot.journal.close()
+    if not archive_dir:
+        shutil.rmtree(bot.ARCHIVE_DIR, ignore_errors=True)
+    peak_bytes = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+
+    latencies = np.array(latencies) * 1000.0
+    return {
+        "symbols": len(names),
+        "cycles": len(latencies),
+        "elapsed_s": elapsed,
+        "cycles_per_s": len(latencies) / elapsed if elapsed > 0 else float("inf"),
+        "latency_ms": {p: float(np.percentile(latencies, p)) for p in (50, 90, 99)},
+        "latency_max_ms": float(latencies.max()),
+        "terminal_calls": terminal.calls,
+        "peak_bytes": peak_bytes if peak_bytes is not None else peak_rss_bytes(),
+        "closed_balance": terminal.balance,
+    }
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, where the platform exposes it."""
+    try:
+        import resource
+    except ImportError:  # Windows: use --memory for a tracemalloc measurement instead
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+def print_report(stats, timeframe_name):
+    """Prints the benchmark summary."""
+    lat = stats["latency_ms"]
+    print(f"--- Replay benchmark ({timeframe_name}, {stats['symbols']} symbols) ---")
+    print(f"Symbol-cycles: {stats['cycles']} in {stats['elapsed_s']:.2f}s -> {stats['cycles_per_s']:.1f} cycles/s")
+    print(f"Latency ms: p50={lat[50]:.2f} p90={lat[90]:.2f} p99={lat[99]:.2f} max={stats['latency_max_ms']:.2f}")
+    print(f"Terminal calls: {stats['terminal_calls']} ({stats['terminal_calls'] / max(stats['cycles'], 1):.1f} per cycle)")
+    if stats["peak_bytes"] is not None:
+        print(f"Peak memory: {stats['peak_bytes'] / 2**20:.1f} MiB")
+    # One live process has one bar interval to run every symbol's cycle once
+    interval = sim_mt5.TIMEFRAME_SECONDS[TIMEFRAMES[timeframe_name]]
+    print(f"Estimated symbols per process at {timeframe_name}: {int(interval * stats['cycles_per_s'])} "
+          f"(p99-bound: {int(interval * 1000 / lat[99]) if lat[99] > 0 else 'inf'})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay bars through the live decision loop and time it.")
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--timeframe", choices=sorted(TIMEFRAMES), default="M15")
+    parser.add_argument("--cycles", type=int, default=100, help="Bars to replay per symbol")
+    parser.add_argument("--history", type=int, default=3000, help="Bars visible before the first cycle")
+    parser.add_argument("--data", help="Directory of <SYMBOL>.npy recorded rates, or a bar archive")
+    parser.add_argument("--bot", default="my_snr_bot", help="Bot module exposing run_cycle(symbol, symbol_info)")
+    parser.add_argument("--log-level", default="INFO", help="Bot log level during the replay (DEBUG adds the per-cycle dump)")
+    parser.add_argument("--log-file", default=os.devnull)
+    parser.add_argument("--journal", help="SQLite trade journal path to record the replay into")
+    parser.add_argument("--archive", help="Bar archive the bot reads through (default: a fresh temporary one)")
+    parser.add_argument("--memory", action="store_true", help="Measure peak Python heap with tracemalloc (slower)")
+    args = parser.parse_args()
+
+    stats = run_benchmark(args.symbols, TIMEFRAMES[args.timeframe], args.cycles, args.history,
+                          args.data, args.bot, args.memory, args.log_level, args.log_file, args.journal, args.archive)
+    print_report(stats, args.timeframe)
+
+if __name__ == "__main__":
+    main()
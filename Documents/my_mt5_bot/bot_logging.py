@@ -0,0 +1,102 @@
+import atexit
+import copy
+import logging
+import logging.handlers
+import queue
+import sys
+
+# --- Non-blocking logging for the trading loop ---
+# Records are put on an in-memory queue by the trading thread and written by a
+# background QueueListener to a rotating file (and optionally the console).
+# Messages use logging's %-style arguments, and the queue handler below does NOT
+# format them on the trading thread: `record.getMessage()` only runs in the
+# writer thread, so `log.debug("Fibs: %s", LazyLevels(fibs))` costs next to nothing
+# when DEBUG is off and no string work on the hot path when it is on.
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread."""
+
+    def prepare(self, record):
+        # The stock handler formats msg % args here (on the caller's thread). Only
+        # render the traceback now, since frames can change once the caller moves on.
+        if record.exc_info:
+            record = copy.copy(record)
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class KeyValueFormatter(logging.Formatter):
+    """Appends structured fields passed as `extra={"fields": {...}}` as key=value pairs."""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " | " + " ".join(f"{k}={_format_value(v)}" for k, v in fields.items())
+        return line
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:.5f}"
+    return str(value)
+
+class LazyLevels:
+    """Lazily renders a {name: price} dict; formatted only if the record is written."""
+    __slots__ = ("values",)
+
+    def __init__(self, values):
+        self.values = values
+
+    def __str__(self):
+        if not self.values or all(v != v for v in self.values.values()):  # empty or all NaN
+            return "N/A"
+        return str({k: f"{v:.5f}" for k, v in self.values.items()})
+
+class LazyPrices:
+    """Lazily renders a list of prices."""
+    __slots__ = ("values",)
+
+    def __init__(self, values):
+        self.values = values
+
+    def __str__(self):
+        return str([f"{p:.5f}" for p in self.values])
+
+_listeners = {}
+
+def setup_logging(name, log_file, level="INFO", console=True, max_bytes=5 * 2**20, backups=5):
+    """
+    Configures logger `name` to write through a queue to a rotating file (and stdout).
+    Safe to call more than once; the background writer is started only the first time.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    if name in _listeners:
+        return logger
+
+    formatter = KeyValueFormatter(LOG_FORMAT)
+    handlers = [logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backups,
+                                                     encoding="utf-8")]
+    if console:
+        handlers.append(logging.StreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    logger.propagate = False
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[name] = listener
+    atexit.register(stop_logging, name)
+    return logger
+
+def stop_logging(name):
+    """Drains the queue and stops the background writer for logger `name`."""
+    listener = _listeners.pop(name, None)
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
@@ -0,0 +1,166 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Local Prometheus-text metrics for the bots ---
+# The trading thread is the only writer: it bumps plain ints/floats in dicts,
+# which is atomic enough under the GIL, so it never takes a lock. The HTTP
+# scrape thread takes a shallow copy of each dict and formats from that, so a
+# scrape never blocks (or is blocked by) a trading cycle.
+#
+# Exposed on http://127.0.0.1:<port>/metrics, one port per bot: scrape_configs targets
+# "localhost:9100", "localhost:9101", "localhost:9102" for the XAU/BTC/EUR bots.
+
+PREFIX = "mt5bot_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metrics:
+    """Counters, gauges and a latency histogram keyed by (name, label pairs)."""
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}  # key -> [bucket counts..., +Inf count, sum]
+        self.help = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        slots = self.histograms.get(key)
+        if slots is None:
+            slots = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                slots[i] += 1
+                break
+        else:
+            slots[len(LATENCY_BUCKETS)] += 1
+        slots[-1] += seconds
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def render(self):
+        """Formats all metrics in the Prometheus text exposition format."""
+        lines = []
+        for kind, values in (("counter", dict(self.counters)), ("gauge", dict(self.gauges))):
+            for name in sorted({k[0] for k in values}):
+                self._header(lines, name, kind)
+                for (metric, labels), value in values.items():
+                    if metric == name:
+                        lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+        histograms = {k: list(v) for k, v in dict(self.histograms).items()}
+        for name in sorted({k[0] for k in histograms}):
+            self._header(lines, name, "histogram")
+            for (metric, labels), slots in histograms.items():
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), slots[:-1]):
+                    cumulative += count
+                    lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {slots[-1]}")
+                lines.append(f"{PREFIX}{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines, name, kind):
+        if name in self.help:
+            lines.append(f"# HELP {PREFIX}{name} {self.help[name]}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+METRICS = Metrics()
+METRICS.describe("cycles_total", "Decision loop passes completed.")
+METRICS.describe("cycle_seconds", "Wall time of one decision loop pass.")
+METRICS.describe("mt5_calls_total", "MetaTrader5 API calls by function.")
+METRICS.describe("mt5_errors_total", "MetaTrader5 API calls that returned None, by function.")
+METRICS.describe("orders_sent_total", "Orders accepted by the terminal, by retcode.")
+METRICS.describe("orders_failed_total", "Orders rejected by the terminal, by retcode.")
+METRICS.describe("open_positions", "Open positions for the symbol.")
+METRICS.describe("equity", "Account equity.")
+METRICS.describe("journal_dropped_rows", "Trade journal rows dropped after repeated failed writes.")
+METRICS.describe("level_triggers_total", "Prices entering or leaving an S/R zone band between passes, by kind.")
+METRICS.describe("pending_requests_total", "Resting order place/modify/remove requests sent, by action and retcode.")
+
+class InstrumentedMT5:
+    """Wraps the MetaTrader5 module so every API call is counted (errors = None results)."""
+
+    def __init__(self, module, metrics=METRICS):
+        self._module = module
+        self._metrics = metrics
+        self._wrapped = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._module, name)
+        if not callable(attr):
+            return attr  # Constants such as TIMEFRAME_M15 pass straight through
+        wrapper = self._wrapped.get(name)
+        if wrapper is None:
+            metrics = self._metrics
+            def wrapper(*args, **kwargs):
+                metrics.inc("mt5_calls_total", function=name)
+                result = attr(*args, **kwargs)
+                if result is None:
+                    metrics.inc("mt5_errors_total", function=name)
+                return result
+            self._wrapped[name] = wrapper
+        return wrapper
+
+def instrument(module, metrics=METRICS):
+    """Returns `module` wrapped so its calls are counted in `metrics`."""
+    return InstrumentedMT5(module, metrics)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics = METRICS
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes out of the bot's output
+
+def start_metrics_server(port, host="127.0.0.1", metrics=METRICS):
+    """Serves `metrics` on a daemon thread. Returns the server, or None if the port is unavailable."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"metrics": metrics})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+class timed:
+    """Context manager recording a cycle: bumps `cycles_total` and observes `cycle_seconds`."""
+    __slots__ = ("labels", "metrics", "started")
+
+    def __init__(self, metrics=METRICS, **labels):
+        self.labels = labels
+        self.metrics = metrics
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe("cycle_seconds", time.perf_counter() - self.started, **self.labels)
+        self.metrics.inc("cycles_total", **self.labels)
+        return False
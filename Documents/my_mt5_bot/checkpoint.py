@@ -0,0 +1,39 @@
+import os
+import pickle
+import tempfile
+
+# --- Warm-restart checkpoints ---
+# A bot's engine state (cached bars, streaming indicator state, pivots, tracked
+# positions...) is pickled to one file at shutdown and every few minutes, and
+# restored at startup so the first pass only syncs bars that closed while the
+# bot was down. Writes go to a temporary file that replaces the checkpoint
+# atomically, so a crash mid-write leaves the previous checkpoint intact.
+#
+# `fingerprint` should capture every setting the state depends on (periods,
+# timeframe...): a checkpoint written with different settings is ignored.
+
+FORMAT_VERSION = 1
+
+def save_state(path, state, fingerprint):
+    """Atomically writes `state` (any picklable object) to `path`."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump({"version": FORMAT_VERSION, "fingerprint": fingerprint, "state": state}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def load_state(path, fingerprint):
+    """Returns the state saved at `path`, or None if missing, unreadable or written with other settings."""
+    try:
+        with open(path, "rb") as f:
+            saved = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    if not isinstance(saved, dict) or saved.get("version") != FORMAT_VERSION or saved.get("fingerprint") != fingerprint:
+        return None
+    return saved["state"]
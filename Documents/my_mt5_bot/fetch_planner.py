@@ -0,0 +1,45 @@
+import math
+from collections import namedtuple
+
+# --- Lookback-driven fetch planning ---
+# Each indicator declares how many bars it reads (`bars`) and how many extra bars
+# it needs before its output stops depending on where the history starts
+# (`warmup`, e.g. an EMA seeded from the first close). The planner turns those
+# declarations into the exact number of bars to request per symbol/timeframe,
+# instead of a fixed number of calendar days.
+
+Lookback = namedtuple("Lookback", "bars warmup")
+
+EMA_TOLERANCE = 1e-4  # Residual weight of the seed value we accept after warm-up
+PLAN_BUFFER = 2  # Spare bars for a bar closing between the fetch and the calculation
+
+def smoothing_warmup(alpha, tolerance=EMA_TOLERANCE):
+    """Bars until an exponential smoother's seed weight (1 - alpha)^n falls below `tolerance`."""
+    if alpha >= 1:
+        return 0
+    return int(math.ceil(math.log(tolerance) / math.log(1 - alpha)))
+
+def ema_lookback(period, tolerance=EMA_TOLERANCE):
+    """EMA with span `period` (alpha = 2 / (period + 1))."""
+    return Lookback(period, smoothing_warmup(2.0 / (period + 1), tolerance))
+
+def wilder_lookback(period, tolerance=EMA_TOLERANCE):
+    """Wilder smoothing (ATR, RSI) with alpha = 1 / period, seeded by a `period`-bar mean."""
+    return Lookback(period, smoothing_warmup(1.0 / period, tolerance))
+
+def window_lookback(bars):
+    """Plain rolling window (swing high/low, volume profile): no warm-up."""
+    return Lookback(bars, 0)
+
+def on_timeframe(lookback, factor):
+    """A lookback declared in bars of a higher timeframe, in base bars (`factor` base bars per higher bar)."""
+    return Lookback(lookback.bars * factor, lookback.warmup * factor)
+
+def sessions_lookback(days, timeframe_seconds):
+    """Enough bars to hold `days` full trading days (e.g. 2 for the previous day's pivots)."""
+    return Lookback(days * max(1, int(math.ceil(86400 / timeframe_seconds))), 0)
+
+def plan_bars(lookbacks, buffer=PLAN_BUFFER):
+    """Bars to fetch so every declared lookback is covered, plus the forming bar."""
+    needed = max((lb.bars + lb.warmup for lb in lookbacks.values()), default=0)
+    return needed + 1 + buffer
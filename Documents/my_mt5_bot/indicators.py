@@ -0,0 +1,75 @@
+import math
+
+# --- Streaming indicator state ---
+# Incremental versions of the 'ta' indicators the bots use, fed one closed bar
+# at a time so a pass only processes bars that closed since the previous one.
+# `peek` evaluates the still-forming bar without committing it. The state is
+# small and picklable, so it can be checkpointed and restored (see checkpoint.py).
+# Values match ta.trend.EMAIndicator / ta.volatility.AverageTrueRange once
+# they have seen the same bars.
+
+class EMAState:
+    """EMA with ta's definition: ewm(span=period, adjust=False), NaN until `period` values."""
+    __slots__ = ("period", "alpha", "value", "count")
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.value = math.nan
+        self.count = 0
+
+    def update(self, close):
+        """Commits a closed bar's close; returns the EMA (NaN during warm-up)."""
+        self.value = close if self.count == 0 else self.value + self.alpha * (close - self.value)
+        self.count += 1
+        return self.value if self.count >= self.period else math.nan
+
+    def peek(self, close):
+        """EMA including a forming bar's close, without changing the state."""
+        if self.count + 1 < self.period:
+            return math.nan
+        return close if self.count == 0 else self.value + self.alpha * (close - self.value)
+
+    @property
+    def current(self):
+        return self.value if self.count >= self.period else math.nan
+
+class ATRState:
+    """Wilder ATR as computed by ta: mean of the first `period` true ranges, then smoothed."""
+    __slots__ = ("period", "value", "prev_close", "count", "tr_sum")
+
+    def __init__(self, period):
+        self.period = period
+        self.value = math.nan
+        self.prev_close = math.nan
+        self.count = 0
+        self.tr_sum = 0.0
+
+    def _true_range(self, high, low):
+        if self.count == 0:
+            return high - low
+        return max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+    def _next(self, tr):
+        if self.count + 1 < self.period:
+            return math.nan
+        if self.count + 1 == self.period:
+            return (self.tr_sum + tr) / self.period
+        return (self.value * (self.period - 1) + tr) / self.period
+
+    def update(self, high, low, close):
+        """Commits a closed bar; returns the ATR (NaN during warm-up)."""
+        tr = self._true_range(high, low)
+        self.value = self._next(tr)
+        self.tr_sum += tr
+        self.count += 1
+        self.prev_close = close
+        return self.value
+
+    def peek(self, high, low, close):
+        """ATR including a forming bar, without changing the state."""
+        return self._next(self._true_range(high, low))
+
+    @property
+    def current(self):
+        return self.value
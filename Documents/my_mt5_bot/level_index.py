@@ -0,0 +1,146 @@
+from collections import namedtuple
+import numpy as np
+
+# --- Sorted support/resistance level index ---
+# All candidate levels of a pass (fibs, pivots, EMAs, volume nodes...) in one
+# price-sorted array, with parallel arrays for where each level came from, the
+# side it may act on and its weight. Nearest support/resistance and "levels
+# within a tolerance" are binary searches instead of scans over Python lists,
+# which matters once the volume profile contributes hundreds of nodes.
+#
+# Levels that sit within a fraction of ATR of each other are one area of
+# interest, not several: `zones` sweeps the sorted levels into clusters and
+# scores each by its members' weights and how many kinds of source agree.
+# Volume nodes come in with their source weight scaled by the node's volume
+# (see volume_profile.weighted_hvns), so a heavy HVN outscores a thin one.
+
+SUPPORT = 1     # Level only acts as support (e.g. pivot S1)
+RESISTANCE = 2  # ...only as resistance (pivot R1)
+EITHER = SUPPORT | RESISTANCE  # Support below price, resistance above
+
+# Default weight per source, for scoring
+SOURCE_WEIGHTS = {'pivot': 1.0, 'fib': 1.0, 'fib_ext': 0.75, 'ema': 0.5, 'hvn': 1.0,
+                  'htf_ema': 0.75, 'htf_fib': 1.0, 'weekly_pivot': 1.5, 'weekly_vp': 1.0,
+                  'session_vp': 1.0, 'composite_hvn': 1.0, 'vwap': 1.0, 'avwap': 0.75}
+SOURCE_DIVERSITY_BONUS = 0.5  # Added to a zone's strength per extra kind of source in it
+
+# low/high: outermost member levels; price: weight-averaged centre; start/stop: member range in the LevelIndex
+Zone = namedtuple("Zone", "low high price strength sources role start stop")
+
+class LevelIndex:
+    """Price-sorted levels with source/name tags, roles and weights."""
+    __slots__ = ("prices", "sources", "names", "roles", "weights")
+
+    def __init__(self, levels):
+        """`levels`: iterable of (price, source, name, role, weight); NaN prices are dropped."""
+        levels = sorted((level for level in levels if level[0] == level[0]), key=lambda level: level[0])
+        self.prices = np.array([level[0] for level in levels], dtype=float)
+        self.sources = [level[1] for level in levels]
+        self.names = [level[2] for level in levels]
+        self.roles = [level[3] for level in levels]
+        self.weights = np.array([level[4] for level in levels], dtype=float)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def nearest_below(self, price, role=SUPPORT):
+        """Highest level strictly below `price` that can act as `role`, or -inf."""
+        i = int(np.searchsorted(self.prices, price, 'left')) - 1
+        while i >= 0 and not self.roles[i] & role:
+            i -= 1
+        return float(self.prices[i]) if i >= 0 else -np.inf
+
+    def nearest_above(self, price, role=RESISTANCE):
+        """Lowest level strictly above `price` that can act as `role`, or inf."""
+        i = int(np.searchsorted(self.prices, price, 'right'))
+        while i < len(self.prices) and not self.roles[i] & role:
+            i += 1
+        return float(self.prices[i]) if i < len(self.prices) else np.inf
+
+    def within(self, price, tolerance):
+        """Index range of the levels with |level - price| < tolerance (empty for a NaN tolerance)."""
+        if not tolerance > 0:
+            return range(0)
+        lo = int(np.searchsorted(self.prices, price - tolerance, 'right'))
+        hi = int(np.searchsorted(self.prices, price + tolerance, 'left'))
+        return range(lo, hi)
+
+    def near(self, price, tolerance, tags):
+        """
+        True if a level within `tolerance` of `price` matches `tags`: a set of (source, name)
+        pairs, where a name of None matches every level from that source.
+        """
+        for i in self.within(price, tolerance):
+            if (self.sources[i], None) in tags or (self.sources[i], self.names[i]) in tags:
+                return True
+        return False
+
+    def zones(self, tolerance, min_strength=0.0):
+        """
+        Sweeps the sorted levels into zones no wider than `tolerance` (an O(n) pass, since the
+        levels are already sorted) and keeps those scoring at least `min_strength`.
+        """
+        zones = []
+        prices, n = self.prices, len(self.prices)
+        start = 0
+        while start < n:
+            stop = start + 1
+            while stop < n and prices[stop] - prices[start] <= tolerance:
+                stop += 1
+            zone = self._zone(start, stop)
+            if zone.strength >= min_strength:
+                zones.append(zone)
+            start = stop
+        return ZoneIndex(self, zones)
+
+    def _zone(self, start, stop):
+        weights = self.weights[start:stop]
+        sources = frozenset(self.sources[start:stop])
+        role = 0
+        for r in self.roles[start:stop]:
+            role |= r
+        price = float(np.average(self.prices[start:stop], weights=weights)) if weights.sum() > 0 else \
+                float(self.prices[start:stop].mean())
+        strength = float(weights.sum()) + SOURCE_DIVERSITY_BONUS * (len(sources) - 1)
+        return Zone(float(self.prices[start]), float(self.prices[stop - 1]), price, strength, sources, role, start, stop)
+
+class ZoneIndex:
+    """Disjoint, price-sorted S/R zones built by LevelIndex.zones."""
+    __slots__ = ("levels", "zones", "lows", "highs", "prices")
+
+    def __init__(self, levels, zones):
+        self.levels = levels
+        self.zones = zones
+        self.lows = np.array([zone.low for zone in zones], dtype=float)
+        self.highs = np.array([zone.high for zone in zones], dtype=float)
+        self.prices = np.array([zone.price for zone in zones], dtype=float)
+
+    def __len__(self):
+        return len(self.zones)
+
+    def nearest_below(self, price, role=SUPPORT):
+        """Zone with the highest centre strictly below `price` that can act as `role`, or None."""
+        i = int(np.searchsorted(self.prices, price, 'left')) - 1
+        while i >= 0 and not self.zones[i].role & role:
+            i -= 1
+        return self.zones[i] if i >= 0 else None
+
+    def nearest_above(self, price, role=RESISTANCE):
+        """Zone with the lowest centre strictly above `price` that can act as `role`, or None."""
+        i = int(np.searchsorted(self.prices, price, 'right'))
+        while i < len(self.zones) and not self.zones[i].role & role:
+            i += 1
+        return self.zones[i] if i < len(self.zones) else None
+
+    def near(self, price, tolerance, tags):
+        """True if a zone reaching within `tolerance` of `price` holds a level matching `tags` (see LevelIndex.near)."""
+        if not tolerance > 0:
+            return False
+        levels = self.levels
+        lo = int(np.searchsorted(self.highs, price - tolerance, 'right'))
+        hi = int(np.searchsorted(self.lows, price + tolerance, 'left'))
+        for zone in self.zones[lo:hi]:
+            for i in range(zone.start, zone.stop):
+                if (levels.sources[i], None) in tags or (levels.sources[i], levels.names[i]) in tags:
+                    return True
+        return False
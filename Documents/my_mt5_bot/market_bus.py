@@ -0,0 +1,529 @@
+import argparse
+import os
+import queue
+import re
+import threading
+import time
+import numpy as np
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+from multiprocessing.managers import BaseManager
+from types import SimpleNamespace
+from bar_archive import RATES_DTYPE, fetch_newer
+from tick_bars import ALL_SEEN
+from tick_recorder import TICK_DTYPE, MAX_TICKS_PER_POLL, unseen
+
+# --- Shared-memory market data bus ---
+# With several bots on one machine, each one polling the terminal for the same
+# bars and ticks multiplies the terminal's load, and a slow strategy pass delays
+# its own polling. Instead one feeder process owns the MT5 connection and
+# publishes every symbol's bars and ticks into shared-memory rings; the bots
+# read them straight from shared memory and send every other terminal call
+# (positions, account, order_send, ...) to the feeder through a queue.
+#
+# A ring is a fixed-capacity record array laid out like BarRing (every slot
+# written twice, so the newest N records are one contiguous run) behind a small
+# header. The header's sequence counter is a seqlock: the feeder makes it odd
+# before writing and even again after, and a reader retries any read during
+# which it was odd or changed. Rings are named <prefix>_<symbol>_<timeframe>
+# for bars and <prefix>_<symbol>_ticks for ticks. The feeder also stamps every
+# ring's header with the time of each poll; a bot treats a ring whose stamp is
+# older than STALE_SECONDS as unpublished (the feeder crashed or is
+# restarting), drops its mapping and attaches again once the feeder is back.
+#
+# A feeder restarting after a crash finds its old segments still there when a
+# bot holds them open (the only way they survive on Windows). It takes them
+# over and resets their header instead of creating new ones.
+#
+# BusTerminal stands in for the MetaTrader5 module in a bot, like sim_mt5's
+# SimTerminal: copy_rates_*, copy_ticks_* and symbol_info_tick are answered from
+# the rings when they hold the data asked for, anything else goes to the feeder.
+#
+# Usage: python market_bus.py XAUUSDm BTCUSDm EURUSDm [--timeframes 15] [--port 6010]
+
+SEQ, COUNT, CAPACITY, PUBLISHED = range(4)
+HEADER_BYTES = 64  # Four uint64 fields, padded so the records start on a cache line
+
+DEFAULT_PREFIX = "snrbus"
+DEFAULT_ADDRESS = ("127.0.0.1", 6010)
+DEFAULT_AUTHKEY = b"snr-bus"
+DEFAULT_BARS = 5000     # Bars kept per symbol/timeframe
+DEFAULT_TICKS = 200000  # Ticks kept per symbol
+CALL_TIMEOUT = 30.0     # Seconds a bot waits for the feeder to answer a call
+RING_RETRY_SECONDS = 5.0  # A bot looks again for a ring that was not published after this long
+STALE_SECONDS = 10.0      # A ring the feeder has not stamped for this long is treated as unpublished
+# MT5 last_error codes
+RES_E_INVALID_PARAMS = -2
+RES_E_INTERNAL_FAIL_CONNECT = -10003
+RES_E_INTERNAL_FAIL_INIT = -10004
+RES_E_INTERNAL_FAIL_TIMEOUT = -10005
+
+def ring_name(prefix, symbol, timeframe=None):
+    """Shared-memory name of a symbol's bar ring (or tick ring, without a timeframe)."""
+    suffix = "ticks" if timeframe is None else str(timeframe)
+    return f"{prefix}_{re.sub(r'[^A-Za-z0-9]', '_', symbol)}_{suffix}"
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            # Otherwise this process's resource tracker unlinks the feeder's block when it exits
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+class SharedRing:
+    """Fixed-capacity ring of structured records in shared memory, written by one process."""
+    __slots__ = ("shm", "header", "records", "capacity", "owner")
+
+    def __init__(self, name, dtype, capacity=None):
+        """Creates the ring when `capacity` is given, otherwise attaches to an existing one."""
+        self.owner = capacity is not None
+        if self.owner:
+            size = HEADER_BYTES + 2 * capacity * dtype.itemsize
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+                self.header = np.ndarray(4, dtype=np.uint64, buffer=self.shm.buf)
+                self.header[:] = (0, 0, capacity, _now_ms())
+            except FileExistsError:
+                self._take_over(name, size, capacity)
+        else:
+            self.shm = _attach(name)
+            self.header = np.ndarray(4, dtype=np.uint64, buffer=self.shm.buf)
+        self.capacity = int(self.header[CAPACITY])
+        self.records = np.ndarray(2 * self.capacity, dtype=dtype, buffer=self.shm.buf, offset=HEADER_BYTES)
+
+    def _take_over(self, name, size, capacity):
+        """
+        Reuses the segment a crashed feeder left behind: its header is reset under the seqlock, so
+        bots still attached see an empty ring and retry any read in progress. A segment of another
+        layout is replaced instead, which only POSIX allows while bots keep it open.
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        header = np.ndarray(4, dtype=np.uint64, buffer=shm.buf)
+        if shm.size >= size and int(header[CAPACITY]) == capacity:
+            self.shm, self.header = shm, header
+            seq = int(header[SEQ]) | 1  # Odd: a write is in progress
+            header[SEQ] = seq
+            header[COUNT] = 0
+            header[PUBLISHED] = _now_ms()
+            header[SEQ] = seq + 1
+            return
+        header = None
+        shm.close()
+        shm.unlink()
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            raise FileExistsError(f"Shared memory {name} is held open with another ring layout; "
+                                  f"stop the bots using it or pick another prefix") from None
+        self.header = np.ndarray(4, dtype=np.uint64, buffer=self.shm.buf)
+        self.header[:] = (0, 0, capacity, _now_ms())
+
+    def __len__(self):
+        return min(int(self.header[COUNT]), self.capacity)
+
+    def stamp(self, now_ms=None):
+        """Marks the ring as published up to now (the feeder does on every poll)."""
+        self.header[PUBLISHED] = _now_ms() if now_ms is None else now_ms
+
+    def age(self):
+        """Seconds since the feeder last stamped the ring."""
+        return (_now_ms() - int(self.header[PUBLISHED])) / 1000.0
+
+    @property
+    def seq(self):
+        """Advances by 2 with every write; odd while one is in progress."""
+        return int(self.header[SEQ])
+
+    def extend(self, records, key=None):
+        """
+        Writes records (oldest first). With `key` (e.g. 'time' for bars), a record with the same
+        key as the newest one replaces it (the forming bar) and older ones are ignored.
+        """
+        cap = self.capacity
+        count = int(self.header[COUNT])
+        start = 0
+        if key is not None and count:
+            last = self.records[key][(count - 1) % cap]
+            start = int(np.searchsorted(records[key], last, 'left'))
+            if start < len(records) and records[key][start] == last:
+                count -= 1
+        n = len(records) - start
+        if n <= 0:
+            return
+        if n > cap:
+            count += n - cap
+            start, n = len(records) - cap, cap
+        slots = (count + np.arange(n)) % cap
+        new = records[start:start + n]
+        self.header[SEQ] += 1
+        self.records[slots] = new
+        self.records[slots + cap] = new
+        self.header[COUNT] = count + n
+        self.header[SEQ] += 1
+
+    def _view(self, count):
+        held = min(count, self.capacity)
+        end = (count - 1) % self.capacity + self.capacity + 1 if count else self.capacity
+        return self.records[end - held:end]
+
+    def view(self):
+        """(seq, every record held as a view into shared memory); valid while `seq` is unchanged."""
+        while True:
+            seq = self.seq
+            if not seq & 1:
+                return seq, self._view(int(self.header[COUNT]))
+            time.sleep(0)
+
+    def read(self, select=None):
+        """
+        A copy of the records held, or of `select(records)`, consistent with one complete write;
+        None if `select` returns None (e.g. when the records held do not cover what was asked for).
+        """
+        while True:
+            seq, records = self.view()
+            selected = records if select is None else select(records)
+            out = None if selected is None else np.array(selected)
+            if self.seq == seq:
+                return out
+
+    def close(self):
+        self.records = self.header = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def _epoch(date):
+    return int(date.timestamp()) if isinstance(date, datetime) else int(date)
+
+def _portable(value):
+    """Terminal results as plain picklable values: MT5's named tuples become namespaces."""
+    if hasattr(value, "_asdict"):
+        return SimpleNamespace(**{name: _portable(item) for name, item in value._asdict().items()})
+    if isinstance(value, (tuple, list)):
+        return tuple(_portable(item) for item in value)
+    return value
+
+class BusManager(BaseManager):
+    """The feeder's call queue and one reply queue per bot process."""
+
+BusManager.register("calls")
+BusManager.register("replies")
+
+class BusFeeder:
+    """Owns the terminal: publishes bars and ticks into the rings and executes the bots' calls."""
+
+    def __init__(self, mt5, symbols, timeframes, prefix=DEFAULT_PREFIX, bars=DEFAULT_BARS, ticks=DEFAULT_TICKS):
+        self.mt5 = mt5
+        self.prefix = prefix
+        self.bars = bars
+        self.ticks = ticks
+        self.timeframes = tuple(timeframes)
+        self.rings = {}    # (symbol, timeframe or None) -> SharedRing
+        self.cursors = {}  # symbol -> [time_msc, ticks at that ms already published]
+        self.calls = queue.Queue()
+        self.replies = {}  # client id -> queue.Queue
+        for symbol in symbols:
+            if not self.add_symbol(symbol):
+                print(f"No data for {symbol}; not published.")
+
+    def add_symbol(self, symbol):
+        """Creates the symbol's rings and fills the bar rings; returns False if it is unavailable."""
+        tick = self.mt5.symbol_info_tick(symbol)
+        if tick is None:
+            return False
+        for timeframe in self.timeframes:
+            rates = self.mt5.copy_rates_from_pos(symbol, timeframe, 0, self.bars)
+            if rates is None:
+                continue
+            ring = SharedRing(ring_name(self.prefix, symbol, timeframe), RATES_DTYPE, self.bars)
+            ring.extend(rates.astype(RATES_DTYPE), 'time')
+            self.rings[(symbol, timeframe)] = ring
+        self.rings[(symbol, None)] = SharedRing(ring_name(self.prefix, symbol), TICK_DTYPE, self.ticks)
+        self.cursors[symbol] = [tick.time_msc, ALL_SEEN]  # Ticks from now on
+        return True
+
+    def poll(self):
+        """Publishes new bars and ticks of every symbol; returns the number of ticks."""
+        added = 0
+        for (symbol, timeframe), ring in self.rings.items():
+            if timeframe is not None:
+                _, held = ring.view()
+                after = int(held['time'][-2]) if len(held) >= 2 else None
+                rates = fetch_newer(self.mt5, symbol, timeframe, after)
+                if rates is not None and len(rates):
+                    ring.extend(rates.astype(RATES_DTYPE), 'time')
+                continue
+            cursor = self.cursors[symbol]
+            ticks = self.mt5.copy_ticks_from(symbol, datetime.fromtimestamp(cursor[0] / 1000, timezone.utc),
+                                             MAX_TICKS_PER_POLL, self.mt5.COPY_TICKS_ALL)
+            if ticks is None or len(ticks) == 0:
+                continue
+            ticks = unseen(ticks, cursor[0], cursor[1])
+            if len(ticks) == 0:
+                continue
+            ring.extend(ticks.astype(TICK_DTYPE))
+            last = int(ticks['time_msc'][-1])
+            same = int(np.count_nonzero(ticks['time_msc'] == last))
+            cursor[:] = [last, same if last != cursor[0] else cursor[1] + same]
+            added += len(ticks)
+        now = _now_ms()
+        for ring in self.rings.values():
+            ring.stamp(now)
+        return added
+
+    def constants(self):
+        """The terminal module's integer constants (TIMEFRAME_*, ORDER_TYPE_*, ...)."""
+        values = {name: getattr(self.mt5, name) for name in dir(self.mt5) if name.isupper()}
+        return {name: value for name, value in values.items() if isinstance(value, int)}
+
+    def execute(self, call):
+        """Runs one (client, call id, function, args, kwargs) call on the terminal and queues the reply."""
+        client, call_id, name, args, kwargs = call
+        try:
+            result = self.constants() if name == "constants" else _portable(getattr(self.mt5, name)(*args, **kwargs))
+            error = self.mt5.last_error() if result is None else (1, "Success")
+        except Exception as e:  # A bad call from one bot must not stop the feeder
+            result, error = None, (RES_E_INVALID_PARAMS, f"{name}: {e}")
+        self.replies.setdefault(client, queue.Queue()).put((call_id, result, error))
+
+    def serve(self, address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY):
+        """Starts accepting bots' connections in a background thread."""
+        class Server(BusManager):
+            pass
+        Server.register("calls", callable=lambda: self.calls)
+        Server.register("replies", callable=lambda client: self.replies.setdefault(client, queue.Queue()))
+        server = Server(address=address, authkey=authkey).get_server()
+        threading.Thread(target=server.serve_forever, name="market-bus", daemon=True).start()
+        return server
+
+    def run(self, interval):
+        """Publishes market data every `interval` seconds and answers calls as they arrive in between."""
+        next_poll = 0.0
+        while True:
+            now = time.monotonic()
+            if now >= next_poll:
+                self.poll()
+                next_poll = now + interval
+            try:
+                call = self.calls.get(timeout=max(0.0, next_poll - time.monotonic()))
+            except queue.Empty:
+                continue
+            self.execute(call)
+
+    def close(self):
+        for ring in self.rings.values():
+            ring.close()
+        self.rings.clear()
+
+class BusTerminal:
+    """The MetaTrader5 interface a bot uses, served by a BusFeeder (see the module notes)."""
+
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY, prefix=DEFAULT_PREFIX,
+                 timeout=CALL_TIMEOUT, stale_seconds=STALE_SECONDS):
+        self.address = address
+        self.authkey = authkey
+        self.prefix = prefix
+        self.timeout = timeout
+        self.stale_seconds = stale_seconds
+        self.client = f"{os.getpid()}-{id(self)}"
+        self.calls = self.replies = None
+        self.next_call = 0
+        self.table = {}  # MT5 constants, from the feeder
+        self.rings = {}   # (symbol, timeframe or None) -> SharedRing
+        self.missing = {}  # (symbol, timeframe or None) -> monotonic time a ring was last found unpublished
+        self.error = (1, "Success")
+
+    def __getattr__(self, name):
+        table = self.__dict__.get("table", {})
+        if name in table:
+            return table[name]
+        if name.startswith("_") or not name.islower():
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+    def _call(self, name, *args, **kwargs):
+        if self.calls is None:
+            self.error = (RES_E_INTERNAL_FAIL_INIT, "No connection to the market bus")
+            return None
+        self.next_call += 1
+        call_id = self.next_call
+        self.calls.put((self.client, call_id, name, args, kwargs))
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                reply_id, result, error = self.replies.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                self.error = (RES_E_INTERNAL_FAIL_TIMEOUT, f"No answer from the market bus to {name}")
+                return None
+            if reply_id == call_id:  # Older ids are answers to calls that already timed out
+                self.error = error
+                return result
+
+    def _ring(self, symbol, timeframe=None):
+        """
+        The published ring, or None; a missing one is looked for again after RING_RETRY_SECONDS.
+        A ring the feeder stopped stamping is dropped, so a restarted feeder's ring is attached anew.
+        """
+        key = (symbol, timeframe)
+        ring = self.rings.get(key)
+        if ring is None:
+            if time.monotonic() - self.missing.get(key, -RING_RETRY_SECONDS) < RING_RETRY_SECONDS:
+                return None
+            try:
+                dtype = TICK_DTYPE if timeframe is None else RATES_DTYPE
+                ring = self.rings[key] = SharedRing(ring_name(self.prefix, symbol, timeframe), dtype)
+                self.missing.pop(key, None)
+            except FileNotFoundError:
+                self.missing[key] = time.monotonic()
+                return None
+        if ring.age() > self.stale_seconds:
+            ring.close()
+            del self.rings[key]
+            self.missing[key] = time.monotonic()
+            return None
+        return ring
+
+    # --- Session ---
+
+    def initialize(self, *args, **kwargs):
+        """Connects to the feeder (which holds the terminal login, so the arguments are not used)."""
+        manager = BusManager(address=self.address, authkey=self.authkey)
+        try:
+            manager.connect()
+        except OSError as e:
+            self.error = (RES_E_INTERNAL_FAIL_CONNECT, f"Market bus unavailable: {e}")
+            return False
+        self.calls, self.replies = manager.calls(), manager.replies(self.client)
+        self.missing = {}  # Look for unpublished rings again
+        self.table = self._call("constants") or {}
+        return True
+
+    def shutdown(self):
+        for ring in self.rings.values():
+            ring.close()
+        self.rings = {}
+        self.calls = self.replies = None
+        return True
+
+    def last_error(self):
+        return self.error
+
+    # --- Market data ---
+
+    # Whether a ring holds what was asked for is decided inside ring.read, on the same snapshot
+    # the records are then taken from. A full ring has dropped its oldest records, so it only
+    # answers for what it still covers; one that never filled holds the whole published history.
+
+    def _rates(self, symbol, timeframe, select):
+        """`select(rates, full)` read from the bar ring; None if unpublished or `select` declines."""
+        ring = self._ring(symbol, timeframe)
+        if ring is None:
+            return None
+        capacity = ring.capacity
+        return ring.read(lambda rates: select(rates, len(rates) == capacity))
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        def select(rates, full):
+            if full and start_pos + count > len(rates):
+                return None
+            return rates[max(0, len(rates) - start_pos - count):max(0, len(rates) - start_pos)]
+        rates = self._rates(symbol, timeframe, select)
+        if rates is None:
+            return self._call("copy_rates_from_pos", symbol, timeframe, start_pos, count)
+        return rates
+
+    def copy_rates_from(self, symbol, timeframe, date_from, count):
+        hi = _epoch(date_from)
+        def select(rates, full):
+            end = np.searchsorted(rates['time'], hi, 'right')
+            if full and end < count:
+                return None
+            return rates[max(0, end - count):end]
+        rates = self._rates(symbol, timeframe, select)
+        if rates is None:
+            return self._call("copy_rates_from", symbol, timeframe, date_from, count)
+        return rates
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        lo, hi = _epoch(date_from), _epoch(date_to)
+        def select(rates, full):
+            if full and not (len(rates) and rates['time'][0] <= lo):
+                return None
+            return rates[np.searchsorted(rates['time'], lo, 'left'):np.searchsorted(rates['time'], hi, 'right')]
+        rates = self._rates(symbol, timeframe, select)
+        if rates is None:
+            return self._call("copy_rates_range", symbol, timeframe, date_from, date_to)
+        return rates
+
+    def _ticks(self, symbol, lo_msc, flags, select):
+        """
+        `select(ticks)` read from the tick ring, or None if it does not reach back to `lo_msc`
+        (ticks are published from the feeder's start only) or `flags` ask for a filtered copy.
+        """
+        ring = self._ring(symbol)
+        if ring is None or flags != self.table.get("COPY_TICKS_ALL"):
+            return None
+        return ring.read(lambda ticks: select(ticks) if len(ticks) and ticks['time_msc'][0] <= lo_msc else None)
+
+    def copy_ticks_from(self, symbol, date_from, count, flags):
+        lo = _epoch(date_from) * 1000
+        ticks = self._ticks(symbol, lo, flags,
+                            lambda ticks: ticks[np.searchsorted(ticks['time_msc'], lo, 'left'):][:count])
+        if ticks is None:
+            return self._call("copy_ticks_from", symbol, date_from, count, flags)
+        return ticks
+
+    def copy_ticks_range(self, symbol, date_from, date_to, flags):
+        lo, hi = _epoch(date_from) * 1000, _epoch(date_to) * 1000
+        ticks = self._ticks(symbol, lo, flags,
+                            lambda ticks: ticks[np.searchsorted(ticks['time_msc'], lo, 'left'):
+                                                np.searchsorted(ticks['time_msc'], hi, 'right')])
+        if ticks is None:
+            return self._call("copy_ticks_range", symbol, date_from, date_to, flags)
+        return ticks
+
+    def symbol_info_tick(self, symbol):
+        ring = self._ring(symbol)
+        last = ring.read(lambda ticks: ticks[-1:]) if ring is not None else ()
+        if len(last) == 0:
+            return self._call("symbol_info_tick", symbol)
+        return SimpleNamespace(**{name: last[name][0].item() for name in TICK_DTYPE.names})
+
+def main():
+    import MetaTrader5 as mt5
+    parser = argparse.ArgumentParser(description="Publish bars and ticks to the bots over shared memory.")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--timeframes", type=int, nargs="+", default=[mt5.TIMEFRAME_M15],
+                        help="MT5 timeframe values whose bars are published (default: M15)")
+    parser.add_argument("--bars", type=int, default=DEFAULT_BARS, help="Bars kept per symbol/timeframe")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS, help="Ticks kept per symbol")
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+    parser.add_argument("--port", type=int, default=DEFAULT_ADDRESS[1])
+    parser.add_argument("--authkey", default=DEFAULT_AUTHKEY.decode())
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between polls")
+    parser.add_argument("--path", help="Path to terminal64.exe (default: attach to the running terminal)")
+    args = parser.parse_args()
+
+    if not (mt5.initialize(path=args.path) if args.path else mt5.initialize()):
+        print(f"MT5 initialization failed, error code: {mt5.last_error()}")
+        return
+    feeder = BusFeeder(mt5, args.symbols, args.timeframes, args.prefix, args.bars, args.ticks)
+    try:
+        feeder.serve((DEFAULT_ADDRESS[0], args.port), args.authkey.encode())
+        print(f"Publishing {', '.join(symbol for symbol, tf in feeder.rings if tf is None)} on port {args.port}")
+        feeder.run(args.interval)
+    except KeyboardInterrupt:
+        print("Market bus stopped.")
+    finally:
+        feeder.close()
+        mt5.shutdown()
+
+if __name__ == "__main__":
+    main()
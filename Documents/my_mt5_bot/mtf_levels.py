@@ -0,0 +1,167 @@
+from bar_archive import TIMEFRAME_NAMES, TIMEFRAME_SECONDS
+from indicators import EMAState
+from level_index import SUPPORT, RESISTANCE, EITHER, SOURCE_WEIGHTS
+from pivots import classic_pivots
+from swing_levels import SwingTracker, FIB_RETRACEMENTS
+from session_profiles import SessionProfiles
+from tick_bars import bar_start, W1
+from volume_profile import bar_shares, value_area
+
+# --- Higher-timeframe levels from the base series ---
+# H1/H4 (or any higher) bars are rolled up from the bot's own closed base bars
+# as they are folded in, so higher-timeframe context costs no extra terminal
+# calls while running. A higher bar closes with the last base bar of its
+# period, and only then advances that timeframe's EMAs and swings.
+#
+# The base history only has to cover the short base-timeframe indicators:
+# `seed` starts each higher timeframe from the terminal's own bars of that
+# timeframe (one fetch of the EMA warm-up / fib window), and the weekly state
+# from the base bars since the start of the previous week (one range fetch).
+# Weekly pivots and the weekly value area then come from the previous complete
+# week, bounded by its week boundary rather than by a count of base bars, which
+# would span more than a week for markets closed at the weekend.
+
+FIB_NAMES = [f'{ratio * 100:.1f}%' for ratio in FIB_RETRACEMENTS]
+
+class Rollup:
+    """Bars of one higher timeframe built from closed base bars, with EMAs/swings advanced on each close."""
+    __slots__ = ("timeframe", "bar", "last", "emas", "swings", "until")
+
+    def __init__(self, timeframe, ema_periods=(), swing_lookback=None):
+        self.timeframe = timeframe
+        self.bar = None             # forming [time, open, high, low, close]
+        self.last = None            # last closed bar
+        self.emas = [EMAState(period) for period in ema_periods]
+        self.swings = SwingTracker((swing_lookback,)) if swing_lookback else None
+        self.until = None           # base bars opening before this are already in the seeded bars
+
+    def seed(self, rates, until):
+        """Advances over closed bars of this timeframe (oldest first); base bars before `until` are then skipped."""
+        for bar in rates:
+            self.bar = [int(bar['time']), float(bar['open']), float(bar['high']), float(bar['low']),
+                        float(bar['close'])]
+            self._close()
+        self.until = until
+
+    def update(self, time, open, high, low, close, base_seconds):
+        if self.until is not None and time < self.until:
+            return
+        start = bar_start(time, self.timeframe)
+        bar = self.bar
+        if bar is not None and bar[0] != start:
+            self._close()  # A base bar was missing at the end of the period
+            bar = None
+        if bar is None:
+            self.bar = [start, open, high, low, close]
+        else:
+            bar[2] = max(bar[2], high)
+            bar[3] = min(bar[3], low)
+            bar[4] = close
+        if time + base_seconds >= start + TIMEFRAME_SECONDS[self.timeframe]:
+            self._close()
+
+    def _close(self):
+        bar, self.bar = self.bar, None
+        for ema in self.emas:
+            ema.update(bar[4])
+        if self.swings is not None:
+            self.swings.update(bar[2], bar[3])
+        self.last = bar
+
+class MultiTimeframeLevels:
+    """EMAs on `ema_timeframes`, fib swings on `fib_timeframe`, weekly pivots and weekly volume profile."""
+    __slots__ = ("base_timeframe", "base_seconds", "rollups", "fib_timeframe", "fib_lookback", "seed_bars",
+                 "weekly", "weekly_profile", "complete_from", "cached")
+
+    def __init__(self, base_timeframe, ema_timeframes, ema_periods, fib_timeframe, fib_lookback, bucket_size,
+                 seed_bars):
+        """`seed_bars`: higher-timeframe bars `seed` fetches (the EMA warm-up and the fib window)."""
+        self.base_timeframe = base_timeframe
+        self.base_seconds = base_seconds = TIMEFRAME_SECONDS[base_timeframe]
+        # Only timeframes above the base one add context
+        self.rollups = {tf: Rollup(tf, ema_periods) for tf in ema_timeframes if TIMEFRAME_SECONDS[tf] > base_seconds}
+        self.fib_timeframe = fib_timeframe if TIMEFRAME_SECONDS[fib_timeframe] > base_seconds else None
+        self.fib_lookback = fib_lookback
+        if self.fib_timeframe is not None:
+            rollup = self.rollups.get(fib_timeframe)
+            if rollup is None:
+                rollup = self.rollups[fib_timeframe] = Rollup(fib_timeframe)
+            rollup.swings = SwingTracker((fib_lookback,))
+        self.seed_bars = seed_bars
+        self.weekly = Rollup(W1)
+        self.weekly_profile = SessionProfiles('week', bucket_size, 1)
+        self.complete_from = None  # Start of the first week seen from its beginning
+        self.cached = None  # levels() result; it only changes when a base bar is folded in
+
+    def seed(self, mt5, symbol, first, volume='real_volume'):
+        """
+        Starts from the terminal's history before `first`, the open time of the first base bar that
+        will be folded in (`volume`: the rates column the base bars' volume comes from). Returns False
+        if the terminal had none; the state then warms up from the base bars alone.
+        """
+        seeded = True
+        for tf, rollup in self.rollups.items():
+            seconds = TIMEFRAME_SECONDS[tf]
+            start = bar_start(first, tf)
+            until = start if start == first else start + seconds  # Roll up from the next whole bar on
+            rates = mt5.copy_rates_from(symbol, tf, until - 1, self.seed_bars)
+            if rates is None:
+                seeded = False
+                continue
+            rollup.seed(rates[rates['time'] + seconds <= until], until)
+        # The weekly state starts at the previous week's boundary, so that week is complete
+        week = bar_start(bar_start(first, W1) - 1, W1)
+        rates = mt5.copy_rates_range(symbol, self.base_timeframe, week, first - 1)
+        if rates is None:
+            return False
+        self.complete_from = week
+        for bar in rates[rates['time'] < first]:
+            self._update_weekly(int(bar['time']), float(bar['open']), float(bar['high']), float(bar['low']),
+                                float(bar['close']), float(bar[volume]))
+        self.cached = None
+        return seeded
+
+    def update(self, time, open, high, low, close, volume):
+        """Folds in one closed base bar."""
+        for rollup in self.rollups.values():
+            rollup.update(time, open, high, low, close, self.base_seconds)
+        self._update_weekly(time, open, high, low, close, volume)
+        self.cached = None
+
+    def _update_weekly(self, time, open, high, low, close, volume):
+        if self.complete_from is None:
+            self.complete_from = bar_start(time, W1) + TIMEFRAME_SECONDS[W1]  # Unseeded: the first week is partial
+        self.weekly.update(time, open, high, low, close, self.base_seconds)
+        self.weekly_profile.add(time, *bar_shares(low, high, volume, self.weekly_profile.bucket_size))
+
+    def levels(self):
+        """(price, source, name, role, weight) S/R candidates for a LevelIndex; NaN prices are dropped there."""
+        if self.cached is not None:
+            return self.cached
+        candidates = []
+        for tf, rollup in self.rollups.items():
+            for ema, name in zip(rollup.emas, ('EMA_Short', 'EMA_Long')):
+                candidates.append((ema.current, 'htf_ema', f'{TIMEFRAME_NAMES[tf]} {name}', EITHER,
+                                   SOURCE_WEIGHTS['htf_ema']))
+        if self.fib_timeframe is not None:
+            rollup = self.rollups[self.fib_timeframe]
+            forming = rollup.bar
+            swing = rollup.swings.levels(self.fib_lookback, forming[2] if forming else None,
+                                         forming[3] if forming else None)
+            if swing is not None:
+                candidates.extend((swing['fib_levels'][name], 'htf_fib', name, EITHER, SOURCE_WEIGHTS['htf_fib'])
+                                  for name in FIB_NAMES if name in swing['fib_levels'])
+        week = self.weekly.last
+        if week is not None and week[0] >= self.complete_from:
+            high, low, close = week[2], week[3], week[4]
+            for name, price in classic_pivots(high, low, close).items():
+                role = SUPPORT if name.startswith('S') else RESISTANCE if name.startswith('R') else EITHER
+                candidates.append((price, 'weekly_pivot', name, role, SOURCE_WEIGHTS['weekly_pivot']))
+        closed = self.weekly_profile.closed
+        if closed and next(reversed(closed)) >= self.complete_from:
+            area = value_area(*self.weekly_profile.last_closed())
+            if area:
+                candidates.extend((price, 'weekly_vp', name, EITHER, SOURCE_WEIGHTS['weekly_vp'])
+                                  for name, price in area.items())
+        self.cached = candidates
+        return candidates
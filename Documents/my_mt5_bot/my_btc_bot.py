@@ -1,9 +1,31 @@
 import MetaTrader5 as mt5
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 import time
-import pytz
+import logging
+from types import SimpleNamespace
+from bot_logging import setup_logging, LazyLevels, LazyPrices
+import bar_archive
+import tick_bars
+import fetch_planner
+import pivots
+import swing_levels
+import volume_profile
+import tick_profile
+import session_profiles
+import vwap
+import mtf_levels
+import scanner
+import trigger_index
+import pending_orders
+import market_bus
+import level_index
+import bot_metrics
+from bot_metrics import METRICS
+from trade_journal import TradeJournal
+from indicators import EMAState, ATRState
+from checkpoint import save_state, load_state
+from bar_series import BarRing
 # ADDED: Imports for the 'ta' library
 from ta.trend import EMAIndicator
 from ta.volatility import AverageTrueRange
@@ -18,64 +40,247 @@ MT5_PATH = r"C:\Program Files\MetaTrader 5 EXNESS\terminal64.exe"  # Path to you
 SYMBOL = "BTCUSDm"  # Trading instrument (e.g., "XAUUSD", "EURUSD")
 TIMEFRAME = mt5.TIMEFRAME_M15  # Timeframe for analysis (e.g., M1, M5, M15, H1, H4, D1)
 MAX_TRADE_COUNT = 1  # Max number of open trades for this symbol
+MAGIC_NUMBER = 20230623  # Unique identifier for your bot's orders
 
 # --- Risk Management Parameters ---
 RISK_PERCENT_PER_TRADE = 0.05
 SL_MULTIPLIER = 1.5
 TP_MULTIPLIER = 3.0
 
+# --- Entry Mode ---
+ENTRY_MODE = "market"  # "pending": keep orders resting at the nearest support/resistance zones (pending_orders.py)
+PENDING_ORDER_KIND = "limit"  # "limit" fades into the zones, "stop" trades breakouts through them
+PENDING_REPLACE_ATR_FRACTION = 0.1  # Resting orders are only modified once their level moved more than this (in ATRs)
+
+# --- History ---
+ARCHIVE_DIR = "bar_archive"  # Local month-partitioned bar archive topped up from MT5; None fetches from the terminal only
+
 # --- Indicator Parameters ---
 ATR_PERIOD = 14
 EMA_SHORT_PERIOD = 20
 EMA_LONG_PERIOD = 50
 # PIVOT_POINT_PERIOD was removed as it's handled by manual calculation now
+PIVOT_METHOD = "classic"  # Daily pivot variant used as S/R: "classic", "camarilla" or "woodie"
 FIB_RET_LOOKBACK_BARS = 100
 VOLUME_PROFILE_BUCKET_SIZE = 0.5
 VOLUME_PROFILE_LOOKBACK_BARS = 200
+VOLUME_PROFILE_SOURCE = 'bars'  # 'ticks': bin each bar's actual ticks (copy_ticks_range) instead of its range
+PROFILE_SESSIONS = ('day', 'london', 'new_york')  # Each adds its last complete session's POC/VAH/VAL as S/R
+COMPOSITE_PROFILE_SESSIONS = 5  # Days summed into the composite profile, whose HVNs are S/R candidates
+VWAP_SESSIONS = ('day', 'london', 'new_york')  # Session VWAPs ('day' is anchored at the daily open)
+VWAP_BAND_STDEVS = (1.0, 2.0)  # VWAP +/- these standard deviations are S/R candidates too
+# Higher-timeframe context, rolled up from TIMEFRAME bars (see mtf_levels.py)
+MTF_EMA_TIMEFRAMES = (mt5.TIMEFRAME_H1, mt5.TIMEFRAME_H4)  # EMA_SHORT/EMA_LONG on these timeframes
+MTF_FIB_TIMEFRAME = mt5.TIMEFRAME_H4
+MTF_FIB_LOOKBACK_BARS = 30  # In MTF_FIB_TIMEFRAME bars
+
+# --- Logging ---
+LOG_FILE = f"snr_bot_{SYMBOL}.log"  # Rotating log file written by a background thread
+LOG_LEVEL = "INFO"  # Set to "DEBUG" for the per-cycle market data/indicator dump
+LOG_TO_CONSOLE = True
+
+log = logging.getLogger("snr_bot")
+
+# --- Metrics ---
+METRICS_PORT = 9101  # Local Prometheus endpoint (http://127.0.0.1:9101/metrics); distinct per bot (XAU 9100, BTC 9101, EUR 9102), 0 disables
+
+# Count every terminal call (and None results) by function
+mt5 = bot_metrics.instrument(mt5)
+
+# --- Trade Journal ---
+JOURNAL_PATH = "trade_journal.db"  # SQLite (WAL) journal of signals, orders and closes; shared by all bots, None disables
+journal = None  # Opened in main()
+last_positions = {}  # symbol -> {ticket: position} seen on the previous pass, to detect closes
+
+# --- Engine State ---
+CHECKPOINT_PATH = f"snr_state_{SYMBOL}.pkl"  # Warm-restart checkpoint (bars + indicator state); None disables
+CHECKPOINT_SECONDS = 300  # Also checkpoint this often while running
+ENGINE_STATE_VERSION = 9  # Bump when the layout of symbol_state() changes, to discard older checkpoints
+engine = {}  # symbol -> per-symbol state, see symbol_state()
+
+# --- Tick Feed ---
+TICK_FEED = False  # Build bars locally from the tick stream (tick_bars.py) and run a pass on every bar close
+TICK_POLL_SECONDS = 1  # Tick polling interval when TICK_FEED or LEVEL_TRIGGERS is on
+feed = None  # Created in main() when TICK_FEED is on
+LEVEL_TRIGGERS = True  # Between passes, run one as soon as price enters or leaves an S/R zone band (trigger_index.py)
+triggers = trigger_index.TriggerIndex()  # Zone bands per symbol, refreshed by every pass
+
+# --- Watchlist ---
+WATCHLIST = ()  # More symbols for this process, screened together each pass (scanner.py); setups get a full pass
+SCAN_ATR_FRACTION = 0.5  # Screen tolerance in ATRs; wider than the entry's 0.25 as the screen sees fewer levels
+
+# --- Market Data Bus ---
+MARKET_BUS = None  # (host, port) of a market_bus.py feeder to read bars/ticks from and send other calls through
+MARKET_BUS_AUTHKEY = market_bus.DEFAULT_AUTHKEY
+MARKET_BUS_PREFIX = market_bus.DEFAULT_PREFIX
 
 # --- Bot Control ---
 RUN_BOT = True
+CYCLE_SECONDS = 60  # Wait between full passes of the decision loop
+ORDER_PAUSE_SECONDS = 10  # Pause after sending an order
 
 def connect_mt5():
     """Connects to the MetaTrader 5 terminal."""
     if not mt5.initialize(path=MT5_PATH, login=MT5_ACCOUNT, password=MT5_PASSWORD, server=MT5_SERVER):
-        print(f"MT5 initialization failed, error code: {mt5.last_error()}")
+        log.error("MT5 initialization failed, error code: %s", mt5.last_error())
         return False
     else:
-        print("MT5 initialized successfully.")
+        log.info("MT5 initialized successfully.")
         account_info = mt5.account_info()
         if account_info:
-            print(f"Account: {account_info.login}, Server: {mt5.terminal_info().name}")
+            log.info("Account: %s, Server: %s", account_info.login, mt5.terminal_info().name)
         else:
-            print(f"Failed to get account info: {mt5.last_error()}")
+            log.warning("Failed to get account info: %s", mt5.last_error())
         return True
 
 def disconnect_mt5():
     """Disconnects from the MetaTrader 5 terminal."""
     mt5.shutdown()
-    print("MT5 disconnected.")
+    log.info("MT5 disconnected.")
+
+def symbol_state(symbol):
+    """Per-symbol engine state: cached bars and streaming EMA/ATR, advanced bar by bar."""
+    state = engine.get(symbol)
+    if state is None:
+        state = engine[symbol] = new_symbol_state(symbol)
+    return state
+
+def new_symbol_state(symbol):
+    """Empty per-symbol engine state, see symbol_state()."""
+    return SimpleNamespace(
+        bars=None,              # BarRing holding the history window, last bar still forming
+        archived_until=None,    # newest bar time known to be in the archive
+        indicators_until=None,  # newest closed bar folded into the streaming indicators
+        ema_short=EMAState(EMA_SHORT_PERIOD),
+        ema_long=EMAState(EMA_LONG_PERIOD),
+        atr=ATRState(ATR_PERIOD),
+        pivots=pivots.PivotCache(),  # previous day's pivots, recomputed on server-day rollover
+        swings=swing_levels.SwingTracker((FIB_RET_LOOKBACK_BARS,)),  # rolling swing high/low for the fibs
+        volume_profile=volume_profile.VolumeProfileWindow(VOLUME_PROFILE_LOOKBACK_BARS - 1,  # + forming bar
+                                                          VOLUME_PROFILE_BUCKET_SIZE),
+        tick_volumes=None,      # ticks weighted by volume_real (True) or counted, for the 'ticks' profile
+        mtf=new_mtf_levels(),
+        sessions=new_session_profiles(),
+        vwaps={kind: vwap.SessionVWAP(kind) for kind in VWAP_SESSIONS},
+        anchored_vwap=vwap.AnchoredVWAP(FIB_RET_LOOKBACK_BARS),
+        resting=pending_orders.RestingOrders(symbol, MAGIC_NUMBER),  # pending orders working in "pending" mode
+        symbol=symbol,
+    )
+
+def checkpoint_fingerprint():
+    """Settings the engine state depends on; a checkpoint saved with other values is discarded."""
+    return (ENGINE_STATE_VERSION, TIMEFRAME, EMA_SHORT_PERIOD, EMA_LONG_PERIOD, ATR_PERIOD, FIB_RET_LOOKBACK_BARS,
+            VOLUME_PROFILE_LOOKBACK_BARS, VOLUME_PROFILE_BUCKET_SIZE, VOLUME_PROFILE_SOURCE, MTF_EMA_TIMEFRAMES,
+            MTF_FIB_TIMEFRAME, MTF_FIB_LOOKBACK_BARS, PROFILE_SESSIONS, COMPOSITE_PROFILE_SESSIONS,
+            session_profiles.SESSION_HOURS, VWAP_SESSIONS)
+
+def save_checkpoint():
+    """Writes the engine state for a warm restart."""
+    try:
+        save_state(CHECKPOINT_PATH, {"engine": engine, "last_positions": last_positions}, checkpoint_fingerprint())
+    except OSError as e:
+        log.warning("Could not write checkpoint %s: %s", CHECKPOINT_PATH, e)
+
+def restore_checkpoint():
+    """Loads the engine state saved by a previous run, if it matches the current settings."""
+    saved = load_state(CHECKPOINT_PATH, checkpoint_fingerprint())
+    if saved is None:
+        return False
+    engine.update(saved["engine"])
+    last_positions.update(saved["last_positions"])
+    for state in engine.values():
+        state.archived_until = None  # The archive may have moved on since the checkpoint was written
+    log.info("Restored engine state for %s from %s", ", ".join(engine), CHECKPOINT_PATH)
+    return True
+
+def indicator_lookbacks(timeframe):
+    """Bars each indicator reads, plus warm-up for the smoothed ones."""
+    return {
+        'ema_short': fetch_planner.ema_lookback(EMA_SHORT_PERIOD),
+        'ema_long': fetch_planner.ema_lookback(EMA_LONG_PERIOD),
+        'atr': fetch_planner.wilder_lookback(ATR_PERIOD),
+        'fib': fetch_planner.window_lookback(FIB_RET_LOOKBACK_BARS),
+        'volume_profile': fetch_planner.window_lookback(VOLUME_PROFILE_LOOKBACK_BARS),
+        **mtf_lookbacks(timeframe),
+        'composite_profile': fetch_planner.sessions_lookback(COMPOSITE_PROFILE_SESSIONS + 1,
+                                                             bar_archive.TIMEFRAME_SECONDS[timeframe]),
+        # Pivots read the broker's D1 bars (see pivots.py), so they add nothing to the intraday window
+    }
+
+def mtf_lookbacks(timeframe):
+    """
+    One higher-timeframe bar in base bars, so the rollups start from a whole bar: their history
+    (EMA warm-up, fib window, previous week) is fetched once on their own, see mtf_levels.seed.
+    """
+    seconds = bar_archive.TIMEFRAME_SECONDS
+    lookbacks = {}
+    for tf in set(MTF_EMA_TIMEFRAMES) | {MTF_FIB_TIMEFRAME}:
+        factor = seconds[tf] // seconds[timeframe]
+        if factor > 1:
+            lookbacks[f'{bar_archive.TIMEFRAME_NAMES[tf]}_rollup'] = fetch_planner.on_timeframe(
+                fetch_planner.window_lookback(1), factor)
+    return lookbacks
+
+def planned_bars(timeframe):
+    """Bars to request for `timeframe`, from the indicators' declared lookbacks."""
+    return fetch_planner.plan_bars(indicator_lookbacks(timeframe))
+
+def refresh_bars(symbol, timeframe, bars_count):
+    """Brings the cached bar window up to date; after the first pass only the gap is fetched."""
+    state = symbol_state(symbol)
+    if state.bars is None or len(state.bars) < 2 or state.bars.capacity < bars_count:
+        return load_history(symbol, timeframe, bars_count)
+
+    # Everything after the newest closed bar we hold: the bar that was forming plus any newer ones
+    last_closed = int(state.bars.view(2).time[0])
+    new = feed.take(symbol, timeframe) if feed is not None else None
+    from_terminal = new is None or new['time'][0] > last_closed + 2 * bar_archive.TIMEFRAME_SECONDS[timeframe]
+    if from_terminal:
+        # No local bars yet, or they don't connect to the cache (e.g. after a restart): ask the terminal
+        new = bar_archive.fetch_newer(mt5, symbol, timeframe, last_closed)
+    if new is None or len(new) == 0:
+        return new
+    # Only the broker's bars are archived: tick-built ones can differ (volumes, missed ticks) and
+    # later syncs trust the archive
+    if ARCHIVE_DIR and from_terminal:
+        if state.archived_until is None:
+            state.archived_until = bar_archive.last_time(ARCHIVE_DIR, symbol, timeframe) or 0
+        closed = new[:-1]
+        if len(closed) and closed['time'][0] > state.archived_until + bar_archive.TIMEFRAME_SECONDS[timeframe]:
+            # Bars in between came from the tick feed: fill the archive up from the terminal instead
+            bar_archive.sync(mt5, ARCHIVE_DIR, symbol, timeframe, len(new))
+            state.archived_until = bar_archive.last_time(ARCHIVE_DIR, symbol, timeframe) or 0
+        else:
+            closed = closed[closed['time'] > state.archived_until]
+            if len(closed):
+                bar_archive.append(ARCHIVE_DIR, symbol, timeframe, closed)
+                state.archived_until = int(closed['time'][-1])
+    state.bars.extend(new)  # Updates the forming bar in place and appends the newer ones
+    return state.bars
+
+def load_history(symbol, timeframe, bars_count):
+    """Loads the last `bars_count` bars into the cache (first pass)."""
+    if ARCHIVE_DIR:
+        # Read history from the local archive; only bars newer than the archive come from the terminal
+        rates = bar_archive.get_bars(mt5, ARCHIVE_DIR, symbol, timeframe, bars_count)
+    else:
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, bars_count)
 
-def get_market_data(symbol, timeframe, bars_count):
-    """Retrieves historical market data."""
-    # Fetch enough data for all indicator lookbacks (ATR, EMAs, Fib, Volume Profile)
-    # Ensure this is sufficiently large to cover all periods + buffer.
-    # EMA_LONG_PERIOD + ATR_PERIOD + FIB_RET_LOOKBACK_BARS + VOLUME_PROFILE_LOOKBACK_BARS + buffer
-    needed_bars = max(EMA_LONG_PERIOD, ATR_PERIOD, FIB_RET_LOOKBACK_BARS, VOLUME_PROFILE_LOOKBACK_BARS) + 50 # Add a buffer for safety
-    
-    timezone = pytz.timezone("Etc/UTC")
-    # Get enough recent data to cover the needed bars, roughly 2 days per H4 bar, 1 day per D1, etc.
-    # For M15, 30 days is usually plenty.
-    utc_from = datetime.now(timezone) - timedelta(days=30) 
-    
-    rates = mt5.copy_rates_range(symbol, timeframe, utc_from, datetime.now(timezone))
-    
     if rates is None:
-        print(f"Failed to get rates for {symbol}, error code: {mt5.last_error()}")
-        return pd.DataFrame()
-    df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
-    df = df.set_index('time') # Set time as index
-    return df
+        return None
+    state = symbol_state(symbol)
+    state.bars = BarRing(bars_count)
+    state.bars.extend(rates)
+    if ARCHIVE_DIR and len(state.bars) > 1:
+        state.archived_until = int(state.bars.view(2).time[0])
+    return state.bars
+
+def get_market_data(symbol, timeframe, bars_count):
+    """Retrieves historical market data as a Bars series (last bar still forming), or None."""
+    if refresh_bars(symbol, timeframe, bars_count) is None:
+        log.error("Failed to get rates for %s, error code: %s", symbol, mt5.last_error())
+        return None
+    return symbol_state(symbol).bars.view(bars_count)
 
 def get_timeframe_name(timeframe_enum):
     """Converts MT5 timeframe enum to a readable string for printing."""
@@ -90,161 +295,219 @@ def get_timeframe_name(timeframe_enum):
     elif timeframe_enum == mt5.TIMEFRAME_MN1: return "MN1"
     else: return f"Unknown ({timeframe_enum})" # Fallback to integer if unknown
 
-def calculate_indicators(df):
-    """Calculates all required indicators using 'ta' library and manual calculations."""
-    # Ensure 'open', 'high', 'low', 'close' are float types
-    df['open'] = df['open'].astype(float)
-    df['high'] = df['high'].astype(float)
-    df['low'] = df['low'].astype(float)
-    df['close'] = df['close'].astype(float)
-    # Ensure volume is float for calculations if it's used in volume profile
-    if 'real_volume' in df.columns:
-        df['real_volume'] = df['real_volume'].astype(float)
-    elif 'tick_volume' in df.columns: # Use tick_volume if real_volume is not available
-        df['tick_volume'] = df['tick_volume'].astype(float)
+def volume_column(columns):
+    """Volume used by the volume profile: real volume where the feed has it, else tick volume."""
+    return 'real_volume' if 'real_volume' in columns else 'tick_volume'
+
+def new_mtf_levels():
+    """Empty higher-timeframe level state for TIMEFRAME bars (see its seed())."""
+    seed_bars = fetch_planner.plan_bars({'ema_long': fetch_planner.ema_lookback(EMA_LONG_PERIOD),
+                                         'fib': fetch_planner.window_lookback(MTF_FIB_LOOKBACK_BARS)})
+    return mtf_levels.MultiTimeframeLevels(TIMEFRAME, MTF_EMA_TIMEFRAMES, (EMA_SHORT_PERIOD, EMA_LONG_PERIOD),
+                                           MTF_FIB_TIMEFRAME, MTF_FIB_LOOKBACK_BARS, VOLUME_PROFILE_BUCKET_SIZE,
+                                           seed_bars)
+
+def new_session_profiles():
+    """Empty per-session profiles; the daily ones also make up the composite."""
+    return {kind: session_profiles.SessionProfiles(kind, VOLUME_PROFILE_BUCKET_SIZE, COMPOSITE_PROFILE_SESSIONS)
+            for kind in ('day',) + tuple(kind for kind in PROFILE_SESSIONS if kind != 'day')}
+
+# Kept when the indicator state starts over: the bar cache and what is known of the terminal/archive
+KEPT_ON_RESET = ('bars', 'archived_until', 'tick_volumes', 'resting', 'symbol')
+
+def advance_indicators(state):
+    """Folds bars that closed since the last pass into the streaming indicator, profile, MTF, session and VWAP state."""
+    bars = state.bars.view()
+    times = bars.time
+    if state.indicators_until is not None and len(times) and state.indicators_until < times[0]:
+        # More bars closed than the window holds (downtime, an old checkpoint, a symbol not seen for
+        # days): the bars in between are gone, so rebuild from the window instead of skipping them
+        log.info("Indicator state of %s is older than its bar window; rebuilding it.", state.symbol)
+        vars(state).update((name, value) for name, value in vars(new_symbol_state(state.symbol)).items()
+                           if name not in KEPT_ON_RESET)
+    start = 0 if state.indicators_until is None else np.searchsorted(times, state.indicators_until, 'right')
+    opens, highs, lows, closes = bars.open, bars.high, bars.low, bars.close
+    volumes = bars[volume_column(bars.columns)]
+    if state.indicators_until is None and len(times) > 1:
+        state.mtf.seed(mt5, state.symbol, int(times[0]), volume_column(bars.columns))
+    binned = {}
+    if VOLUME_PROFILE_SOURCE == 'ticks' and start < len(times) - 1:
+        # Only bars that stay in the profile window are worth their ticks
+        first = max(start, len(times) - 1 - state.volume_profile.window)
+        if state.tick_volumes is None:  # Decided once, so the profile never mixes the two weightings
+            state.tick_volumes = tick_profile.has_volume(mt5, state.symbol, int(times[first]), int(times[-1]))
+        if state.tick_volumes is not None:
+            binned = {time: (bucket, shares) for time, bucket, shares in
+                      tick_profile.bar_tick_shares(mt5, state.symbol, int(times[first]), int(times[-1]),
+                                                   bar_archive.TIMEFRAME_SECONDS[TIMEFRAME],
+                                                   VOLUME_PROFILE_BUCKET_SIZE, state.tick_volumes)}
+    for i in range(start, len(times) - 1):  # the last bar is still forming
+        close = float(closes[i])
+        state.ema_short.update(close)
+        state.ema_long.update(close)
+        high, low = float(highs[i]), float(lows[i])
+        state.atr.update(high, low, close)
+        state.swings.update(high, low)
+        shares = binned.get(int(times[i]))
+        if shares is None:  # Bars model, or no ticks in the terminal's history for this bar
+            shares = volume_profile.bar_shares(low, high, float(volumes[i]), VOLUME_PROFILE_BUCKET_SIZE)
+        state.volume_profile.add(*shares)
+        for profile in state.sessions.values():
+            profile.add(int(times[i]), *shares)
+        price = vwap.typical_price(high, low, close)
+        for session in state.vwaps.values():
+            session.update(int(times[i]), price, float(volumes[i]))
+        state.anchored_vwap.update(price, float(volumes[i]))
+        state.mtf.update(int(times[i]), float(opens[i]), high, low, close, float(volumes[i]))
+    if len(times) > 1:
+        state.indicators_until = int(times[-2])
+
+def session_levels(sessions):
+    """S/R candidates from the session profiles: last complete sessions' value areas and composite HVNs."""
+    weights = level_index.SOURCE_WEIGHTS
+    candidates = []
+    for kind in PROFILE_SESSIONS:
+        last = sessions[kind].last_closed()
+        area = volume_profile.value_area(*last) if last is not None else None
+        if area:
+            candidates.extend((price, 'session_vp', f'{kind} {name}', level_index.EITHER, weights['session_vp'])
+                              for name, price in area.items())
+    prices, profile = sessions['day'].composite(COMPOSITE_PROFILE_SESSIONS)
+    candidates.extend((price, 'composite_hvn', None, level_index.EITHER, weights['composite_hvn'] * scale)
+                      for price, scale in volume_profile.weighted_hvns(prices, profile,
+                                                                       volume_profile.node_thresholds(profile)))
+    return candidates
+
+def calculate_indicators(bars, state=None, symbol=None):
+    """
+    Calculates all required indicators on a Bars series (last bar forming). With a symbol
+    `state`, EMA/ATR come from the streaming state (only the last two values, which the
+    entry logic reads, are filled); without one they are computed over the whole series
+    with the 'ta' library, and the higher-timeframe levels are seeded from the terminal's
+    history of `symbol` as the state's are (from the bars alone without it).
+    """
+    n = len(bars)
+    result = SimpleNamespace()
+
+    if state is not None and n >= 2:
+        # --- EMA / ATR (streaming: closed bars once, then the forming bar) ---
+        advance_indicators(state)
+        high, low, close = bars.high[-1], bars.low[-1], bars.close[-1]
+        series = {'ema_short': (state.ema_short.current, state.ema_short.peek(close)),
+                  'ema_long': (state.ema_long.current, state.ema_long.peek(close)),
+                  'atr': (state.atr.current, state.atr.peek(high, low, close))}
+        for name, (closed_value, forming_value) in series.items():
+            values = np.full(n, np.nan)
+            values[-2], values[-1] = closed_value, forming_value
+            setattr(result, name, values)
     else:
-        # Create a default 'tick_volume' column if neither exists, to prevent errors in VP
-        df['tick_volume'] = 0.0 
-        print("Warning: Neither 'real_volume' nor 'tick_volume' found. Volume profile may not be accurate.")
+        # --- EMA / ATR (using 'ta' library, which works on pandas Series) ---
+        close = pd.Series(bars.close)
+        result.ema_short = EMAIndicator(close=close, window=EMA_SHORT_PERIOD, fillna=False).ema_indicator().values
+        result.ema_long = EMAIndicator(close=close, window=EMA_LONG_PERIOD, fillna=False).ema_indicator().values
+        result.atr = AverageTrueRange(high=pd.Series(bars.high), low=pd.Series(bars.low), close=close,
+                                      window=ATR_PERIOD, fillna=False).average_true_range().values
 
 
-    # --- EMA (using 'ta' library) ---
-    ema_short_indicator = EMAIndicator(close=df['close'], window=EMA_SHORT_PERIOD, fillna=False)
-    df['EMA_Short'] = ema_short_indicator.ema_indicator()
-    
-    ema_long_indicator = EMAIndicator(close=df['close'], window=EMA_LONG_PERIOD, fillna=False)
-    df['EMA_Long'] = ema_long_indicator.ema_indicator()
-
-    # --- ATR (using 'ta' library) ---
-    # Corrected usage: Instantiate AverageTrueRange
-    atr_calculator = AverageTrueRange(high=df['high'], low=df['low'], close=df['close'], window=ATR_PERIOD, fillna=False)
-    df['ATR'] = atr_calculator.average_true_range() # Method name is also correct here
-
-
-    # --- Fibonacci Retracement Levels (Manual) ---
-    # (No changes to this block)
-    fib_df = df.iloc[-FIB_RET_LOOKBACK_BARS:].copy()
+    # --- Fibonacci Retracement Levels (swing high/low over the last FIB_RET_LOOKBACK_BARS bars) ---
     fib_levels = {}
-    if not fib_df.empty:
-        swing_high = fib_df['high'].max()
-        swing_low = fib_df['low'].min()
-        
-        if swing_high != swing_low:
-            price_range = swing_high - swing_low
-            fib_levels['0.0%'] = swing_high
-            fib_levels['23.6%'] = swing_high - (0.236 * price_range)
-            fib_levels['38.2%'] = swing_high - (0.382 * price_range)
-            fib_levels['50.0%'] = swing_high - (0.500 * price_range)
-            fib_levels['61.8%'] = swing_high - (0.618 * price_range)
-            fib_levels['78.6%'] = swing_high - (0.786 * price_range)
-            fib_levels['100.0%'] = swing_low
-    df['fib_levels'] = [fib_levels] * len(df)
-
-
-    # --- Pivot Points (Manual Calculation) ---
-    pivot_points = {}
-    
-    # Resample to daily bars to get previous day's OHLC
-    daily_ohlc = df[['open', 'high', 'low', 'close']].resample('D').agg({
-        'open': 'first',
-        'high': 'max',
-        'low': 'min',
-        'close': 'last'
-    }).dropna()
-
-    if len(daily_ohlc) >= 2: # Ensure we have at least the previous complete day's data
-        prev_day = daily_ohlc.iloc[-2] # Get the OHLC of the previous complete day
-        
-        high = prev_day['high']
-        low = prev_day['low']
-        close = prev_day['close']
-        
-        pp = (high + low + close) / 3
-        r1 = (2 * pp) - low
-        s1 = (2 * pp) - high
-        r2 = pp + (high - low)
-        s2 = pp - (high - low)
-        r3 = high + (2 * (pp - low))
-        s3 = low - (2 * (high - pp))
-
-        pivot_points['PP'] = pp
-        pivot_points['R1'] = r1
-        pivot_points['R2'] = r2
-        pivot_points['R3'] = r3
-        pivot_points['S1'] = s1
-        pivot_points['S2'] = s2
-        pivot_points['S3'] = s3
+    anchors = {}  # bars ago of the swing high/low, for the anchored VWAPs
+    if state is not None and n >= 2:
+        swing = state.swings.levels(FIB_RET_LOOKBACK_BARS, bars.high[-1], bars.low[-1])
+        if swing is not None:
+            fib_levels = swing['fib_levels']
+            anchors = {'swing_high': swing['swing_high_bars_ago'], 'swing_low': swing['swing_low_bars_ago']}
+    elif n:
+        highs = bars.high[-FIB_RET_LOOKBACK_BARS:]
+        lows = bars.low[-FIB_RET_LOOKBACK_BARS:]
+        # Last occurrence of each extreme, as the rolling deques keep it
+        high_seq = len(highs) - 1 - int(np.argmax(highs[::-1]))
+        low_seq = len(lows) - 1 - int(np.argmin(lows[::-1]))
+        fib_levels = swing_levels.fib_levels(float(highs[high_seq]), float(lows[low_seq]), high_seq, low_seq)
+        anchors = {'swing_high': len(highs) - 1 - high_seq, 'swing_low': len(lows) - 1 - low_seq}
+    result.fib_levels = fib_levels
+
+
+    # --- Pivot Points (once per server-time trading day) ---
+    if state is not None:
+        pivot_variants = state.pivots.get(mt5, state.symbol, bars)
+    else:
+        prev_day = pivots.previous_day_from_bars(bars.time, bars.open, bars.high, bars.low, bars.close,
+                                                 pivots.server_day(bars.time[-1])) if n else None
+        pivot_variants = pivots.all_pivots(*prev_day) if prev_day else None
+    if pivot_variants:
+        result.pivot_points = pivot_variants[PIVOT_METHOD]
     else:
         # print("Warning: Not enough daily data for pivot point calculation. Pivot points set to NaN.")
-        pivot_points = {k: np.nan for k in ['PP', 'R1', 'R2', 'R3', 'S1', 'S2', 'S3']}
-
-    df['pivot_points'] = [pivot_points] * len(df)
-
-
-    # --- High Volume Nodes (HVN) / Low Volume Nodes (LVN) (Volume Profile - Basic) ---
-    volume_profile = {}
-    vp_df = df.iloc[-VOLUME_PROFILE_LOOKBACK_BARS:].copy()
-    if not vp_df.empty:
-        min_price = vp_df['low'].min()
-        max_price = vp_df['high'].max()
-        
-        if (max_price - min_price) <= 0: # Handle cases where price range is zero (e.g., flat data)
-            df['hvns'] = [[]] * len(df)
-            df['lvns'] = [[]] * len(df)
-            return df # Exit early if no price range
-
-        num_buckets = int((max_price - min_price) / VOLUME_PROFILE_BUCKET_SIZE) + 1
-        price_bins = np.linspace(min_price, max_price, num_buckets)
-        
-        # Determine which volume column to use
-        volume_col = 'real_volume' if 'real_volume' in vp_df.columns else 'tick_volume'
-
-        for i in range(len(vp_df)):
-            bar_high = vp_df['high'].iloc[i]
-            bar_low = vp_df['low'].iloc[i]
-            bar_volume = vp_df[volume_col].iloc[i] # Use the determined volume column
-            
-            for j in range(len(price_bins) - 1):
-                bucket_low = price_bins[j]
-                bucket_high = price_bins[j+1]
-                
-                if max(bucket_low, bar_low) < min(bucket_high, bar_high):
-                    overlap_range = min(bucket_high, bar_high) - max(bucket_low, bar_low)
-                    bar_range = bar_high - bar_low
-                    if bar_range > 0:
-                        volume_in_bucket = bar_volume * (overlap_range / bar_range)
-                        avg_price_in_bucket = (bucket_low + bucket_high) / 2
-                        volume_profile[avg_price_in_bucket] = volume_profile.get(avg_price_in_bucket, 0) + volume_in_bucket
-                    else: # Handle zero-range bars (e.g., dojis) by assigning volume to the bucket containing the close
-                        avg_price_in_bucket = (bucket_low + bucket_high) / 2
-                        if bucket_low <= bar_high <= bucket_high:
-                            volume_profile[avg_price_in_bucket] = volume_profile.get(avg_price_in_bucket, 0) + bar_volume
-            
-        if volume_profile: # Check if volume_profile dict is populated
-            sorted_vp = sorted(volume_profile.items(), key=lambda item: item[1], reverse=True)
-            
-            hvn_threshold = sorted_vp[int(len(sorted_vp) * 0.1)][1] if len(sorted_vp) > 0 else 0
-            lvn_threshold = sorted_vp[int(len(sorted_vp) * 0.9)][1] if len(sorted_vp) > 0 else 0
-
-            hvns = [price for price, vol in volume_profile.items() if vol >= hvn_threshold]
-            lvns = [price for price, vol in volume_profile.items() if vol <= lvn_threshold]
-            
-            df['hvns'] = [hvns] * len(df)
-            df['lvns'] = [lvns] * len(df)
-        else: # If volume_profile is empty, set empty lists
-            df['hvns'] = [[]] * len(df)
-            df['lvns'] = [[]] * len(df)
-    else: # If vp_df is empty, set empty lists
-        df['hvns'] = [[]] * len(df)
-        df['lvns'] = [[]] * len(df)
-
-    return df
+        result.pivot_points = {k: np.nan for k in pivots.PIVOT_KEYS}
+
+
+    # --- High Volume Nodes (HVN) / Low Volume Nodes (LVN) and value area (Volume Profile) ---
+    volumes = bars[volume_column(bars.columns)]
+    if state is not None and n >= 2:
+        # Sliding-window profile: closed bars were folded in by advance_indicators
+        forming_shares = None
+        if VOLUME_PROFILE_SOURCE == 'ticks' and state.tick_volumes is not None:
+            seconds = bar_archive.TIMEFRAME_SECONDS[TIMEFRAME]
+            forming_shares = next((binned[1:] for binned in tick_profile.bar_tick_shares(
+                mt5, state.symbol, int(bars.time[-1]), int(bars.time[-1]) + seconds, seconds,
+                VOLUME_PROFILE_BUCKET_SIZE, state.tick_volumes)), None)
+        if forming_shares is not None:
+            prices, profile, thresholds = state.volume_profile.profile(forming_shares=forming_shares)
+        else:
+            prices, profile, thresholds = state.volume_profile.profile((bars.low[-1], bars.high[-1], volumes[-1]))
+    else:
+        window = slice(-VOLUME_PROFILE_LOOKBACK_BARS, None)
+        prices, profile = volume_profile.build_profile(bars.low[window], bars.high[window], volumes[window],
+                                                       VOLUME_PROFILE_BUCKET_SIZE)
+        thresholds = volume_profile.node_thresholds(profile)
+    result.hvns, result.lvns = volume_profile.split_nodes(prices, profile, thresholds)
+    result.hvn_nodes = volume_profile.weighted_hvns(prices, profile, thresholds)
+    result.value_area = volume_profile.value_area(prices, profile)
+
+
+    # --- Higher-timeframe EMAs/fibs, weekly pivots/value area and session profiles (rolled up from these bars) ---
+    if state is not None and n >= 2:
+        mtf, sessions, vwaps, anchored = state.mtf, state.sessions, state.vwaps, state.anchored_vwap
+    else:
+        mtf, sessions = new_mtf_levels(), new_session_profiles()
+        if symbol is not None and n >= 2:
+            mtf.seed(mt5, symbol, int(bars.time[0]), volume_column(bars.columns))
+        vwaps, anchored = {kind: vwap.SessionVWAP(kind) for kind in VWAP_SESSIONS}, vwap.AnchoredVWAP(FIB_RET_LOOKBACK_BARS)
+        for i in range(n - 1):
+            opened, high, low, close = int(bars.time[i]), float(bars.high[i]), float(bars.low[i]), float(bars.close[i])
+            volume = float(volumes[i])
+            mtf.update(opened, float(bars.open[i]), high, low, close, volume)
+            shares = volume_profile.bar_shares(low, high, volume, VOLUME_PROFILE_BUCKET_SIZE)
+            for profile in sessions.values():
+                profile.add(opened, *shares)
+            price = vwap.typical_price(high, low, close)
+            for session in vwaps.values():
+                session.update(opened, price, volume)
+            anchored.update(price, volume)
+    result.mtf_levels = mtf.levels()
+    result.session_levels = session_levels(sessions)
+
+
+    # --- Session and anchored VWAP bands (forming bar included) ---
+    result.vwap_levels = []
+    if n:
+        price, volume = float(vwap.typical_price(bars.high[-1], bars.low[-1], bars.close[-1])), float(volumes[-1])
+        lines = {kind: session.peek(int(bars.time[-1]), price, volume) for kind, session in vwaps.items()}
+        lines.update((name, anchored.since(bars_ago, (price, volume))) for name, bars_ago in anchors.items())
+        weights = level_index.SOURCE_WEIGHTS
+        for anchor, (line, stdev) in lines.items():
+            source = 'vwap' if anchor in vwaps else 'avwap'
+            result.vwap_levels.extend((level, source, f'{anchor} {name}', level_index.EITHER, weights[source])
+                                      for name, level in vwap.bands(line, stdev, VWAP_BAND_STDEVS).items())
+
+    return result
 
 def get_current_price(symbol):
     """Gets the current bid and ask prices."""
     tick = mt5.symbol_info_tick(symbol)
     if tick is None:
-        print(f"Failed to get tick for {symbol}, error code: {mt5.last_error()}")
+        log.error("Failed to get tick for %s, error code: %s", symbol, mt5.last_error())
         return None, None
     return tick.bid, tick.ask
 
@@ -254,19 +517,19 @@ def calculate_lot_size(symbol, risk_percent, sl_points):
     """
     account_info = mt5.account_info()
     if account_info is None:
-        print("Failed to get account info for lot size calculation.")
+        log.error("Failed to get account info for lot size calculation.")
         return 0.0
 
     equity = account_info.equity
     if equity <= 0:
-        print("Account equity is zero or negative. Cannot calculate lot size.")
+        log.error("Account equity is zero or negative. Cannot calculate lot size.")
         return 0.0
 
     risk_amount = equity * risk_percent
     
     symbol_info = mt5.symbol_info(symbol)
     if symbol_info is None:
-        print(f"Failed to get symbol info for {symbol}.")
+        log.error("Failed to get symbol info for %s.", symbol)
         return 0.0
 
     # For XAUUSD, value of 1 point (0.01) for 1 lot (100 units) is $1.
@@ -276,7 +539,7 @@ def calculate_lot_size(symbol, risk_percent, sl_points):
     cost_per_point_per_lot = 1.0 # This is typically $1 for XAUUSD per 0.01 point for a 1 standard lot
                                  
     if sl_points == 0:
-        print("Stop Loss in points is zero. Cannot calculate lot size.")
+        log.error("Stop Loss in points is zero. Cannot calculate lot size.")
         return 0.0
 
     calculated_volume = risk_amount / (sl_points * cost_per_point_per_lot)
@@ -291,8 +554,8 @@ def calculate_lot_size(symbol, risk_percent, sl_points):
 
     return calculated_volume
 
-def send_order(symbol, trade_type, volume, price, sl, tp, comment=""):
-    """Sends a trade order."""
+def send_order(symbol, trade_type, volume, price, sl, tp, comment="", context=None):
+    """Sends a trade order. `context` is the signal context stored with the journal entry."""
     request = {
         "action": mt5.TRADE_ACTION_DEAL,
         "symbol": symbol,
@@ -302,7 +565,7 @@ def send_order(symbol, trade_type, volume, price, sl, tp, comment=""):
         "sl": sl,
         "tp": tp,
         "deviation": 20, # Max allowed deviation from the requested price
-        "magic": 20230623, # Unique identifier for your bot's orders
+        "magic": MAGIC_NUMBER,
         "comment": comment,
         "type_time": mt5.ORDER_TIME_GTC,
         "type_filling": mt5.ORDER_FILLING_FOK, # Fill or Kill
@@ -310,24 +573,144 @@ def send_order(symbol, trade_type, volume, price, sl, tp, comment=""):
 
     result = mt5.order_send(request)
     if result.retcode != mt5.TRADE_RETCODE_DONE:
-        print(f"Order failed: {result.retcode}, comment: {result.comment}")
+        METRICS.inc("orders_failed_total", symbol=symbol, retcode=result.retcode)
+        if journal:
+            journal.record("order_failed", symbol, MAGIC_NUMBER, trade_type, None, volume, price, sl, tp,
+                           result.retcode, context)
+        log.error("Order failed: %s, comment: %s", result.retcode, result.comment)
         return None
     else:
-        print(f"Order successful: {trade_type} {volume:.2f} {symbol} at {price:.5f}. Ticket: {result.order}")
+        METRICS.inc("orders_sent_total", symbol=symbol, retcode=result.retcode)
+        if journal:
+            # The deal price is the fill; fall back to the requested price if the terminal omits it
+            journal.record("order", symbol, MAGIC_NUMBER, trade_type, result.order, volume,
+                           getattr(result, "price", 0.0) or price, sl, tp, result.retcode, context)
+        log.info("Order successful: %s %.2f %s at %.5f. Ticket: %s", trade_type, volume, symbol, price, result.order)
         return result.order
 
-def manage_trades():
+def manage_trades(symbol=SYMBOL):
     """Checks for open positions and manages them (e.g., trailing stop, partial close)."""
-    positions = mt5.positions_get(symbol=SYMBOL)
-    if positions:
-        print(f"\n--- Open Positions for {SYMBOL} ---")
+    positions = mt5.positions_get(symbol=symbol)
+    if positions and log.isEnabledFor(logging.INFO):
+        log.info("--- Open Positions for %s ---", symbol)
         for position in positions:
-            print(f"  Ticket: {position.ticket}, Type: {'BUY' if position.type == mt5.ORDER_TYPE_BUY else 'SELL'}, Volume: {position.volume:.2f}, "
-                  f"Price: {position.price_open:.5f}, Current Price: {position.price_current:.5f}, "
-                  f"Profit: {position.profit:.2f}")
-        print("----------------------------\n")
+            log.info("  Ticket: %s, Type: %s, Volume: %.2f, Price: %.5f, Current Price: %.5f, Profit: %.2f",
+                     position.ticket, 'BUY' if position.type == mt5.ORDER_TYPE_BUY else 'SELL', position.volume,
+                     position.price_open, position.price_current, position.profit)
     # else:
-    # print(f"No open positions for {SYMBOL}.") # Keep silent if no positions
+    # print(f"No open positions for {symbol}.") # Keep silent if no positions
+
+    # Positions that disappeared since the last pass were closed (SL/TP or manually)
+    current = {p.ticket: p for p in positions} if positions else {}
+    if journal:
+        for ticket, position in last_positions.get(symbol, {}).items():
+            if ticket not in current:
+                journal_close(symbol, position)
+    last_positions[symbol] = current
+
+def journal_close(symbol, position):
+    """
+    Journals a closed position at its closing deals: exit price, realised profit and deal time.
+    Until the terminal's history has them, the last values seen are recorded and flagged.
+    """
+    side = 'BUY' if position.type == mt5.ORDER_TYPE_BUY else 'SELL'
+    deals = [deal for deal in mt5.history_deals_get(position=position.ticket) or ()
+             if deal.entry != mt5.DEAL_ENTRY_IN]
+    if not deals:
+        journal.record("close", symbol, position.magic, side, position.ticket, position.volume,
+                       position.price_current, position.sl, position.tp,
+                       context={"price_open": position.price_open, "last_profit": position.profit,
+                                "deal_missing": True})
+        return
+    volume = sum(deal.volume for deal in deals)
+    price = sum(deal.price * deal.volume for deal in deals) / volume if volume else deals[-1].price
+    profit = sum(deal.profit + deal.commission + deal.swap + getattr(deal, "fee", 0.0) for deal in deals)
+    journal.record("close", symbol, position.magic, side, position.ticket, volume, price, position.sl, position.tp,
+                   context={"price_open": position.price_open, "profit": profit,
+                            "deal": deals[-1].ticket, "deal_time_msc": deals[-1].time_msc})
+
+def journal_fill(symbol, side, order):
+    """
+    Journals the fill of a resting order the terminal no longer lists, from its opening deal;
+    False if it has none (cancelled or expired). The position is then watched like the others,
+    so a close in the same pass is journaled too.
+    """
+    deals = mt5.history_deals_get(position=order.ticket)
+    fills = [deal for deal in deals or () if deal.entry == mt5.DEAL_ENTRY_IN]
+    if not fills:
+        return False
+    deal = fills[0]
+    if journal:
+        journal.record("fill", symbol, MAGIC_NUMBER, side, order.ticket, deal.volume, deal.price, order.sl, order.tp,
+                       context={"order_price": order.price, "deal": deal.ticket, "deal_time_msc": deal.time_msc})
+    last_positions.setdefault(symbol, {}).setdefault(order.ticket, SimpleNamespace(
+        ticket=order.ticket, magic=MAGIC_NUMBER, type=mt5.ORDER_TYPE_BUY if side == 'BUY' else mt5.ORDER_TYPE_SELL,
+        volume=deal.volume, price_open=deal.price, price_current=deal.price, sl=order.sl, tp=order.tp, profit=0.0))
+    return True
+
+def zone_order_intents(symbol, symbol_info, support_zone, resistance_zone, bid, ask, atr):
+    """
+    Resting orders wanted at the nearest zones: buy at the top of a zone, sell at its bottom
+    (support/resistance for limits, the other way round for stops). Skipped while price is inside.
+    """
+    limit = PENDING_ORDER_KIND == "limit"
+    if limit:
+        sides = (('BUY', support_zone, mt5.ORDER_TYPE_BUY_LIMIT), ('SELL', resistance_zone, mt5.ORDER_TYPE_SELL_LIMIT))
+    else:
+        sides = (('BUY', resistance_zone, mt5.ORDER_TYPE_BUY_STOP), ('SELL', support_zone, mt5.ORDER_TYPE_SELL_STOP))
+    intents = {}
+    for side, zone, order_type in sides:
+        if zone is None:
+            continue
+        direction = 1 if side == 'BUY' else -1
+        price = round(zone.high if side == 'BUY' else zone.low, symbol_info.digits)
+        # Limits rest on the far side of the spread, stops beyond it
+        if (side == 'BUY' and (price >= ask if limit else price <= ask)) or \
+           (side == 'SELL' and (price <= bid if limit else price >= bid)):
+            continue
+        sl = round(price - direction * atr * SL_MULTIPLIER, symbol_info.digits)
+        tp = round(price + direction * atr * TP_MULTIPLIER, symbol_info.digits)
+        volume = calculate_lot_size(symbol, RISK_PERCENT_PER_TRADE, abs(price - sl) / symbol_info.point)
+        if volume > 0:
+            intents[side] = pending_orders.OrderIntent(side, order_type, price, sl, tp, volume)
+    return intents
+
+def rest_orders(symbol, intents, atr, open_trades=0, price=None):
+    """
+    Reconciles the symbol's resting orders with `intents`, journaling each request sent. Resting
+    orders count against MAX_TRADE_COUNT with the `open_trades` positions: when there are fewer
+    free slots than intents, only the ones nearest `price` rest and the others are removed.
+    """
+    resting = symbol_state(symbol).resting
+    gone = resting.sync(mt5)
+    for side, order in gone:
+        if journal_fill(symbol, side, order):
+            log.info("Resting %s order for %s filled (ticket %s).", side, symbol, order.ticket)
+        else:
+            log.info("Resting %s order for %s no longer working (cancelled or expired).", side, symbol)
+    if gone:
+        open_trades = get_open_trades_count(symbol)  # A fill since the count was taken is a position now
+    slots = max(0, MAX_TRADE_COUNT - open_trades)
+    if len(intents) > slots:
+        nearest = sorted(intents.values(), key=lambda intent: abs(intent.price - price))[:slots]
+        intents = {intent.side: intent for intent in nearest}
+    for action, side, result in resting.reconcile(mt5, intents, atr * PENDING_REPLACE_ATR_FRACTION,
+                                                  "Multi-Indicator Resting"):
+        retcode = result.retcode if result is not None else None
+        METRICS.inc("pending_requests_total", symbol=symbol, action=action, retcode=retcode)
+        intent = intents.get(side) if action != 'remove' else None
+        if journal:
+            journal.record(f"pending_{action}", symbol, MAGIC_NUMBER, side, result.order if result else None,
+                           intent.volume if intent else None, intent.price if intent else None,
+                           intent.sl if intent else None, intent.tp if intent else None, retcode)
+        if result is None or result.retcode not in (mt5.TRADE_RETCODE_DONE, mt5.TRADE_RETCODE_PLACED):
+            log.error("Resting order %s (%s %s) failed: %s", action, side, symbol,
+                      result.comment if result is not None else mt5.last_error())
+        elif intent is not None:
+            log.info("Resting order %s: %s %s at %.5f (SL %.5f, TP %.5f)", action, side, symbol, intent.price,
+                     intent.sl, intent.tp)
+        else:
+            log.info("Resting order %s: %s %s", action, side, symbol)
 
 def get_open_trades_count(symbol):
     """Returns the number of open trades for a given symbol."""
@@ -336,226 +719,345 @@ def get_open_trades_count(symbol):
         return len(positions)
     return 0
 
+FIB_SNR_LEVELS = ['0.0%', '23.6%', '38.2%', '50.0%', '61.8%', '78.6%', '100.0%']  # Fib levels used as S/R
+FIB_EXTENSION_LEVELS = ['127.2%', '161.8%', '261.8%']  # Extensions beyond the swing, S/R as 'fib_ext'
+# Levels that confirm an entry when price is within the confluence tolerance (plus the closest S/R)
+BUY_CONFLUENCE_TAGS = {('hvn', None), ('pivot', 'S1'), ('fib', '61.8%'), ('fib', '50.0%'), ('fib_ext', None),
+                       ('htf_fib', '61.8%'), ('htf_fib', '50.0%'), ('weekly_pivot', 'S1'), ('weekly_vp', 'POC'),
+                       ('session_vp', 'day POC'), ('composite_hvn', None),
+                       ('vwap', 'day VWAP'), ('avwap', 'swing_low VWAP')}
+SELL_CONFLUENCE_TAGS = {('hvn', None), ('pivot', 'R1'), ('fib', '38.2%'), ('fib', '50.0%'), ('fib_ext', None),
+                        ('htf_fib', '38.2%'), ('htf_fib', '50.0%'), ('weekly_pivot', 'R1'), ('weekly_vp', 'POC'),
+                        ('session_vp', 'day POC'), ('composite_hvn', None),
+                        ('vwap', 'day VWAP'), ('avwap', 'swing_high VWAP')}
+ZONE_ATR_FRACTION = 0.25  # Levels closer than this fraction of ATR merge into one S/R zone
+MIN_ZONE_STRENGTH = 1.0  # Weaker zones (e.g. a lone EMA) are not treated as S/R
+
+def build_level_index(fib_levels, pivot_points, ema_short, ema_long, hvn_nodes, extra=()):
+    """
+    All S/R candidates of a pass in one sorted index, plus `extra` ready-made candidates
+    (higher-timeframe levels). Pivot S*/R* act on one side only; HVNs are (price, volume
+    weight) pairs from volume_profile.weighted_hvns.
+    """
+    weights = level_index.SOURCE_WEIGHTS
+    candidates = [(price, 'fib', name, level_index.EITHER, weights['fib'])
+                  for name, price in fib_levels.items() if name in FIB_SNR_LEVELS]
+    candidates.extend((price, 'fib_ext', name, level_index.EITHER, weights['fib_ext'])
+                      for name, price in fib_levels.items() if name in FIB_EXTENSION_LEVELS)
+    for name, price in (pivot_points or {}).items():
+        role = level_index.SUPPORT if name.startswith('S') else \
+               level_index.RESISTANCE if name.startswith('R') else level_index.EITHER
+        candidates.append((price, 'pivot', name, role, weights['pivot']))
+    candidates.append((ema_short, 'ema', 'EMA_Short', level_index.EITHER, weights['ema']))
+    candidates.append((ema_long, 'ema', 'EMA_Long', level_index.EITHER, weights['ema']))
+    candidates.extend((price, 'hvn', None, level_index.EITHER, weights['hvn'] * scale) for price, scale in hvn_nodes)
+    candidates.extend(extra)
+    return level_index.LevelIndex(candidates)
+
+def scan_bars(timeframe):
+    """Bars the watchlist screen needs: EMA/ATR warm-up, the fib window and the previous day."""
+    lookbacks = {name: lookback for name, lookback in indicator_lookbacks(timeframe).items()
+                 if name in ('ema_short', 'ema_long', 'atr', 'fib')}
+    lookbacks['pivots'] = fetch_planner.sessions_lookback(2, bar_archive.TIMEFRAME_SECONDS[timeframe])
+    return fetch_planner.plan_bars(lookbacks)
+
+def scan_watchlist(symbols):
+    """Setups among `symbols` from one batch screen of their latest bars, nearest level first."""
+    count = scan_bars(TIMEFRAME)
+    series = {symbol: mt5.copy_rates_from_pos(symbol, TIMEFRAME, 0, count) for symbol in symbols}
+    names, matrices = scanner.stack_bars(series, count)
+    if len(names) < len(symbols):
+        log.debug("Not enough bars to screen: %s", sorted(set(symbols) - set(names)))
+    return scanner.scan(names, matrices, (EMA_SHORT_PERIOD, EMA_LONG_PERIOD), ATR_PERIOD, FIB_RET_LOOKBACK_BARS,
+                        SCAN_ATR_FRACTION)
+
+def run_watchlist(symbols):
+    """Full passes for the watchlist symbols that pass the screen; trades of the others are still managed."""
+    screened = set()
+    positions = mt5.positions_get()
+    open_symbols = {position.symbol for position in positions} if positions else set()
+    for setup in scan_watchlist(symbols):
+        symbol_info = mt5.symbol_info(setup.symbol)
+        if symbol_info is None:
+            continue
+        log.info("Screened setup: %s %s (%.2f ATR from a level%s)", setup.symbol, setup.side, setup.distance,
+                 ", EMA crossover" if setup.crossover else "")
+        with bot_metrics.timed(symbol=setup.symbol):
+            run_cycle(setup.symbol, symbol_info)
+        screened.add(setup.symbol)
+    for symbol in symbols:
+        if symbol not in screened and (last_positions.get(symbol) or symbol in open_symbols):
+            manage_trades(symbol)
+
+def run_cycle(symbol, symbol_info):
+    """Runs one fetch/indicator/entry pass for a symbol. Returns seconds to wait before the next pass."""
+    # Smallest point value for this symbol (e.g., 0.00001 for EURUSD, 0.01 for XAUUSD)
+    point = symbol_info.point
+
+    # Bars to fetch come from the indicators' declared lookbacks (including EMA/ATR warm-up)
+    data = get_market_data(symbol, TIMEFRAME, planned_bars(TIMEFRAME))
+    
+    # Check if enough data is available AFTER potential NaNs from indicator calculations
+    required_valid_bars = max(EMA_LONG_PERIOD, ATR_PERIOD) # Min bars for the 'ta' lib to return valid values
+    if data is None or len(data) < required_valid_bars + 1:
+        log.warning("Not enough market data for indicator calculation (or too many NaNs). Waiting...")
+        return 60
+
+    indicators = calculate_indicators(data, symbol_state(symbol))
+    
+    # Ensure indicators are calculated (no NaNs at the end)
+    # EMA/ATR are NaN until they have seen `window` bars, so make sure the latest values are valid.
+    # Also check that the level dictionaries are not empty
+    if np.isnan(indicators.ema_short[-1]) or np.isnan(indicators.atr[-1]) or \
+       not indicators.pivot_points or not indicators.fib_levels:
+        log.warning("Indicators not fully calculated yet (NaNs or empty dictionaries for latest bar). Waiting for more data...")
+        return 60
+
+    current_bid, current_ask = get_current_price(symbol)
+    if current_bid is None or current_ask is None:
+        return 5
+
+    last_close = data.close[-1]
+    current_ema_short = indicators.ema_short[-1]
+    current_ema_long = indicators.ema_long[-1]
+    current_atr = indicators.atr[-1]
+    current_fib_levels = indicators.fib_levels
+    current_pivot_points = indicators.pivot_points
+    current_hvns = indicators.hvns
+    current_lvns = indicators.lvns
+
+    account_info_latest = mt5.account_info()
+    if account_info_latest:
+        METRICS.set("equity", account_info_latest.equity)
+    if journal:
+        METRICS.set("journal_dropped_rows", journal.errors)
+
+    # Verbose per-cycle dump: only queued when DEBUG is enabled, and formatted by the log writer thread
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("--- Market Data & Indicators for %s (%s) ---", symbol, get_timeframe_name(TIMEFRAME))
+        log.debug("Current Price: Bid=%.5f, Ask=%.5f", current_bid, current_ask)
+        log.debug("EMAs: Short=%.5f, Long=%.5f", current_ema_short, current_ema_long)
+        log.debug("ATR (%d): %.5f", ATR_PERIOD, current_atr)
+        log.debug("Fibonacci Levels: %s", LazyLevels(current_fib_levels))
+        log.debug("Pivot Points: %s", LazyLevels(current_pivot_points))
+        log.debug("High Volume Nodes (HVNs): %s", LazyPrices(current_hvns))
+        log.debug("Low Volume Nodes (LVNs): %s", LazyPrices(current_lvns))
+        log.debug("Value Area: %s", LazyLevels(indicators.value_area))
+        log.debug("Higher-timeframe levels: %s", LazyLevels({f"{source} {name}": price for price, source, name, _, _
+                                                              in indicators.mtf_levels}))
+        log.debug("Session levels: %s", LazyLevels({f"{source} {name}": price for price, source, name, _, _
+                                                     in indicators.session_levels if name is not None}))
+        log.debug("VWAP levels: %s", LazyLevels({name: price for price, _, name, _, _ in indicators.vwap_levels}))
+        if account_info_latest:
+            log.debug("Account Equity: %.2f", account_info_latest.equity)
+        else:
+            log.debug("Could not retrieve latest account equity.")
+
+    open_trades = get_open_trades_count(symbol)
+    METRICS.set("open_positions", open_trades, symbol=symbol)
+
+    if open_trades < MAX_TRADE_COUNT:
+        # --- Define your combined SNR and Entry Logic here ---
+        
+        levels = build_level_index(current_fib_levels, current_pivot_points, current_ema_short, current_ema_long,
+                                   indicators.hvn_nodes, indicators.mtf_levels + indicators.session_levels +
+                                   indicators.vwap_levels)
+
+        zones = levels.zones(current_atr * ZONE_ATR_FRACTION, MIN_ZONE_STRENGTH)
+
+        # Closest relevant zones: supports below the bid, resistances above the ask
+        support_zone = zones.nearest_below(current_bid)
+        resistance_zone = zones.nearest_above(current_ask)
+        closest_support = support_zone.price if support_zone else -np.inf
+        closest_resistance = resistance_zone.price if resistance_zone else np.inf
+        
+        confluence_tolerance = current_atr * 0.25 # ATR based tolerance for proximity
+
+        # Watch the zones, widened by the tolerance, until the next pass
+        triggers.set_bands(symbol, [(zone.low - confluence_tolerance, zone.high + confluence_tolerance)
+                                    for zone in zones.zones], current_bid)
+
+        if ENTRY_MODE == "pending":
+            rest_orders(symbol, zone_order_intents(symbol, symbol_info, support_zone, resistance_zone, current_bid,
+                                                   current_ask, current_atr), current_atr,
+                        open_trades, current_bid)
+            manage_trades(symbol)
+            return CYCLE_SECONDS
+
+        # --- BUY ENTRY LOGIC ---
+        # Check for enough data for previous EMA values
+        if len(data) >= 2:
+            prev_ema_short = indicators.ema_short[-2]
+            prev_ema_long = indicators.ema_long[-2]
+            prev_close = data.close[-2]
+        else: # Not enough data for comparison
+            prev_ema_short = current_ema_short
+            prev_ema_long = current_ema_long
+            prev_close = last_close # Fallback
+
+        ema_crossover_buy = (prev_ema_short < prev_ema_long) and \
+                             (current_ema_short > current_ema_long)
+        
+        is_near_support_confluence = abs(current_bid - closest_support) < confluence_tolerance or \
+                                     zones.near(current_bid, confluence_tolerance, BUY_CONFLUENCE_TAGS)
+
+        has_bounced_from_support = (is_near_support_confluence and last_close > prev_close)
+
+        if (ema_crossover_buy and has_bounced_from_support) or \
+           (abs(current_bid - closest_support) < confluence_tolerance and has_bounced_from_support):
+            
+            sl_price = round(current_ask - (current_atr * SL_MULTIPLIER), symbol_info.digits)
+            tp_price = round(current_ask + (current_atr * TP_MULTIPLIER), symbol_info.digits)
+
+            # Ensure SL is not above entry for buy, add a small buffer if too close
+            if sl_price >= current_ask: sl_price = current_ask - (symbol_info.point * 10) # 10 points below
+            
+            stop_loss_points = abs(current_ask - sl_price) / point
+            calculated_volume = calculate_lot_size(symbol, RISK_PERCENT_PER_TRADE, stop_loss_points)
+
+            if calculated_volume > 0:
+                log.info("--- BUY SIGNAL --- Reason: EMA bullish crossover and near support confluence.",
+                         extra={"fields": {"symbol": symbol, "volume": calculated_volume, "sl": sl_price, "tp": tp_price}})
+                context = {"reason": "ema_cross_buy" if ema_crossover_buy else "support_bounce",
+                           "bid": current_bid, "ask": current_ask, "ema_short": current_ema_short,
+                           "ema_long": current_ema_long, "atr": current_atr, "closest_support": closest_support,
+                           "support_strength": support_zone.strength if support_zone else 0.0,
+                           "confluence_tolerance": confluence_tolerance}
+                if journal:
+                    journal.record("signal", symbol, MAGIC_NUMBER, "BUY", volume=calculated_volume, price=current_ask,
+                                   sl=sl_price, tp=tp_price, context=context)
+                send_order(symbol, "BUY", calculated_volume, current_ask, sl_price, tp_price, "Multi-Indicator Buy", context)
+                time.sleep(ORDER_PAUSE_SECONDS)
+            else:
+                log.warning("Calculated BUY volume is zero or too small: %.5f. Skipping trade.", calculated_volume)
+
+
+        # --- SELL ENTRY LOGIC ---
+        ema_crossover_sell = (prev_ema_short > prev_ema_long) and \
+                              (current_ema_short < current_ema_long)
+        
+        is_near_resistance_confluence = abs(current_bid - closest_resistance) < confluence_tolerance or \
+                                        zones.near(current_bid, confluence_tolerance, SELL_CONFLUENCE_TAGS)
+
+        has_bounced_from_resistance = (is_near_resistance_confluence and last_close < prev_close)
+
+        if (ema_crossover_sell and has_bounced_from_resistance) or \
+           (abs(current_bid - closest_resistance) < confluence_tolerance and has_bounced_from_resistance):
+            
+            sl_price = round(current_bid + (current_atr * SL_MULTIPLIER), symbol_info.digits)
+            tp_price = round(current_bid - (current_atr * TP_MULTIPLIER), symbol_info.digits)
+
+            # Ensure SL is not below entry for sell, add a small buffer if too close
+            if sl_price <= current_bid: sl_price = current_bid + (symbol_info.point * 10) # 10 points above
+
+            stop_loss_points = abs(current_bid - sl_price) / point
+            calculated_volume = calculate_lot_size(symbol, RISK_PERCENT_PER_TRADE, stop_loss_points)
+
+            if calculated_volume > 0:
+                log.info("--- SELL SIGNAL --- Reason: EMA bearish crossover and near resistance confluence.",
+                         extra={"fields": {"symbol": symbol, "volume": calculated_volume, "sl": sl_price, "tp": tp_price}})
+                context = {"reason": "ema_cross_sell" if ema_crossover_sell else "resistance_bounce",
+                           "bid": current_bid, "ask": current_ask, "ema_short": current_ema_short,
+                           "ema_long": current_ema_long, "atr": current_atr, "closest_resistance": closest_resistance,
+                           "resistance_strength": resistance_zone.strength if resistance_zone else 0.0,
+                           "confluence_tolerance": confluence_tolerance}
+                if journal:
+                    journal.record("signal", symbol, MAGIC_NUMBER, "SELL", volume=calculated_volume, price=current_bid,
+                                   sl=sl_price, tp=tp_price, context=context)
+                send_order(symbol, "SELL", calculated_volume, current_bid, sl_price, tp_price, "Multi-Indicator Sell", context)
+                time.sleep(ORDER_PAUSE_SECONDS)
+            else:
+                log.warning("Calculated SELL volume is zero or too small: %.5f. Skipping trade.", calculated_volume)
+    else:
+        log.info("Maximum allowed trades (%d) already open for %s. No new trades.", MAX_TRADE_COUNT, symbol)
+        triggers.set_bands(symbol, (), current_bid)  # Nothing to enter, nothing to watch
+        if ENTRY_MODE == "pending":
+            rest_orders(symbol, {}, current_atr)
+
+    manage_trades(symbol)
+
+    return CYCLE_SECONDS
+
+def note_triggers(events, triggered):
+    """Logs/counts trigger events and adds their symbols to `triggered`."""
+    for event in events:
+        METRICS.inc("level_triggers_total", symbol=event.symbol, kind=event.kind)
+        log.info("Price %.5f %s band %.5f-%.5f of %s", event.price, "entered" if event.kind == 'enter' else "left",
+                 event.low, event.high, event.symbol)
+        triggered.add(event.symbol)
+
 def main():
+    global journal, feed, mt5
+    setup_logging("snr_bot", LOG_FILE, LOG_LEVEL, console=LOG_TO_CONSOLE)
+    if METRICS_PORT and bot_metrics.start_metrics_server(METRICS_PORT) is None:
+        log.warning("Metrics port %d unavailable; metrics endpoint disabled.", METRICS_PORT)
+    if JOURNAL_PATH:
+        journal = TradeJournal(JOURNAL_PATH, log=log)
+    if CHECKPOINT_PATH:
+        restore_checkpoint()
+    if MARKET_BUS:
+        # The feeder owns the terminal connection; this process only talks to the bus
+        mt5 = bot_metrics.instrument(market_bus.BusTerminal(tuple(MARKET_BUS), MARKET_BUS_AUTHKEY, MARKET_BUS_PREFIX))
     if not connect_mt5():
         return
 
     try:
         symbol_info = mt5.symbol_info(SYMBOL)
         if symbol_info is None:
-            print(f"Could not get symbol info for {SYMBOL}. Exiting.")
+            log.error("Could not get symbol info for %s. Exiting.", SYMBOL)
             disconnect_mt5()
             return
-        
-        # Smallest point value for this symbol (e.g., 0.00001 for EURUSD, 0.01 for XAUUSD)
-        point = symbol_info.point 
 
-        while RUN_BOT:
-            # Adjust bars_count based on your longest lookback period
-            # Ensure enough data for all indicators (even if some data is dropped by fillna=False)
-            data = get_market_data(SYMBOL, TIMEFRAME, VOLUME_PROFILE_LOOKBACK_BARS + FIB_RET_LOOKBACK_BARS + EMA_LONG_PERIOD + ATR_PERIOD + 50)
-            
-            # Check if enough data is available AFTER potential NaNs from indicator calculations
-            required_valid_bars = max(EMA_LONG_PERIOD, ATR_PERIOD) # Min bars for the 'ta' lib to return valid values
-            if data.empty or len(data.dropna(subset=['close'])) < required_valid_bars + 1: # Check for actual valid rows after potential NaNs
-                print("Not enough market data for indicator calculation (or too many NaNs). Waiting...")
-                time.sleep(60)
-                continue
-
-            data = calculate_indicators(data)
-            
-            # Ensure indicators are calculated (no NaNs at the end)
-            # The 'ta' library handles initial NaNs by returning NaN for the first `window` periods.
-            # So ensure you have enough data for the last few values to be valid.
-            # Also check if dictionaries are empty for the last row
-            last_row_data = data.iloc[-1]
-            if last_row_data['EMA_Short'] is np.nan or last_row_data['ATR'] is np.nan or \
-               not last_row_data['pivot_points'] or not last_row_data['fib_levels']:
-                print("Indicators not fully calculated yet (NaNs or empty dictionaries for latest bar). Waiting for more data...")
-                time.sleep(60)
-                continue
-
-            current_bid, current_ask = get_current_price(SYMBOL)
-            if current_bid is None or current_ask is None:
-                time.sleep(5)
-                continue
-
-            last_close = data['close'].iloc[-1]
-            current_ema_short = data['EMA_Short'].iloc[-1]
-            current_ema_long = data['EMA_Long'].iloc[-1]
-            current_atr = data['ATR'].iloc[-1]
-            current_fib_levels = data['fib_levels'].iloc[-1]
-            current_pivot_points = data['pivot_points'].iloc[-1]
-            current_hvns = data['hvns'].iloc[-1]
-            current_lvns = data['lvns'].iloc[-1]
-
-            print(f"\n--- Market Data & Indicators for {SYMBOL} ({get_timeframe_name(TIMEFRAME)}) ---")
-            print(f"Current Price: Bid={current_bid:.5f}, Ask={current_ask:.5f}")
-            print(f"EMAs: Short={current_ema_short:.5f}, Long={current_ema_long:.5f}")
-            print(f"ATR ({ATR_PERIOD}): {current_atr:.5f}")
-            print(f"Fibonacci Levels: { {k: f'{v:.5f}' for k, v in current_fib_levels.items()} if current_fib_levels else 'N/A' }")
-            print(f"Pivot Points: { {k: f'{v:.5f}' for k, v in current_pivot_points.items()} if current_pivot_points and not np.isnan(current_pivot_points.get('PP', np.nan)) else 'N/A' }")
-            print(f"High Volume Nodes (HVNs): { [f'{p:.5f}' for p in current_hvns] }")
-            print(f"Low Volume Nodes (LVNs): { [f'{p:.5f}' for p in current_lvns] }")
-            
-            account_info_latest = mt5.account_info()
-            if account_info_latest:
-                print(f"Account Equity: {account_info_latest.equity:.2f}")
+        bar_closed = set()  # Symbols whose TIMEFRAME bar closed since the last pass (tick feed only)
+        triggered = set()   # Symbols whose price entered or left a zone band since the last pass
+        if TICK_FEED:
+            feed = tick_bars.TickFeed(mt5, (TIMEFRAME,))
+            if feed.add_symbol(SYMBOL):
+                feed.subscribe(SYMBOL, TIMEFRAME, lambda symbol, timeframe, bar: bar_closed.add(symbol))
+                if LEVEL_TRIGGERS:
+                    feed.subscribe_ticks(SYMBOL, lambda symbol, ticks: note_triggers(
+                        triggers.check_ticks(symbol, ticks['bid'], ticks['time_msc']), triggered))
             else:
-                print("Could not retrieve latest account equity.")
-
-
-            open_trades = get_open_trades_count(SYMBOL)
-
-            if open_trades < MAX_TRADE_COUNT:
-                # --- Define your combined SNR and Entry Logic here ---
-                
-                potential_supports = []
-                potential_resistances = []
-
-                # Add Fib Levels
-                for level_name, level_price in current_fib_levels.items():
-                    if pd.isna(level_price): continue # Skip NaN levels
-                    if level_name in ['0.0%', '23.6%', '38.2%', '50.0%', '61.8%', '78.6%', '100.0%']: # Specific fib levels
-                        # For fibs, interpret based on their typical role or just proximity
-                        if level_price < current_bid: potential_supports.append(level_price)
-                        else: potential_resistances.append(level_price)
-
-                # Add Pivot Points
-                # Ensure pivot points are not NaN before adding
-                if current_pivot_points:
-                    for k, v in current_pivot_points.items():
-                        if pd.isna(v): continue
-                        if k == 'PP':
-                            if v < current_bid: potential_supports.append(v)
-                            else: potential_resistances.append(v)
-                        elif k.startswith('S'):
-                            potential_supports.append(v)
-                        elif k.startswith('R'):
-                            potential_resistances.append(v)
-                
-                # Add EMAs as dynamic S/R
-                if not pd.isna(current_ema_short):
-                    if current_ema_short < current_bid: potential_supports.append(current_ema_short)
-                    else: potential_resistances.append(current_ema_short)
-                if not pd.isna(current_ema_long):
-                    if current_ema_long < current_bid: potential_supports.append(current_ema_long)
-                    else: potential_resistances.append(current_ema_long)
-
-                # Add HVNs as strong S/R
-                for hvn in current_hvns:
-                    if not pd.isna(hvn):
-                        if hvn < current_bid: potential_supports.append(hvn)
-                        else: potential_resistances.append(hvn)
-
-                # Filter and get closest relevant levels
-                # Make sure to handle cases where potential_supports/resistances are empty
-                closest_support = max([s for s in potential_supports if s < current_bid] + [-np.inf]) if potential_supports else -np.inf
-                closest_resistance = min([r for r in potential_resistances if r > current_ask] + [np.inf]) if potential_resistances else np.inf
-                
-                confluence_tolerance = current_atr * 0.25 # ATR based tolerance for proximity
-
-                # --- BUY ENTRY LOGIC ---
-                # Check for enough data for previous EMA values
-                if len(data) >= 2:
-                    prev_ema_short = data['EMA_Short'].iloc[-2]
-                    prev_ema_long = data['EMA_Long'].iloc[-2]
-                    prev_close = data['close'].iloc[-2]
-                else: # Not enough data for comparison
-                    prev_ema_short = current_ema_short
-                    prev_ema_long = current_ema_long
-                    prev_close = last_close # Fallback
-
-                ema_crossover_buy = (prev_ema_short < prev_ema_long) and \
-                                     (current_ema_short > current_ema_long)
-                
-                is_near_support_confluence = False
-                buy_confluence_levels = [closest_support] + current_hvns + \
-                                      [current_pivot_points.get('S1', np.nan), # Use .get for robustness
-                                       current_fib_levels.get('61.8%', np.nan),
-                                       current_fib_levels.get('50.0%', np.nan)]
-                
-                for level in buy_confluence_levels:
-                    if not pd.isna(level) and abs(current_bid - level) < confluence_tolerance:
-                        is_near_support_confluence = True
-                        break
-
-                has_bounced_from_support = (is_near_support_confluence and last_close > prev_close)
-
-                if (ema_crossover_buy and has_bounced_from_support) or \
-                   (abs(current_bid - closest_support) < confluence_tolerance and has_bounced_from_support):
-                    
-                    sl_price = round(current_ask - (current_atr * SL_MULTIPLIER), symbol_info.digits)
-                    tp_price = round(current_ask + (current_atr * TP_MULTIPLIER), symbol_info.digits)
-
-                    # Ensure SL is not above entry for buy, add a small buffer if too close
-                    if sl_price >= current_ask: sl_price = current_ask - (symbol_info.point * 10) # 10 points below
-                    
-                    stop_loss_points = abs(current_ask - sl_price) / point
-                    calculated_volume = calculate_lot_size(SYMBOL, RISK_PERCENT_PER_TRADE, stop_loss_points)
-
-                    if calculated_volume > 0:
-                        print(f"--- BUY SIGNAL ---")
-                        print(f"  Reason: EMA bullish crossover and near support confluence.")
-                        print(f"  Calculated Volume: {calculated_volume:.2f}, SL: {sl_price:.5f}, TP: {tp_price:.5f}")
-                        send_order(SYMBOL, "BUY", calculated_volume, current_ask, sl_price, tp_price, "Multi-Indicator Buy")
-                        time.sleep(10)
-                    else:
-                         print(f"Calculated BUY volume is zero or too small: {calculated_volume:.5f}. Skipping trade.")
-
-
-                # --- SELL ENTRY LOGIC ---
-                ema_crossover_sell = (prev_ema_short > prev_ema_long) and \
-                                      (current_ema_short < current_ema_long)
-                
-                is_near_resistance_confluence = False
-                sell_confluence_levels = [closest_resistance] + current_hvns + \
-                                       [current_pivot_points.get('R1', np.nan), 
-                                        current_fib_levels.get('38.2%', np.nan),
-                                        current_fib_levels.get('50.0%', np.nan)]
-                
-                for level in sell_confluence_levels:
-                    if not pd.isna(level) and abs(current_bid - level) < confluence_tolerance:
-                        is_near_resistance_confluence = True
-                        break
-
-                has_bounced_from_resistance = (is_near_resistance_confluence and last_close < prev_close)
-
-                if (ema_crossover_sell and has_bounced_from_resistance) or \
-                   (abs(current_bid - closest_resistance) < confluence_tolerance and has_bounced_from_resistance):
-                    
-                    sl_price = round(current_bid + (current_atr * SL_MULTIPLIER), symbol_info.digits)
-                    tp_price = round(current_bid - (current_atr * TP_MULTIPLIER), symbol_info.digits)
-
-                    # Ensure SL is not below entry for sell, add a small buffer if too close
-                    if sl_price <= current_bid: sl_price = current_bid + (symbol_info.point * 10) # 10 points above
-
-                    stop_loss_points = abs(current_bid - sl_price) / point
-                    calculated_volume = calculate_lot_size(SYMBOL, RISK_PERCENT_PER_TRADE, stop_loss_points)
-
-                    if calculated_volume > 0:
-                        print(f"--- SELL SIGNAL ---")
-                        print(f"  Reason: EMA bearish crossover and near resistance confluence.")
-                        print(f"  Calculated Volume: {calculated_volume:.2f}, SL: {sl_price:.5f}, TP: {tp_price:.5f}")
-                        send_order(SYMBOL, "SELL", calculated_volume, current_bid, sl_price, tp_price, "Multi-Indicator Sell")
-                        time.sleep(10)
-                    else:
-                        print(f"Calculated SELL volume is zero or too small: {calculated_volume:.5f}. Skipping trade.")
-            else:
-                print(f"Maximum allowed trades ({MAX_TRADE_COUNT}) already open for {SYMBOL}. No new trades.")
-
-            manage_trades()
+                log.warning("No tick data for %s; falling back to polling bars.", SYMBOL)
+                feed = None
+        polling = feed is not None or LEVEL_TRIGGERS  # Wake up every TICK_POLL_SECONDS rather than every pass
 
-            time.sleep(60) # Wait 60 seconds before next loop iteration
+        last_checkpoint = time.monotonic()
+        next_cycle = 0.0
+        while RUN_BOT:
+            if feed is not None:
+                feed.poll()
+            elif LEVEL_TRIGGERS:
+                tick = mt5.symbol_info_tick(SYMBOL)
+                if tick is not None:
+                    note_triggers(triggers.check(SYMBOL, tick.bid, tick.time_msc), triggered)
+            if not polling or bar_closed or time.monotonic() >= next_cycle:
+                bar_closed.clear()
+                triggered.clear()
+                with bot_metrics.timed(symbol=SYMBOL):
+                    wait = run_cycle(SYMBOL, symbol_info)
+                if WATCHLIST:
+                    run_watchlist(WATCHLIST)
+                next_cycle = time.monotonic() + wait
+            elif triggered:
+                # Price reached a level: evaluate now, without moving the regular schedule
+                triggered.clear()
+                with bot_metrics.timed(symbol=SYMBOL):
+                    run_cycle(SYMBOL, symbol_info)
+            if CHECKPOINT_PATH and time.monotonic() - last_checkpoint >= CHECKPOINT_SECONDS:
+                save_checkpoint()
+                last_checkpoint = time.monotonic()
+            time.sleep(TICK_POLL_SECONDS if polling else wait)
 
     except KeyboardInterrupt:
-        print("Bot stopped by user.")
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        # Optional: Log the full traceback for debugging
-        # import traceback
-        # traceback.print_exc()
+        log.info("Bot stopped by user.")
+    except Exception:
+        log.exception("An unexpected error occurred")
     finally:
+        if CHECKPOINT_PATH:
+            save_checkpoint()
+        if journal:
+            journal.close()
         disconnect_mt5()
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 import MetaTrader5 as mt5
 import pandas as pd
 import time
+import market_bus
 
 # --- MT5 Account Details (USE A DEMO ACCOUNT FIRST!) ---
 # DO NOT hardcode your live account password in production code.
@@ -12,6 +13,7 @@ MT5_PATH = r"C:\Program Files\MetaTrader 5 EXNESS\terminal64.exe" # Path to your
 
 SYMBOL = "BTCUSDm" # Gold vs USD (mini) - adjust as per Exness symbols
 LOT_SIZE = 0.1 # Standard lot size for forex/CFDs
+MARKET_BUS = None # (host, port) of a market_bus.py feeder to share, instead of opening this bot's own terminal session
 
 def initialize_mt5():
     if not mt5.initialize(path=MT5_PATH, login=MT5_LOGIN, password=MT5_PASSWORD, server=MT5_SERVER):
@@ -97,6 +99,8 @@ def close_position(ticket):
 
 # --- Main Trading Logic (Conceptual) ---
 if __name__ == "__main__":
+    if MARKET_BUS:
+        mt5 = market_bus.BusTerminal(tuple(MARKET_BUS)) # Feeder must publish M1 bars (--timeframes 1)
     if not initialize_mt5():
         exit()
 
@@ -3,6 +3,7 @@ import MetaTrader5 as mt5 # The official MT5 Python API
 import pandas as pd      # For data manipulation (especially for historical bars)
 import time              # For pausing execution (e.g., waiting between checks)
 import datetime          # Useful for timestamps and logging
+import market_bus        # Shared-memory market data bus (market_bus.py)
 
 # --- 2. Configuration Parameters ---
 # IMPORTANT: For live trading, DO NOT hardcode sensitive information like passwords.
@@ -24,6 +25,11 @@ SYMBOL = "XAUUSDm" # The trading instrument (e.g., "EURUSD", "XAUUSDm" for Gold
 LOT_SIZE = 0.01 # Volume/Lot size for trades. Adjust this carefully based on your account size and risk tolerance.
 MAGIC_NUMBER = 20240531 # A unique identifier for your bot's orders. This helps you distinguish trades placed by your bot from manual trades or other bots.
 
+# Market data bus: (host, port) of a running market_bus.py feeder, e.g. ("127.0.0.1", 6010).
+# With it set, this bot reads bars/ticks from the feeder's shared memory and sends its other calls
+# through the feeder instead of opening its own terminal session. None connects to the terminal directly.
+MARKET_BUS = None
+
 # Strategy parameters (for a simple Moving Average Crossover)
 SHORT_MA_PERIOD = 10   # Period for the short moving average
 LONG_MA_PERIOD = 30    # Period for the long moving average
@@ -298,7 +304,9 @@ def run_trading_strategy():
 # --- Main Loop ---
 
 if __name__ == "__main__":
-    # 1. Initialize MT5 connection
+    # 1. Initialize MT5 connection (through the market bus feeder if one is configured)
+    if MARKET_BUS:
+        mt5 = market_bus.BusTerminal(tuple(MARKET_BUS)) # The feeder must publish this TIMEFRAME (--timeframes 1)
     if not initialize_mt5_connection():
         print("Failed to initialize MT5 connection. Exiting script.")
         exit() # Exit the script if connection fails
@@ -0,0 +1,103 @@
+from collections import namedtuple
+
+# --- Resting orders with cancel/replace ---
+# Instead of sending a market order after price has reached a level, the bot
+# can keep one pending order per side resting at the level, so the fill happens
+# at the level on the broker's side. Each pass states the orders it wants
+# (OrderIntent per side) and RestingOrders reconciles them with what is
+# working: place what is missing, remove what is no longer wanted, and modify
+# an order only when its price, SL or TP moved by more than a threshold, so
+# small level drift between passes sends nothing. An order whose type changes
+# is removed and placed again, as TRADE_ACTION_MODIFY cannot change it.
+
+# side: 'BUY'/'SELL'; order_type: mt5.ORDER_TYPE_*_LIMIT or *_STOP
+OrderIntent = namedtuple("OrderIntent", "side order_type price sl tp volume")
+# An order the broker accepted and is (as far as we know) still working
+WorkingOrder = namedtuple("WorkingOrder", "ticket order_type price sl tp volume")
+
+class RestingOrders:
+    """The pending orders one symbol keeps resting, by side."""
+    __slots__ = ("symbol", "magic", "working")
+
+    def __init__(self, symbol, magic):
+        self.symbol = symbol
+        self.magic = magic
+        self.working = {}  # side -> WorkingOrder
+
+    def sync(self, mt5):
+        """
+        Forgets orders the terminal no longer lists (filled, expired or removed); returns them as
+        (side, WorkingOrder) pairs.
+        """
+        if not self.working:
+            return []
+        orders = mt5.orders_get(symbol=self.symbol)
+        if orders is None:  # Unknown rather than none; keep what we have
+            return []
+        tickets = {order.ticket for order in orders}
+        gone = [(side, order) for side, order in self.working.items() if order.ticket not in tickets]
+        for side, _ in gone:
+            del self.working[side]
+        return gone
+
+    def reconcile(self, mt5, intents, threshold, comment=""):
+        """
+        Brings the working orders in line with `intents` ({side: OrderIntent}); levels that moved
+        by `threshold` or less are left alone. Returns (action, side, result) per request sent.
+        """
+        sent = []
+        for side, order in list(self.working.items()):
+            intent = intents.get(side)
+            if intent is None or intent.order_type != order.order_type:
+                sent.append(('remove', side, self._remove(mt5, side, order)))
+        for side, intent in intents.items():
+            order = self.working.get(side)
+            if order is None:
+                sent.append(('place', side, self._place(mt5, intent, comment)))
+            elif order.order_type == intent.order_type and \
+                    max(abs(intent.price - order.price), abs(intent.sl - order.sl), abs(intent.tp - order.tp)) > threshold:
+                sent.append(('modify', side, self._modify(mt5, side, order, intent)))
+        return sent
+
+    @staticmethod
+    def _accepted(mt5, result):
+        return result is not None and result.retcode in (mt5.TRADE_RETCODE_DONE, mt5.TRADE_RETCODE_PLACED)
+
+    def _place(self, mt5, intent, comment):
+        result = mt5.order_send({
+            "action": mt5.TRADE_ACTION_PENDING,
+            "symbol": self.symbol,
+            "volume": intent.volume,
+            "type": intent.order_type,
+            "price": intent.price,
+            "sl": intent.sl,
+            "tp": intent.tp,
+            "magic": self.magic,
+            "comment": comment,
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": mt5.ORDER_FILLING_RETURN,
+        })
+        if self._accepted(mt5, result):
+            self.working[intent.side] = WorkingOrder(result.order, intent.order_type, intent.price, intent.sl,
+                                                     intent.tp, intent.volume)
+        return result
+
+    def _modify(self, mt5, side, order, intent):
+        result = mt5.order_send({
+            "action": mt5.TRADE_ACTION_MODIFY,
+            "order": order.ticket,
+            "symbol": self.symbol,
+            "price": intent.price,
+            "sl": intent.sl,
+            "tp": intent.tp,
+            "type_time": mt5.ORDER_TIME_GTC,
+        })
+        if self._accepted(mt5, result):
+            self.working[side] = order._replace(price=intent.price, sl=intent.sl, tp=intent.tp)
+        return result
+
+    def _remove(self, mt5, side, order):
+        result = mt5.order_send({"action": mt5.TRADE_ACTION_REMOVE, "order": order.ticket, "symbol": self.symbol})
+        if self._accepted(mt5, result):
+            del self.working[side]
+        return result
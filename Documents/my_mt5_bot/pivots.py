@@ -0,0 +1,92 @@
+import numpy as np
+
+# --- Daily pivot points, computed once per trading day ---
+# Pivots only change when the broker's trading day rolls over, so they are
+# cached per symbol and recomputed only when the forming bar belongs to a new
+# server-time day. The previous day's OHLC comes from the broker's own D1 bar
+# (whose boundary is the server's day, unlike pandas' UTC resample); if D1 data
+# is unavailable it is aggregated from the intraday bars already in memory.
+
+PIVOT_KEYS = ['PP', 'R1', 'R2', 'R3', 'S1', 'S2', 'S3']
+SECONDS_PER_DAY = 86400
+
+def classic_pivots(high, low, close):
+    pp = (high + low + close) / 3
+    return {
+        'PP': pp,
+        'R1': (2 * pp) - low,
+        'R2': pp + (high - low),
+        'R3': high + (2 * (pp - low)),
+        'S1': (2 * pp) - high,
+        'S2': pp - (high - low),
+        'S3': low - (2 * (high - pp)),
+    }
+
+def camarilla_pivots(high, low, close):
+    span = (high - low) * 1.1
+    levels = {'PP': (high + low + close) / 3}
+    for i, divisor in enumerate((12, 6, 4, 2), start=1):
+        levels[f'R{i}'] = close + span / divisor
+        levels[f'S{i}'] = close - span / divisor
+    return levels
+
+def woodie_pivots(high, low, today_open):
+    pp = (high + low + 2 * today_open) / 4
+    return {
+        'PP': pp,
+        'R1': (2 * pp) - low,
+        'R2': pp + (high - low),
+        'S1': (2 * pp) - high,
+        'S2': pp - (high - low),
+    }
+
+def all_pivots(high, low, close, today_open):
+    """Every pivot variant from the previous day's H/L/C and today's open."""
+    return {
+        'classic': classic_pivots(high, low, close),
+        'camarilla': camarilla_pivots(high, low, close),
+        'woodie': woodie_pivots(high, low, today_open),
+    }
+
+def server_day(epoch):
+    """Trading day index of a bar time. MT5 bar times are server wall-clock seconds."""
+    return int(epoch) // SECONDS_PER_DAY
+
+def previous_day_from_bars(times, opens, highs, lows, closes, today):
+    """(high, low, close, today_open) of the last full day before `today` in an intraday window, or None."""
+    days = times // SECONDS_PER_DAY
+    earlier = days[days < today]
+    if len(earlier) == 0:
+        return None
+    prev = earlier[-1]
+    if days[0] >= prev:
+        return None  # The window starts inside the previous day, so its range would be partial
+    lo, hi = np.searchsorted(days, prev, 'left'), np.searchsorted(days, prev, 'right')
+    today_open = opens[hi] if hi < len(opens) and days[hi] == today else closes[hi - 1]
+    return highs[lo:hi].max(), lows[lo:hi].min(), closes[hi - 1], today_open
+
+class PivotCache:
+    """Per-symbol pivots for the current server day."""
+    __slots__ = ("day", "levels")
+
+    def __init__(self):
+        self.day = None
+        self.levels = None
+
+    def get(self, mt5, symbol, bars):
+        """Pivot variants for the day of the forming bar (last row of `bars`), or None if unavailable."""
+        today = server_day(bars['time'][-1])
+        if today == self.day:
+            return self.levels
+        ohlc = None
+        daily = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_D1, 0, 2)
+        if daily is not None and len(daily) == 2 and server_day(daily['time'][1]) == today:
+            prev = daily[0]
+            ohlc = (float(prev['high']), float(prev['low']), float(prev['close']), float(daily['open'][1]))
+        else:
+            ohlc = previous_day_from_bars(bars['time'], bars['open'], bars['high'], bars['low'], bars['close'], today)
+        if ohlc is None:
+            return None  # Retry on the next pass
+        self.day = today
+        self.levels = all_pivots(*(float(v) for v in ohlc))
+        return self.levels
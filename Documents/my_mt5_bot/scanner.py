@@ -0,0 +1,104 @@
+from collections import namedtuple
+import numpy as np
+from pivots import SECONDS_PER_DAY, classic_pivots
+from swing_levels import FIB_RETRACEMENTS
+
+# --- Batch setup screen for a watchlist ---
+# The last `count` bars of every watched symbol are stacked into (bars x
+# symbols) matrices, row -1 being the forming bar, and the SNR entry
+# ingredients are computed for all columns at once: EMA short/long and the
+# crossover, Wilder ATR, fib retracements of the swing over the fib lookback,
+# the previous server day's classic pivots, the current day's VWAP, and the
+# bounce (last close against the previous one). Each indicator walks the rows
+# once with whole-row NumPy operations, so a pass over hundreds of symbols
+# costs a few hundred vector steps instead of hundreds of per-symbol passes.
+#
+# It is a screen, not the decision: it only knows the levels above, so the
+# tolerance should be wider than the entry's. Symbols that pass go through the
+# bot's full per-symbol logic, which decides and sends orders.
+
+# side: 'BUY' (bounced up near a level) or 'SELL'; distance: to the nearest screened level, in ATRs
+Setup = namedtuple("Setup", "symbol side crossover distance")
+
+def stack_bars(series, count):
+    """(symbols, {column: (count, symbols) matrix}) from {symbol: rates}; symbols with fewer bars are left out."""
+    symbols = [symbol for symbol, rates in series.items() if rates is not None and len(rates) >= count]
+    matrices = {name: np.column_stack([np.asarray(series[symbol][name][-count:], dtype=np.int64 if name == 'time'
+                                                  else np.float64) for symbol in symbols])
+                for name in ('time', 'high', 'low', 'close', 'tick_volume')} if symbols else {}
+    return symbols, matrices
+
+def ema_columns(values, period):
+    """EMA(span=period) down each column, NaN for the first period - 1 rows (as EMAState)."""
+    alpha = 2.0 / (period + 1)
+    out = np.empty_like(values)
+    out[0] = values[0]
+    for i in range(1, len(values)):
+        out[i] = out[i - 1] + alpha * (values[i] - out[i - 1])
+    out[:period - 1] = np.nan
+    return out
+
+def atr_columns(high, low, close, period):
+    """
+    Wilder ATR of the last row per column: mean of the first `period` true ranges, then smoothed.
+    The first row's true range is its high - low, as in ATRState (and ta).
+    """
+    true_range = np.empty_like(high)
+    true_range[0] = high[0] - low[0]
+    true_range[1:] = np.maximum(high[1:], close[:-1]) - np.minimum(low[1:], close[:-1])
+    if len(true_range) < period:
+        return np.full(high.shape[1], np.nan)
+    atr = true_range[:period].mean(axis=0)
+    for i in range(period, len(true_range)):
+        atr = atr + (true_range[i] - atr) / period
+    return atr
+
+def previous_day_pivots(time, high, low, close):
+    """Classic pivots of each column's last complete server day ({name: row of prices}, NaN without one)."""
+    day = time // SECONDS_PER_DAY
+    previous = np.where(day < day[-1], day, -1).max(axis=0)
+    mask = day == previous
+    found = mask.any(axis=0)
+    last = len(day) - 1 - np.argmax(mask[::-1], axis=0)  # last row of that day per column
+    # Columns without a previous day get NaN inputs rather than -inf/inf, which would not add up quietly
+    highs = np.where(found, np.where(mask, high, -np.inf).max(axis=0), np.nan)
+    lows = np.where(found, np.where(mask, low, np.inf).min(axis=0), np.nan)
+    closes = np.where(found, close[last, np.arange(close.shape[1])], np.nan)
+    return classic_pivots(highs, lows, closes)
+
+def day_vwap(time, high, low, close, volume):
+    """VWAP of each column's current server day (typical prices, forming bar included)."""
+    day = time // SECONDS_PER_DAY
+    weights = np.where(day == day[-1], volume, 0.0)
+    total = weights.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return ((high + low + close) / 3 * weights).sum(axis=0) / total
+
+def scan(symbols, matrices, ema_periods, atr_period, fib_lookback, atr_fraction):
+    """
+    Setups among the stacked symbols, nearest level first: the forming bar closed above the previous
+    bar (BUY) or below it (SELL) within `atr_fraction` ATRs of an EMA, fib, pivot or VWAP level.
+    """
+    if not symbols:
+        return []
+    high, low, close = matrices['high'], matrices['low'], matrices['close']
+    ema_short, ema_long = (ema_columns(close, period)[-2:] for period in ema_periods)
+    atr = atr_columns(high, low, close, atr_period)
+    swing_high, swing_low = high[-fib_lookback:].max(axis=0), low[-fib_lookback:].min(axis=0)
+    levels = [ema_short[-1], ema_long[-1]]
+    levels += [swing_high - ratio * (swing_high - swing_low) for ratio in FIB_RETRACEMENTS]
+    levels += list(previous_day_pivots(matrices['time'], high, low, close).values())
+    levels.append(day_vwap(matrices['time'], high, low, close, matrices['tick_volume']))
+    gaps = np.abs(np.vstack(levels) - close[-1])
+    missing = np.isnan(gaps)
+    nearest = np.where(missing, np.inf, gaps).min(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        distance = np.where(missing.all(axis=0), np.nan, nearest) / atr
+    near = distance < atr_fraction  # False where the ATR or every level is NaN
+    up, down = close[-1] > close[-2], close[-1] < close[-2]
+    cross_up = (ema_short[0] < ema_long[0]) & (ema_short[1] > ema_long[1])
+    cross_down = (ema_short[0] > ema_long[0]) & (ema_short[1] < ema_long[1])
+    setups = [Setup(symbols[i], 'BUY' if up[i] else 'SELL', bool(cross_up[i] if up[i] else cross_down[i]),
+                    float(distance[i]))
+              for i in np.flatnonzero(near & (up | down))]
+    return sorted(setups, key=lambda setup: setup.distance)
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+import numpy as np
+from pivots import SECONDS_PER_DAY
+from tick_bars import bar_start, W1
+
+# --- Per-session volume profiles and composites ---
+# Each session (a server day, a London/New York window of it, or a week) keeps
+# its own compact profile: the index of its first price bucket and one float
+# array of bucket volumes. Only the current session is still being added to;
+# once a later session starts it is frozen and never touched again. A composite
+# over the last N sessions is then a sum of those arrays, and the sum of the
+# frozen ones is cached until another session closes, so a pass only adds the
+# current session's array to it.
+#
+# Bars arrive already binned as (first bucket, shares), from their range
+# (volume_profile.bar_shares) or from their ticks (volume_profile.tick_shares).
+
+# Session windows in server hours [start, end); brokers' servers mostly run at UTC+2/+3
+SESSION_HOURS = {'london': (10, 19), 'new_york': (15, 24)}
+
+def session_key(epoch, kind):
+    """Key of the `kind` session containing server time `epoch`, or None if it falls outside any."""
+    if kind == 'day':
+        return int(epoch) // SECONDS_PER_DAY
+    if kind == 'week':
+        return bar_start(int(epoch), W1)
+    start, end = SESSION_HOURS[kind]
+    hour = int(epoch) % SECONDS_PER_DAY // 3600
+    return int(epoch) // SECONDS_PER_DAY if start <= hour < end else None
+
+def _add_into(origin, volumes, first, shares):
+    """Adds a run of buckets to (origin, volumes), growing the array if needed; returns the new pair."""
+    if volumes is None:
+        return first, np.array(shares, dtype=float)
+    lo, hi = min(origin, first), max(origin + len(volumes), first + len(shares))
+    if lo < origin or hi > origin + len(volumes):
+        grown = np.zeros(hi - lo)
+        grown[origin - lo:origin - lo + len(volumes)] = volumes
+        origin, volumes = lo, grown
+    volumes[first - origin:first - origin + len(shares)] += shares
+    return origin, volumes
+
+def _touched(origin, volumes, bucket_size):
+    """(prices, volumes) of the buckets holding volume."""
+    touched = np.flatnonzero(volumes > 0)
+    return (touched + origin + 0.5) * bucket_size, volumes[touched]
+
+class SessionProfiles:
+    """Volume profiles of the last `keep` sessions of one kind ('day', 'week', or a SESSION_HOURS window)."""
+    __slots__ = ("kind", "bucket_size", "keep", "closed", "key", "origin", "volumes", "cache")
+
+    def __init__(self, kind, bucket_size, keep):
+        self.kind = kind
+        self.bucket_size = bucket_size
+        self.keep = keep
+        self.closed = OrderedDict()  # session key -> (origin, volumes), oldest first; never modified
+        self.key = None              # current session
+        self.origin = 0
+        self.volumes = None
+        self.cache = {}              # sessions -> (origin, volumes) summed over the last closed ones
+
+    def add(self, time, first, shares):
+        """Adds a closed bar opening at `time`, binned as (first bucket, shares)."""
+        key = session_key(time, self.kind)
+        if key is None:
+            self._close()  # The first bar after a session window ends it
+            return
+        if key != self.key:
+            self._close()
+            self.key = key
+        self.origin, self.volumes = _add_into(self.origin, self.volumes, first, shares)
+
+    def _close(self):
+        if self.volumes is not None:
+            self.closed[self.key] = (self.origin, self.volumes)
+            while len(self.closed) > self.keep:
+                self.closed.popitem(last=False)
+            self.cache.clear()
+        self.key, self.volumes = None, None
+
+    def last_closed(self):
+        """(prices, volumes) of the most recent complete session, or None."""
+        if not self.closed:
+            return None
+        return _touched(*next(reversed(self.closed.values())), self.bucket_size)
+
+    def composite(self, sessions, current=True):
+        """(prices, volumes) summed over the last `sessions` closed sessions, plus the current one."""
+        if sessions not in self.cache:
+            origin, volumes = 0, None
+            for i, (first, shares) in enumerate(reversed(self.closed.values())):
+                if i == sessions:
+                    break
+                origin, volumes = _add_into(origin, volumes, first, shares)
+            self.cache[sessions] = (origin, volumes)
+        origin, volumes = self.cache[sessions]
+        if current and self.volumes is not None:
+            volumes = None if volumes is None else volumes.copy()  # The cached sum stays as it is
+            origin, volumes = _add_into(origin, volumes, self.origin, self.volumes)
+        if volumes is None:
+            return np.zeros(0), np.zeros(0)
+        return _touched(origin, volumes, self.bucket_size)
@@ -0,0 +1,454 @@
+import sys
+import numpy as np
+from datetime import datetime
+from types import SimpleNamespace
+
+# --- Simulated MetaTrader5 terminal ---
+# Stands in for the `MetaTrader5` package so the bots can be replayed offline.
+# It exposes the same function names and constants the bots use, serves bars
+# from recorded (or synthetic) rate arrays up to a replay clock, and fills
+# market orders at the requested price, closing positions when SL/TP is hit.
+# Pending limit/stop orders rest until a replayed bar trades through their
+# price, and then open a position at that price.
+
+# Same layout as the structured arrays returned by mt5.copy_rates_*
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+
+# ...and by mt5.copy_ticks_*
+TICK_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8'),
+])
+
+TICKS_PER_BAR = 20  # Synthetic ticks served per replayed bar
+
+# Timeframe enum -> bar length in seconds (enum values match the real package)
+TIMEFRAME_SECONDS = {
+    1: 60, 5: 300, 15: 900, 30: 1800,
+    16385: 3600, 16388: 14400, 16408: 86400, 32769: 604800, 49153: 2592000,
+}
+
+
+class SimTerminal:
+    """Replays bar arrays through the subset of the MT5 API used by the bots."""
+
+    TIMEFRAME_M1 = 1
+    TIMEFRAME_M5 = 5
+    TIMEFRAME_M15 = 15
+    TIMEFRAME_M30 = 30
+    TIMEFRAME_H1 = 16385
+    TIMEFRAME_H4 = 16388
+    TIMEFRAME_D1 = 16408
+    TIMEFRAME_W1 = 32769
+    TIMEFRAME_MN1 = 49153
+
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    ORDER_TYPE_BUY_LIMIT = 2
+    ORDER_TYPE_SELL_LIMIT = 3
+    ORDER_TYPE_BUY_STOP = 4
+    ORDER_TYPE_SELL_STOP = 5
+
+    TRADE_ACTION_DEAL = 1
+    TRADE_ACTION_PENDING = 5
+    TRADE_ACTION_SLTP = 6
+    TRADE_ACTION_MODIFY = 7
+    TRADE_ACTION_REMOVE = 8
+
+    ORDER_TIME_GTC = 0
+    ORDER_FILLING_FOK = 0
+    ORDER_FILLING_IOC = 1
+    ORDER_FILLING_RETURN = 2
+
+    COPY_TICKS_ALL = -1
+    COPY_TICKS_INFO = 1
+    COPY_TICKS_TRADE = 2
+
+    DEAL_TYPE_BUY = 0
+    DEAL_TYPE_SELL = 1
+    DEAL_ENTRY_IN = 0
+    DEAL_ENTRY_OUT = 1
+
+    TRADE_RETCODE_PLACED = 10008
+    TRADE_RETCODE_DONE = 10009
+    TRADE_RETCODE_INVALID = 10013
+    TRADE_RETCODE_INVALID_PRICE = 10015
+    TRADE_RETCODE_INVALID_STOPS = 10016
+
+    def __init__(self, balance=10000.0, leverage=100):
+        self.balance = balance
+        self.leverage = leverage
+        self.series = {}      # (symbol, timeframe) -> rates array
+        self.cursor = {}      # (symbol, timeframe) -> index of the forming bar
+        self.specs = {}       # symbol -> symbol_info namespace
+        self.positions = {}   # ticket -> position namespace
+        self.orders = {}      # ticket -> pending order namespace
+        self.deals = []       # every fill, opening (DEAL_ENTRY_IN) or closing (DEAL_ENTRY_OUT) a position
+        self.next_ticket = 1
+        self.error = (1, "Success")
+        self.calls = 0
+
+    # --- Replay control ---
+
+    def add_symbol(self, symbol, timeframe, rates, point=0.01, digits=2, start=0, align_to_now=True):
+        """Registers recorded rates for a symbol. `start` is the first forming bar index."""
+        rates = np.asarray(rates).astype(RATES_DTYPE)
+        if align_to_now and len(rates):
+            # Shift the recording so its last bar is "now"; the bots query by wall-clock ranges.
+            rates['time'] += int(datetime.now().timestamp()) - int(rates['time'][-1])
+        self.series[(symbol, timeframe)] = rates
+        self.cursor[(symbol, timeframe)] = min(start, len(rates) - 1)
+        self.specs[symbol] = SimpleNamespace(
+            name=symbol, point=point, digits=digits, trade_tick_size=point, trade_tick_value=1.0,
+            trade_contract_size=100.0, volume_step=0.01, volume_min=0.01, volume_max=100.0,
+            spread=int(rates['spread'][-1]) if len(rates) else 0, visible=True,
+        )
+
+    def advance(self, bars=1):
+        """Moves every replayed series forward; returns False once any series is exhausted."""
+        alive = True
+        for key, rates in self.series.items():
+            pos = self.cursor[key] + bars
+            if pos >= len(rates):
+                pos = len(rates) - 1
+                alive = False
+            self.cursor[key] = pos
+            self._check_pending(key[0], rates[pos])
+            self._check_stops(key[0], rates[pos])
+        return alive
+
+    def _visible(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        if key in self.series:
+            return self.series[key][:self.cursor[key] + 1]
+        # Serve a coarser timeframe by aggregating a recorded finer one, as the terminal would
+        seconds = TIMEFRAME_SECONDS.get(timeframe, 0)
+        for (sym, tf), rates in self.series.items():
+            if sym == symbol and TIMEFRAME_SECONDS[tf] < seconds and seconds % TIMEFRAME_SECONDS[tf] == 0:
+                return aggregate_rates(rates[:self.cursor[(sym, tf)] + 1], seconds)
+        self.error = (-2, f"No replay data for {symbol} timeframe {timeframe}")
+        return None
+
+    def _forming_bar(self, symbol):
+        for (sym, tf), rates in self.series.items():
+            if sym == symbol:
+                return rates[self.cursor[(sym, tf)]]
+        return None
+
+    # --- Connection ---
+
+    def initialize(self, *args, **kwargs):
+        self.calls += 1
+        return True
+
+    def shutdown(self):
+        self.calls += 1
+        return True
+
+    def last_error(self):
+        return self.error
+
+    def terminal_info(self):
+        self.calls += 1
+        return SimpleNamespace(name="Simulated Terminal", connected=True, trade_allowed=True)
+
+    def account_info(self):
+        self.calls += 1
+        equity = self.balance + sum(p.profit for p in self.positions.values())
+        return SimpleNamespace(login=0, server="Sim", balance=self.balance, equity=equity,
+                               margin_free=equity, leverage=self.leverage, currency="USD")
+
+    # --- Market data ---
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        self.calls += 1
+        rates = self._visible(symbol, timeframe)
+        if rates is None:
+            return None
+        lo = int(date_from.timestamp()) if isinstance(date_from, datetime) else int(date_from)
+        hi = int(date_to.timestamp()) if isinstance(date_to, datetime) else int(date_to)
+        times = rates['time']
+        return rates[np.searchsorted(times, lo, 'left'):np.searchsorted(times, hi, 'right')].copy()
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        self.calls += 1
+        rates = self._visible(symbol, timeframe)
+        if rates is None:
+            return None
+        end = len(rates) - start_pos
+        if end <= 0:
+            return rates[:0].copy()
+        return rates[max(0, end - count):end].copy()
+
+    def copy_rates_from(self, symbol, timeframe, date_from, count):
+        self.calls += 1
+        rates = self._visible(symbol, timeframe)
+        if rates is None:
+            return None
+        hi = int(date_from.timestamp()) if isinstance(date_from, datetime) else int(date_from)
+        end = np.searchsorted(rates['time'], hi, 'right')
+        return rates[max(0, end - count):end].copy()
+
+    def copy_ticks_range(self, symbol, date_from, date_to, flags):
+        """Synthetic ticks of the visible bars, tracing open -> low/high -> close (see bar_ticks)."""
+        self.calls += 1
+        for (sym, tf), rates in self.series.items():
+            if sym == symbol:
+                break
+        else:
+            self.error = (-1, f"Unknown symbol {symbol}")
+            return None
+        lo = int(date_from.timestamp()) if isinstance(date_from, datetime) else int(date_from)
+        hi = int(date_to.timestamp()) if isinstance(date_to, datetime) else int(date_to)
+        seconds = TIMEFRAME_SECONDS[tf]
+        rates = rates[:self.cursor[(sym, tf)] + 1]
+        times = rates['time']
+        bars = rates[np.searchsorted(times, lo - seconds, 'right'):np.searchsorted(times, hi, 'right')]
+        ticks = bar_ticks(bars, seconds, self.specs[symbol].point)
+        msc = ticks['time_msc']
+        return ticks[(msc >= lo * 1000) & (msc <= hi * 1000)]
+
+    def symbol_info(self, symbol):
+        self.calls += 1
+        spec = self.specs.get(symbol)
+        if spec is None:
+            self.error = (-1, f"Unknown symbol {symbol}")
+        return spec
+
+    def symbol_info_tick(self, symbol):
+        self.calls += 1
+        bar = self._forming_bar(symbol)
+        if bar is None:
+            self.error = (-1, f"Unknown symbol {symbol}")
+            return None
+        point = self.specs[symbol].point
+        bid = float(bar['close'])
+        return SimpleNamespace(time=int(bar['time']), time_msc=int(bar['time']) * 1000, bid=bid,
+                               ask=bid + int(bar['spread']) * point, last=bid, volume=0, flags=6)
+
+    # --- Trading ---
+
+    def positions_get(self, symbol=None, ticket=None, group=None):
+        self.calls += 1
+        positions = list(self.positions.values())
+        if symbol is not None:
+            positions = [p for p in positions if p.symbol == symbol]
+        if ticket is not None:
+            positions = [p for p in positions if p.ticket == ticket]
+        return tuple(positions)
+
+    def orders_get(self, symbol=None, ticket=None, group=None):
+        self.calls += 1
+        orders = list(self.orders.values())
+        if symbol is not None:
+            orders = [o for o in orders if o.symbol == symbol]
+        if ticket is not None:
+            orders = [o for o in orders if o.ticket == ticket]
+        return tuple(orders)
+
+    def order_check(self, request):
+        self.calls += 1
+        # The real terminal reports a valid request with retcode 0.
+        ok = request.get("volume", 0) > 0 and request.get("symbol") in self.specs
+        return SimpleNamespace(retcode=0 if ok else self.TRADE_RETCODE_INVALID,
+                               comment="Done" if ok else "Invalid request", request=request)
+
+    def order_send(self, request):
+        self.calls += 1
+        symbol = request.get("symbol")
+        action = request.get("action")
+        if action in (self.TRADE_ACTION_PENDING, self.TRADE_ACTION_MODIFY, self.TRADE_ACTION_REMOVE):
+            return self._pending_request(request)
+        if action != self.TRADE_ACTION_DEAL or symbol not in self.specs:
+            return SimpleNamespace(retcode=self.TRADE_RETCODE_INVALID, comment="Unsupported request",
+                                   order=0, deal=0, request=request)
+        if "position" in request:
+            position = self.positions.pop(request["position"], None)
+            if position is None:
+                return SimpleNamespace(retcode=self.TRADE_RETCODE_INVALID, comment="Position not found",
+                                       order=0, deal=0, request=request)
+            self.balance += position.profit
+            self._deal(position, self.DEAL_ENTRY_OUT, position.price_current, position.profit)
+        else:
+            ticket = self.next_ticket
+            self.positions[ticket] = SimpleNamespace(
+                ticket=ticket, symbol=symbol, type=request["type"], volume=request["volume"],
+                price_open=request["price"], price_current=request["price"], sl=request.get("sl", 0.0),
+                tp=request.get("tp", 0.0), magic=request.get("magic", 0), comment=request.get("comment", ""),
+                profit=0.0,
+            )
+            self._deal(self.positions[ticket], self.DEAL_ENTRY_IN, request["price"], 0.0)
+        ticket = self.next_ticket
+        self.next_ticket += 1
+        return SimpleNamespace(retcode=self.TRADE_RETCODE_DONE, comment="Request executed",
+                               order=ticket, deal=ticket, price=request.get("price", 0.0), request=request)
+
+    def _pending_request(self, request):
+        """Places, modifies or removes a pending order; limits/stops on the wrong side of price are rejected."""
+        def reply(retcode, comment, order=0):
+            return SimpleNamespace(retcode=retcode, comment=comment, order=order, deal=0, request=request)
+        action = request["action"]
+        order = None
+        if action != self.TRADE_ACTION_PENDING:
+            order = self.orders.get(request.get("order"))
+            if order is None:
+                return reply(self.TRADE_RETCODE_INVALID, "Order not found")
+            if action == self.TRADE_ACTION_REMOVE:
+                del self.orders[order.ticket]
+                return reply(self.TRADE_RETCODE_DONE, "Request executed", order.ticket)
+        symbol, kind = (order.symbol, order.type) if order is not None else (request.get("symbol"), request.get("type"))
+        if symbol not in self.specs or kind not in (self.ORDER_TYPE_BUY_LIMIT, self.ORDER_TYPE_SELL_LIMIT,
+                                                    self.ORDER_TYPE_BUY_STOP, self.ORDER_TYPE_SELL_STOP):
+            return reply(self.TRADE_RETCODE_INVALID, "Unsupported request")
+        tick = self.symbol_info_tick(symbol)
+        price = request["price"]
+        valid = {self.ORDER_TYPE_BUY_LIMIT: price < tick.ask, self.ORDER_TYPE_SELL_LIMIT: price > tick.bid,
+                 self.ORDER_TYPE_BUY_STOP: price > tick.ask, self.ORDER_TYPE_SELL_STOP: price < tick.bid}[kind]
+        if not valid:
+            return reply(self.TRADE_RETCODE_INVALID_PRICE, "Invalid price")
+        if order is not None:
+            order.price_open, order.sl, order.tp = price, request.get("sl", order.sl), request.get("tp", order.tp)
+            return reply(self.TRADE_RETCODE_DONE, "Request executed", order.ticket)
+        ticket = self.next_ticket
+        self.next_ticket += 1
+        self.orders[ticket] = SimpleNamespace(
+            ticket=ticket, symbol=symbol, type=kind, volume=request["volume"], price_open=price,
+            sl=request.get("sl", 0.0), tp=request.get("tp", 0.0), magic=request.get("magic", 0),
+            comment=request.get("comment", ""),
+        )
+        return reply(self.TRADE_RETCODE_DONE, "Request executed", ticket)
+
+    def _check_pending(self, symbol, bar):
+        """Opens a position at the order price for each pending order the bar traded through."""
+        for ticket, o in list(self.orders.items()):
+            if o.symbol != symbol:
+                continue
+            price = o.price_open
+            hit = {self.ORDER_TYPE_BUY_LIMIT: bar['low'] <= price, self.ORDER_TYPE_SELL_LIMIT: bar['high'] >= price,
+                   self.ORDER_TYPE_BUY_STOP: bar['high'] >= price, self.ORDER_TYPE_SELL_STOP: bar['low'] <= price}[o.type]
+            if hit:
+                del self.orders[ticket]
+                buy = o.type in (self.ORDER_TYPE_BUY_LIMIT, self.ORDER_TYPE_BUY_STOP)
+                self.positions[ticket] = SimpleNamespace(
+                    ticket=ticket, symbol=symbol, type=self.ORDER_TYPE_BUY if buy else self.ORDER_TYPE_SELL,
+                    volume=o.volume, price_open=price, price_current=price, sl=o.sl, tp=o.tp, magic=o.magic,
+                    comment=o.comment, profit=0.0,
+                )
+                self._deal(self.positions[ticket], self.DEAL_ENTRY_IN, price, 0.0)
+
+    def _check_stops(self, symbol, bar):
+        """Marks positions to the bar close and closes them when the bar trades through SL/TP."""
+        spec = self.specs[symbol]
+        for ticket, p in list(self.positions.items()):
+            if p.symbol != symbol:
+                continue
+            direction = 1 if p.type == self.ORDER_TYPE_BUY else -1
+            exit_price = None
+            if direction > 0:
+                if p.sl and bar['low'] <= p.sl: exit_price = p.sl
+                elif p.tp and bar['high'] >= p.tp: exit_price = p.tp
+            else:
+                if p.sl and bar['high'] >= p.sl: exit_price = p.sl
+                elif p.tp and bar['low'] <= p.tp: exit_price = p.tp
+            p.price_current = float(exit_price if exit_price is not None else bar['close'])
+            p.profit = direction * (p.price_current - p.price_open) / spec.point * spec.trade_tick_value * p.volume
+            if exit_price is not None:
+                self.balance += p.profit
+                del self.positions[ticket]
+                self._deal(p, self.DEAL_ENTRY_OUT, p.price_current, p.profit)
+
+    def _deal(self, position, entry, price, profit):
+        """Records a fill of `position`; a closing deal trades the opposite way."""
+        buy = (position.type == self.ORDER_TYPE_BUY) == (entry == self.DEAL_ENTRY_IN)
+        bar = self._forming_bar(position.symbol)
+        ticket = len(self.deals) + 1  # Deal tickets are numbered apart from orders/positions
+        self.deals.append(SimpleNamespace(
+            ticket=ticket, order=position.ticket if entry == self.DEAL_ENTRY_IN else 0,
+            time=int(bar['time']), time_msc=int(bar['time']) * 1000,
+            type=self.DEAL_TYPE_BUY if buy else self.DEAL_TYPE_SELL, entry=entry, magic=position.magic,
+            position_id=position.ticket, volume=position.volume, price=float(price), commission=0.0, swap=0.0,
+            fee=0.0, profit=float(profit), symbol=position.symbol, comment=position.comment,
+        ))
+
+    def history_deals_get(self, date_from=None, date_to=None, group=None, ticket=None, position=None):
+        self.calls += 1
+        deals = self.deals
+        if ticket is not None:
+            deals = [d for d in deals if d.ticket == ticket]
+        if position is not None:
+            deals = [d for d in deals if d.position_id == position]
+        if date_from is not None:
+            lo = int(date_from.timestamp()) if isinstance(date_from, datetime) else int(date_from)
+            deals = [d for d in deals if d.time >= lo]
+        if date_to is not None:
+            hi = int(date_to.timestamp()) if isinstance(date_to, datetime) else int(date_to)
+            deals = [d for d in deals if d.time <= hi]
+        return tuple(deals)
+
+
+def aggregate_rates(rates, seconds):
+    """Rolls bars up into `seconds`-long bars aligned to multiples of `seconds`."""
+    if len(rates) == 0:
+        return rates[:0].copy()
+    buckets = rates['time'] // seconds * seconds
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    out = np.zeros(len(starts), dtype=RATES_DTYPE)
+    out['time'] = buckets[starts]
+    out['open'] = rates['open'][starts]
+    out['high'] = np.maximum.reduceat(rates['high'], starts)
+    out['low'] = np.minimum.reduceat(rates['low'], starts)
+    out['close'] = rates['close'][np.append(starts[1:], len(rates)) - 1]
+    out['tick_volume'] = np.add.reduceat(rates['tick_volume'], starts)
+    out['real_volume'] = np.add.reduceat(rates['real_volume'], starts)
+    out['spread'] = rates['spread'][starts]
+    return out
+
+def bar_ticks(rates, seconds, point, per_bar=TICKS_PER_BAR):
+    """
+    `per_bar` evenly spaced ticks per bar, with the bid moving linearly open -> low -> high -> close
+    (open -> high -> low -> close for a down bar) and the bar's real volume split evenly.
+    """
+    n = len(rates)
+    ticks = np.zeros(n * per_bar, dtype=TICK_DTYPE)
+    if n == 0:
+        return ticks
+    up = rates['close'] >= rates['open']
+    path = np.stack([rates['open'], np.where(up, rates['low'], rates['high']),
+                     np.where(up, rates['high'], rates['low']), rates['close']], axis=1)
+    steps = np.linspace(0.0, 3.0, per_bar)
+    leg = np.minimum(steps.astype(int), 2)
+    frac = steps - leg
+    bid = (path[:, leg] * (1 - frac) + path[:, leg + 1] * frac).ravel()
+    ticks['time_msc'] = (rates['time'][:, None] * 1000 + np.arange(per_bar) * (seconds * 1000 // per_bar)).ravel()
+    ticks['time'] = ticks['time_msc'] // 1000
+    ticks['bid'] = ticks['last'] = bid
+    ticks['ask'] = bid + np.repeat(rates['spread'], per_bar) * point
+    ticks['volume_real'] = np.repeat(rates['real_volume'] / per_bar, per_bar)
+    ticks['volume'] = np.rint(ticks['volume_real']).astype(np.uint64)
+    ticks['flags'] = 6
+    return ticks
+
+def synthetic_rates(bars, timeframe_seconds=900, start_price=2000.0, volatility=0.0015, seed=0):
+    """Generates a random-walk rates array with the same dtype as copy_rates_*."""
+    rng = np.random.default_rng(seed)
+    closes = start_price * np.exp(np.cumsum(rng.normal(0.0, volatility, bars)))
+    opens = np.concatenate(([start_price], closes[:-1]))
+    wick = np.abs(rng.normal(0.0, volatility / 2, (2, bars))) * closes
+    rates = np.zeros(bars, dtype=RATES_DTYPE)
+    rates['time'] = np.arange(bars, dtype=np.int64) * timeframe_seconds
+    rates['open'] = opens
+    rates['close'] = closes
+    rates['high'] = np.maximum(opens, closes) + wick[0]
+    rates['low'] = np.minimum(opens, closes) - wick[1]
+    rates['tick_volume'] = rng.integers(50, 5000, bars)
+    rates['spread'] = 20
+    return rates
+
+
+def install(terminal):
+    """Registers the simulated terminal as the `MetaTrader5` module for subsequent imports."""
+    sys.modules['MetaTrader5'] = terminal
+    return terminal
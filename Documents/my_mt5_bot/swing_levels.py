@@ -0,0 +1,97 @@
+from collections import deque
+
+# --- Streaming swing high/low and Fibonacci levels ---
+# Rolling max of highs / min of lows over the last N bars, kept in monotonic
+# deques: each closed bar is pushed once and popped at most once, so an update
+# is amortized O(1) regardless of N. Several lookbacks can be tracked from the
+# same pass over new bars. The still-forming bar is folded in at query time.
+
+FIB_RETRACEMENTS = (0.0, 0.236, 0.382, 0.5, 0.618, 0.786, 1.0)
+FIB_EXTENSIONS = (1.272, 1.618, 2.618)
+
+class RollingExtremes:
+    """Max high / min low (with the bar sequence numbers they occurred at) over the last `window` closed bars."""
+    __slots__ = ("window", "highs", "lows", "count")
+
+    def __init__(self, window):
+        self.window = window
+        self.highs = deque()  # (seq, high), highs strictly decreasing
+        self.lows = deque()   # (seq, low), lows strictly increasing
+        self.count = 0        # closed bars seen; the next bar gets this sequence number
+
+    def update(self, high, low):
+        seq = self.count
+        self.count += 1
+        highs, lows = self.highs, self.lows
+        while highs and highs[-1][1] <= high:
+            highs.pop()
+        highs.append((seq, high))
+        while lows and lows[-1][1] >= low:
+            lows.pop()
+        lows.append((seq, low))
+        expired = seq - self.window
+        if highs[0][0] <= expired:
+            highs.popleft()
+        if lows[0][0] <= expired:
+            lows.popleft()
+
+    def swing(self, forming_high=None, forming_low=None):
+        """
+        (high, high_seq, low, low_seq) over the window plus, if given, a forming bar
+        (sequence number `count`). None if there are no bars yet.
+        """
+        if not self.highs:
+            if forming_high is None:
+                return None
+            return forming_high, self.count, forming_low, self.count
+        high_seq, high = self.highs[0]
+        low_seq, low = self.lows[0]
+        if forming_high is not None:
+            if forming_high >= high:
+                high_seq, high = self.count, forming_high
+            if forming_low <= low:
+                low_seq, low = self.count, forming_low
+        return high, high_seq, low, low_seq
+
+def fib_levels(swing_high, swing_low, swing_high_seq=None, swing_low_seq=None, extensions=True):
+    """
+    Retracements measured down from the swing high ('0.0%' = high, '100.0%' = low) and,
+    optionally, extensions projected in the direction of the latest leg.
+    """
+    levels = {}
+    if swing_high == swing_low:
+        return levels
+    price_range = swing_high - swing_low
+    for ratio in FIB_RETRACEMENTS:
+        levels[f'{ratio * 100:.1f}%'] = swing_high - ratio * price_range
+    levels['100.0%'] = swing_low  # Exact, rather than high - range
+    if extensions and swing_high_seq is not None and swing_low_seq is not None:
+        falling = swing_low_seq > swing_high_seq  # The low came last: project below it
+        for ratio in FIB_EXTENSIONS:
+            levels[f'{ratio * 100:.1f}%'] = swing_high - ratio * price_range if falling else swing_low + ratio * price_range
+    return levels
+
+class SwingTracker:
+    """RollingExtremes for several lookbacks (in bars, forming bar included), fed by one pass."""
+    __slots__ = ("windows",)
+
+    def __init__(self, lookbacks):
+        # A lookback of N bars is N - 1 closed bars plus the forming one
+        self.windows = {n: RollingExtremes(max(1, n - 1)) for n in lookbacks}
+
+    def update(self, high, low):
+        for window in self.windows.values():
+            window.update(high, low)
+
+    def levels(self, lookback, forming_high, forming_low):
+        """Swing high/low, how many bars ago each occurred, and the fib levels for `lookback`."""
+        window = self.windows[lookback]
+        swing = window.swing(forming_high, forming_low)
+        if swing is None:
+            return None
+        high, high_seq, low, low_seq = swing
+        return {
+            'swing_high': high, 'swing_high_bars_ago': window.count - high_seq,
+            'swing_low': low, 'swing_low_bars_ago': window.count - low_seq,
+            'fib_levels': fib_levels(high, low, high_seq, low_seq),
+        }
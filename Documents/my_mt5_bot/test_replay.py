@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+import level_index
+import sim_mt5
+
+# --- Replay checks for the SNR bot's streaming engine ---
+# Replays synthetic bars through the simulated terminal and checks that:
+#  - the per-symbol streaming state (advance_indicators) gives the same levels
+#    as recomputing everything from the bars (calculate_indicators without a
+#    state), bar after bar;
+#  - a checkpoint written by save_checkpoint and read back by
+#    restore_checkpoint resumes with the same state and keeps matching;
+#  - after a gap longer than the bar window the state is rebuilt, not
+#    continued across the missing bars;
+#  - the sorted LevelIndex finds the same nearest support/resistance and
+#    confluence as a plain scan over the levels, as entries rely on.
+#
+# Usage: python -m pytest test_replay.py   (or python -m unittest test_replay)
+
+TIMEFRAME = 15
+REPLAY_BARS = 150
+MTF_TOLERANCE = 1e-3  # The full recompute seeds higher timeframes from fewer bars
+TOLERANCE = 1e-6
+
+terminal = bot = None
+
+def setUpModule():
+    global terminal, bot
+    terminal = sim_mt5.install(sim_mt5.SimTerminal())
+    import my_snr_bot
+    import bot_metrics
+    bot = my_snr_bot
+    bot.mt5 = bot_metrics.instrument(terminal)
+    bot.ARCHIVE_DIR = None
+    bot.ORDER_PAUSE_SECONDS = 0
+
+def add_symbol(symbol, seed):
+    rates = sim_mt5.synthetic_rates(4000, seed=seed)
+    rates['real_volume'] = rates['tick_volume']
+    terminal.add_symbol(symbol, TIMEFRAME, rates, start=1000)
+
+def bars(symbol):
+    return bot.get_market_data(symbol, TIMEFRAME, bot.planned_bars(TIMEFRAME))
+
+class StreamingReplayTest(unittest.TestCase):
+
+    def assertLevelsEqual(self, streamed, full, tolerance):
+        """(price, source, name, ...) candidate lists match in tags and, within `tolerance`, in price."""
+        self.assertEqual([level[1:3] for level in streamed], [level[1:3] for level in full])
+        np.testing.assert_allclose([level[0] for level in streamed], [level[0] for level in full],
+                                   rtol=0, atol=tolerance)
+
+    def assertIndicatorsEqual(self, streamed, full):
+        for name in ('ema_short', 'ema_long', 'atr'):
+            self.assertAlmostEqual(getattr(streamed, name)[-1], getattr(full, name)[-1], delta=TOLERANCE, msg=name)
+        self.assertEqual(streamed.fib_levels, full.fib_levels)
+        self.assertEqual(streamed.pivot_points, full.pivot_points)
+        self.assertEqual(streamed.value_area, full.value_area)
+        self.assertLevelsEqual(streamed.session_levels, full.session_levels, TOLERANCE)
+        self.assertLevelsEqual(streamed.vwap_levels, full.vwap_levels, TOLERANCE)
+        self.assertLevelsEqual(streamed.mtf_levels, full.mtf_levels, MTF_TOLERANCE)
+
+    def replay(self, symbol, count):
+        """Advances `count` bars, checking the streaming state against a full recompute on each."""
+        for _ in range(count):
+            data = bars(symbol)
+            self.assertIndicatorsEqual(bot.calculate_indicators(data, bot.symbol_state(symbol)),
+                                       bot.calculate_indicators(data, symbol=symbol))
+            terminal.advance()
+
+    def test_streaming_matches_full_recompute(self):
+        add_symbol('STREAM', seed=1)
+        self.replay('STREAM', REPLAY_BARS)
+
+    def test_checkpoint_round_trip(self):
+        add_symbol('CKPT', seed=2)
+        self.replay('CKPT', REPLAY_BARS // 2)
+        data = bars('CKPT')
+        before = bot.calculate_indicators(data, bot.symbol_state('CKPT'))
+        saved = bot.symbol_state('CKPT')
+        saved_path = bot.CHECKPOINT_PATH
+        with tempfile.TemporaryDirectory() as root:
+            bot.CHECKPOINT_PATH = os.path.join(root, "state.pkl")
+            try:
+                bot.save_checkpoint()
+                bot.engine.clear()
+                self.assertTrue(bot.restore_checkpoint())
+            finally:
+                bot.CHECKPOINT_PATH = saved_path
+        restored = bot.engine['CKPT']
+        # Restored as saved, not warmed up again from the bars
+        self.assertIsNot(restored, saved)
+        self.assertEqual(restored.indicators_until, saved.indicators_until)
+        for name in ('ema_short', 'ema_long'):
+            self.assertEqual((getattr(restored, name).value, getattr(restored, name).count),
+                             (getattr(saved, name).value, getattr(saved, name).count))
+        np.testing.assert_array_equal(restored.bars.view().time, saved.bars.view().time)
+        self.assertIndicatorsEqual(bot.calculate_indicators(data, bot.symbol_state('CKPT')), before)
+        self.replay('CKPT', REPLAY_BARS // 2)
+
+    def test_gap_longer_than_window_rebuilds(self):
+        add_symbol('GAP', seed=3)
+        self.replay('GAP', 10)
+        for _ in range(1000):  # Down for longer than the bar window covers
+            terminal.advance()
+        self.replay('GAP', 10)
+
+class LevelIndexTest(unittest.TestCase):
+
+    def test_matches_linear_scan(self):
+        rng = np.random.default_rng(0)
+        tags = {('hvn', None), ('pivot', 'S1'), ('fib', '50.0%')}
+        choices = [('hvn', None), ('pivot', 'S1'), ('pivot', 'R1'), ('fib', '50.0%'), ('ema', 'EMA_Short')]
+        for _ in range(200):
+            levels = []
+            for price in np.round(rng.uniform(90, 110, rng.integers(0, 40)), 1):
+                source, name = choices[rng.integers(len(choices))]
+                role = level_index.SUPPORT if name == 'S1' else \
+                    level_index.RESISTANCE if name == 'R1' else level_index.EITHER
+                levels.append((float(price), source, name, role, 1.0))
+            index = level_index.LevelIndex(levels)
+            price, tolerance = float(rng.uniform(88, 112)), float(rng.uniform(0.05, 2))
+            supports = [p for p, _, _, role, _ in levels if p < price and role & level_index.SUPPORT]
+            resistances = [p for p, _, _, role, _ in levels if p > price and role & level_index.RESISTANCE]
+            self.assertEqual(index.nearest_below(price), max(supports, default=-np.inf))
+            self.assertEqual(index.nearest_above(price), min(resistances, default=np.inf))
+            self.assertEqual(index.near(price, tolerance, tags),
+                             any(abs(p - price) < tolerance and ((source, None) in tags or (source, name) in tags)
+                                 for p, source, name, _, _ in levels))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+from collections import deque
+from datetime import datetime, timezone
+import numpy as np
+from bar_archive import RATES_DTYPE, TIMEFRAME_SECONDS
+from tick_recorder import MAX_TICKS_PER_POLL, unseen
+
+# --- Local bars from ticks ---
+# BarAggregator turns a symbol's ticks into M1 bars and rolls each closed M1
+# bar up into the higher timeframes (M5 ... W1), the way the terminal builds
+# its own bars: bar times are server wall-clock seconds, so a bar starts at
+# time - time % period (days at server midnight, weeks on Sunday), and a bar
+# closes when the first tick of a later period arrives. Each close is
+# reported to a callback.
+#
+# TickFeed polls copy_ticks_from for several symbols, feeds their
+# aggregators and lets strategies subscribe to bar closes or take the bars
+# that closed since they last looked, so one tick stream replaces repeated
+# copy_rates_* calls per timeframe.
+#
+# Bars are lists in RATES_DTYPE order: [time, open, high, low, close,
+# tick_volume, spread, real_volume]; the spread is the smallest seen, in points.
+
+M1 = 1
+W1 = 32769
+WEEK_ORIGIN = 3 * 86400  # The epoch was a Thursday; MT5 weeks start on Sunday
+ALL_SEEN = 1 << 31  # `same_ms` meaning every tick at the cursor's millisecond is already in the bars
+MAX_PENDING = 1000  # Closed bars kept per symbol/timeframe until taken
+
+def bar_start(epoch, timeframe):
+    """Open time of the `timeframe` bar containing server time `epoch`."""
+    seconds = TIMEFRAME_SECONDS[timeframe]
+    if timeframe == W1:
+        return epoch - (epoch - WEEK_ORIGIN) % seconds
+    return epoch - epoch % seconds
+
+def _merge(bar, part):
+    """Extends `bar` in place with a later bar of the same period."""
+    bar[2] = max(bar[2], part[2])
+    bar[3] = min(bar[3], part[3])
+    bar[4] = part[4]
+    bar[5] += part[5]
+    bar[6] = min(bar[6], part[6])
+    bar[7] += part[7]
+
+def to_rates(bars):
+    """Bar lists as a copy_rates_*-style structured array."""
+    return np.array([tuple(bar) for bar in bars], dtype=RATES_DTYPE)
+
+class BarAggregator:
+    """M1 bars from one symbol's ticks, rolled up into `timeframes`; `on_close(symbol, timeframe, bar)` per closed bar."""
+    __slots__ = ("symbol", "point", "price", "timeframes", "minute", "forming", "on_close")
+
+    def __init__(self, symbol, point, timeframes, on_close, price='bid'):
+        self.symbol = symbol
+        self.point = point
+        self.price = price  # Tick field the bars are built from ('last' for exchange instruments)
+        self.timeframes = sorted({tf for tf in timeframes if tf != M1}, key=TIMEFRAME_SECONDS.get)
+        self.minute = None  # forming M1 bar
+        self.forming = dict.fromkeys(self.timeframes)  # timeframe -> closed M1 bars of its forming period, merged
+        self.on_close = on_close
+
+    def seed(self, bars):
+        """
+        Starts from the terminal's forming bars ({timeframe: rates row}), so the first local
+        bars are complete. Ticks added afterwards must be newer than those bars.
+        """
+        row = bars.get(M1)
+        self.minute = [int(row[0])] + [float(v) for v in tuple(row)[1:]] if row is not None else None
+        for tf in self.timeframes:
+            row = bars.get(tf)
+            if row is None:
+                continue
+            bar = [int(row[0])] + [float(v) for v in tuple(row)[1:]]
+            if self.minute is not None and bar_start(self.minute[0], tf) == bar[0]:
+                # The forming M1 is rolled in when it closes; don't count its volume twice
+                bar[5] -= self.minute[5]
+                bar[7] -= self.minute[7]
+            self.forming[tf] = bar
+
+    def add_ticks(self, ticks):
+        """Adds ticks (copy_ticks_* layout, oldest first), one minute group at a time."""
+        if len(ticks) == 0:
+            return
+        seconds = ticks['time_msc'] // 1000
+        minutes = seconds - seconds % 60
+        starts = np.flatnonzero(np.diff(minutes, prepend=minutes[0] - 1))
+        ends = np.append(starts[1:], len(ticks))
+        prices = ticks[self.price]
+        highs = np.maximum.reduceat(prices, starts)
+        lows = np.minimum.reduceat(prices, starts)
+        volumes = np.add.reduceat(ticks['volume_real'], starts)
+        spreads = np.minimum.reduceat(np.rint((ticks['ask'] - ticks['bid']) / self.point), starts)
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            self._add_minute([int(minutes[start]), float(prices[start]), float(highs[i]), float(lows[i]),
+                              float(prices[end - 1]), float(end - start), float(spreads[i]), float(volumes[i])])
+
+    def _add_minute(self, part):
+        minute = self.minute
+        if minute is not None and part[0] <= minute[0]:
+            if part[0] == minute[0]:
+                _merge(minute, part)
+            return  # Ticks older than the forming bar are ignored
+        if minute is not None:
+            self._close_minute()
+        for tf in self.timeframes:
+            bar = self.forming[tf]
+            if bar is not None and bar_start(part[0], tf) != bar[0]:
+                self.forming[tf] = None
+                self.on_close(self.symbol, tf, bar)
+        self.minute = part
+
+    def _close_minute(self):
+        minute, self.minute = self.minute, None
+        self.on_close(self.symbol, M1, minute)
+        for tf in self.timeframes:
+            bar = self.forming[tf]
+            if bar is None:
+                self.forming[tf] = [bar_start(minute[0], tf)] + minute[1:]
+            else:
+                _merge(bar, minute)
+
+    def forming_bar(self, timeframe):
+        """The still-forming bar of `timeframe` (including the forming M1), or None."""
+        minute = self.minute
+        if timeframe == M1:
+            return list(minute) if minute is not None else None
+        bar = self.forming[timeframe]
+        if bar is None:
+            return [bar_start(minute[0], timeframe)] + minute[1:] if minute is not None else None
+        bar = list(bar)
+        if minute is not None:
+            _merge(bar, minute)
+        return bar
+
+class TickFeed:
+    """One tick stream per symbol, aggregated locally into bars of `timeframes`."""
+
+    def __init__(self, mt5, timeframes):
+        self.mt5 = mt5
+        self.timeframes = tuple(timeframes)
+        self.aggregators = {}
+        self.cursors = {}    # symbol -> [time_msc, ticks at that ms already aggregated]
+        self.pending = {}    # (symbol, timeframe) -> closed bars not taken yet
+        self.listeners = {}  # (symbol, timeframe) -> callbacks
+        self.tick_listeners = {}  # symbol -> callbacks
+
+    def add_symbol(self, symbol, price='bid'):
+        """Seeds the symbol's bars from the terminal's forming bars; returns False if it is unavailable."""
+        info = self.mt5.symbol_info(symbol)
+        tick = self.mt5.symbol_info_tick(symbol)
+        if info is None or tick is None:
+            return False
+        aggregator = BarAggregator(symbol, info.point, self.timeframes, self._closed, price)
+        seed = {}
+        for tf in (M1,) + self.timeframes:
+            rates = self.mt5.copy_rates_from_pos(symbol, tf, 0, 1)
+            if rates is not None and len(rates):
+                seed[tf] = rates[-1]
+        aggregator.seed(seed)
+        self.aggregators[symbol] = aggregator
+        self.cursors[symbol] = [tick.time_msc, ALL_SEEN]
+        for tf in (M1,) + self.timeframes:
+            self.pending[(symbol, tf)] = deque(maxlen=MAX_PENDING)
+        return True
+
+    def subscribe(self, symbol, timeframe, callback):
+        """Calls `callback(symbol, timeframe, bar)` whenever a `timeframe` bar of `symbol` closes."""
+        self.listeners.setdefault((symbol, timeframe), []).append(callback)
+
+    def subscribe_ticks(self, symbol, callback):
+        """Calls `callback(symbol, ticks)` with each batch of new ticks of `symbol`, after they are aggregated."""
+        self.tick_listeners.setdefault(symbol, []).append(callback)
+
+    def _closed(self, symbol, timeframe, bar):
+        self.pending[(symbol, timeframe)].append(bar)
+        for callback in self.listeners.get((symbol, timeframe), ()):
+            callback(symbol, timeframe, bar)
+
+    def poll(self):
+        """Fetches new ticks for every symbol and aggregates them; returns the number of ticks."""
+        added = 0
+        for symbol, aggregator in self.aggregators.items():
+            cursor = self.cursors[symbol]
+            ticks = self.mt5.copy_ticks_from(symbol, datetime.fromtimestamp(cursor[0] / 1000, timezone.utc),
+                                             MAX_TICKS_PER_POLL, self.mt5.COPY_TICKS_ALL)
+            if ticks is None or len(ticks) == 0:
+                continue
+            ticks = unseen(ticks, cursor[0], cursor[1])
+            if len(ticks) == 0:
+                continue
+            aggregator.add_ticks(ticks)
+            for callback in self.tick_listeners.get(symbol, ()):
+                callback(symbol, ticks)
+            last = int(ticks['time_msc'][-1])
+            same = int(np.count_nonzero(ticks['time_msc'] == last))
+            cursor[:] = [last, same + (cursor[1] if last == cursor[0] else 0)]
+            added += len(ticks)
+        return added
+
+    def take(self, symbol, timeframe):
+        """Bars of `timeframe` closed since the last call plus the forming one, as rates (None if none)."""
+        pending = self.pending[(symbol, timeframe)]
+        bars = list(pending)
+        pending.clear()
+        forming = self.aggregators[symbol].forming_bar(timeframe)
+        if forming is not None:
+            bars.append(forming)
+        return to_rates(bars) if bars else None
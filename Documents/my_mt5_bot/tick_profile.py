@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+import numpy as np
+from volume_profile import tick_shares
+
+# --- Tick-resolution volume profile ---
+# Bins the prices ticks actually traded at, instead of spreading a bar's volume
+# evenly over its high-low range. Ticks are fetched with copy_ticks_range one
+# chunk of whole bars at a time, so memory stays bounded by the chunk however
+# many ticks the span holds; each chunk is reduced to per-bar bucket sums with
+# np.bincount and then dropped.
+#
+# Ticks are weighted by volume_real where the symbol reports it (exchange
+# instruments); CFD/FX ticks carry no volume and count one each, like MT5's
+# tick volume. The choice is made once per symbol (`has_volume`) and passed in,
+# so one profile never adds volume-weighted and count-weighted bars together.
+
+TICK_CHUNK_SECONDS = 6 * 3600  # Span of ticks fetched per copy_ticks_range call
+
+def _fetch(mt5, symbol, start, end):
+    """Ticks with start <= time < end (epoch seconds, server time); None if the terminal has none."""
+    ticks = mt5.copy_ticks_range(symbol, datetime.fromtimestamp(start, timezone.utc),
+                                 datetime.fromtimestamp(end, timezone.utc), mt5.COPY_TICKS_ALL)
+    if ticks is None or len(ticks) == 0:
+        return None
+    return ticks[ticks['time_msc'] < end * 1000]  # date_to is inclusive
+
+def _chunks(mt5, symbol, start, end, chunk_seconds):
+    for lo in range(start, end, chunk_seconds):
+        ticks = _fetch(mt5, symbol, lo, min(lo + chunk_seconds, end))
+        if ticks is not None and len(ticks):  # The inclusive end may have been the only tick
+            yield ticks
+
+def has_volume(mt5, symbol, start, end):
+    """
+    Whether the symbol's ticks carry volume_real, judged from the last chunk of [start, end);
+    None if the terminal has no ticks there to tell.
+    """
+    ticks = _fetch(mt5, symbol, max(start, end - TICK_CHUNK_SECONDS), end)
+    if ticks is None or len(ticks) == 0:
+        return None
+    return bool(ticks['volume_real'].any())
+
+def bar_tick_shares(mt5, symbol, start, end, bar_seconds, bucket_size, weighted, price='bid',
+                    chunk_seconds=TICK_CHUNK_SECONDS):
+    """
+    Yields (bar time, first bucket, shares) for each bar opening in [start, end) that has ticks,
+    weighting ticks by volume_real if `weighted` (see has_volume), else counting them.
+    Chunks are whole bars, so no bar is split between two fetches.
+    """
+    chunk_seconds = max(1, chunk_seconds // bar_seconds) * bar_seconds
+    for ticks in _chunks(mt5, symbol, start, end, chunk_seconds):
+        seconds = ticks['time_msc'] // 1000
+        bars = seconds - (seconds - start) % bar_seconds
+        bounds = np.flatnonzero(np.diff(bars, prepend=bars[0] - 1))
+        weights = ticks['volume_real'] if weighted else None
+        prices = ticks[price]
+        for lo, hi in zip(bounds, np.append(bounds[1:], len(ticks))):
+            first, shares = tick_shares(prices[lo:hi], weights[lo:hi] if weights is not None else None,
+                                        bucket_size)
+            yield int(bars[lo]), first, shares
@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from datetime import datetime, timezone
+
+# --- Append-only tick recorder ---
+# Captures every tick of the traded symbols into one file per symbol per day:
+#
+#   <root>/<SYMBOL>/<YYYY-MM-DD>.ticks   fixed-width records (np.memmap-able)
+#   <root>/<SYMBOL>/<YYYY-MM-DD>.json    base values, written once when the day starts
+#
+# Each record stores deltas from the previous tick: milliseconds since the last
+# tick and bid/ask/last moves as integer points (price / symbol_info.point), so
+# a record is 22 bytes against 60 for MT5's own tick struct and ~70 for CSV.
+# `read_ticks` decodes a day back into MT5's tick layout with one cumsum.
+#
+# Usage: python tick_recorder.py XAUUSDm BTCUSDm EURUSDm [--root ticks] [--interval 1]
+
+RECORD_DTYPE = np.dtype([
+    ('dt', '<u4'),        # ms since previous tick
+    ('bid', '<i4'),       # bid change in points
+    ('ask', '<i4'),
+    ('last', '<i4'),
+    ('volume', '<f4'),    # volume_real of this tick (not a delta)
+    ('flags', '<u2'),
+])
+
+# Layout returned by mt5.copy_ticks_*
+TICK_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8'),
+])
+
+MAX_TICKS_PER_POLL = 100000
+
+def _day_of(time_msc):
+    return datetime.fromtimestamp(int(time_msc) // 1000, timezone.utc).strftime("%Y-%m-%d")
+
+def _paths(root, symbol, day):
+    base = os.path.join(root, symbol, day)
+    return base + ".ticks", base + ".json"
+
+def encode(ticks, point, state):
+    """
+    Encodes ticks (MT5 layout) as delta records. `state` holds the previous tick as
+    integers {time_msc, bid, ask, last} and is advanced past the encoded ticks.
+    """
+    time_msc = ticks['time_msc'].astype(np.int64)
+    prices = {name: np.rint(ticks[name] / point).astype(np.int64) for name in ('bid', 'ask', 'last')}
+    records = np.empty(len(ticks), dtype=RECORD_DTYPE)
+    records['dt'] = np.diff(time_msc, prepend=state['time_msc'])
+    for name, values in prices.items():
+        records[name] = np.diff(values, prepend=state[name])
+    records['volume'] = ticks['volume_real']
+    records['flags'] = ticks['flags']
+    state.update(time_msc=int(time_msc[-1]), **{name: int(values[-1]) for name, values in prices.items()})
+    return records
+
+def decode(records, meta):
+    """Rebuilds MT5-layout ticks from delta records and the day's base values."""
+    ticks = np.empty(len(records), dtype=TICK_DTYPE)
+    ticks['time_msc'] = meta['time_msc'] + np.cumsum(records['dt'], dtype=np.int64)
+    ticks['time'] = ticks['time_msc'] // 1000
+    for name in ('bid', 'ask', 'last'):
+        ticks[name] = (meta[name] + np.cumsum(records[name], dtype=np.int64)) * meta['point']
+    ticks['volume_real'] = records['volume']
+    ticks['volume'] = records['volume']
+    ticks['flags'] = records['flags']
+    return ticks
+
+def unseen(ticks, since_msc, same_ms):
+    """
+    Ticks of a copy_ticks_from(since_msc) result not handled yet: everything after `since_msc`,
+    plus the ticks at `since_msc` beyond the first `same_ms` (already handled last time).
+    """
+    keep = ticks['time_msc'] > since_msc
+    same = np.flatnonzero(ticks['time_msc'] == since_msc)
+    keep[same[same_ms:]] = True
+    return ticks[keep]
+
+def open_records(root, symbol, day):
+    """Memory-maps one day's records (None if the day was not recorded)."""
+    data_path, meta_path = _paths(root, symbol, day)
+    if not os.path.exists(meta_path):
+        return None, None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    count = os.path.getsize(data_path) // RECORD_DTYPE.itemsize if os.path.exists(data_path) else 0
+    if count == 0:
+        return np.empty(0, dtype=RECORD_DTYPE), meta
+    return np.memmap(data_path, dtype=RECORD_DTYPE, mode="r", shape=(count,)), meta
+
+def read_ticks(root, symbol, day):
+    """Decoded ticks for `day` ("YYYY-MM-DD"), in the layout of mt5.copy_ticks_*."""
+    records, meta = open_records(root, symbol, day)
+    if records is None:
+        return np.empty(0, dtype=TICK_DTYPE)
+    return decode(records, meta)
+
+def recorded_days(root, symbol):
+    path = os.path.join(root, symbol)
+    if not os.path.isdir(path):
+        return []
+    return sorted(name[:-5] for name in os.listdir(path) if name.endswith(".json"))
+
+class TickRecorder:
+    """Polls the terminal for new ticks and appends them, delta-encoded, to the day files."""
+
+    def __init__(self, mt5, root, symbols):
+        self.mt5 = mt5
+        self.root = root
+        self.symbols = list(symbols)
+        self.points = {}
+        self.state = {}       # symbol -> {day, time_msc, bid, ask, last, same_ms}
+        self.starts = {}      # symbol -> time_msc the recording starts from, until its first tick is stored
+        self.recorded = 0
+
+    def _resume(self, symbol):
+        """Continues from the last recorded tick, recovered by decoding the newest day file."""
+        info = self.mt5.symbol_info(symbol)
+        if info is None:
+            return False
+        self.points[symbol] = info.point
+        days = recorded_days(self.root, symbol)
+        if days:
+            records, meta = open_records(self.root, symbol, days[-1])
+            ms = meta['time_msc'] + np.cumsum(records['dt'], dtype=np.int64)
+            state = {'day': days[-1], 'time_msc': int(ms[-1]) if len(ms) else meta['time_msc']}
+            for name in ('bid', 'ask', 'last'):
+                state[name] = int(meta[name]) + int(records[name].sum(dtype=np.int64))
+            # Ticks sharing the last millisecond, so the next poll skips the ones already stored
+            state['same_ms'] = int(np.count_nonzero(ms == state['time_msc']))
+            self.state[symbol] = state
+        return True
+
+    def _fetch(self, symbol):
+        """New ticks, or None if the terminal failed (the next poll retries from the same cursor)."""
+        state = self.state.get(symbol)
+        if state is None:
+            # Nothing recorded yet: start from the quote seen on the first poll
+            since_msc = self.starts.get(symbol)
+            if since_msc is None:
+                tick = self.mt5.symbol_info_tick(symbol)
+                if tick is None:
+                    return None
+                since_msc = self.starts[symbol] = tick.time_msc
+        else:
+            since_msc = state['time_msc']
+        ticks = self.mt5.copy_ticks_from(symbol, datetime.fromtimestamp(since_msc / 1000, timezone.utc),
+                                         MAX_TICKS_PER_POLL, self.mt5.COPY_TICKS_ALL)
+        if ticks is None:
+            return None  # Never substitute a quote snapshot: it is not a tick of the history
+        if state is not None and len(ticks):
+            ticks = unseen(ticks, since_msc, state['same_ms'])
+        return ticks
+
+    def poll(self):
+        """Fetches and appends new ticks for every symbol; returns the number recorded."""
+        added = 0
+        for symbol in self.symbols:
+            if symbol not in self.points and not self._resume(symbol):
+                continue
+            ticks = self._fetch(symbol)
+            if ticks is None or len(ticks) == 0:
+                continue
+            days = np.array([_day_of(t) for t in ticks['time_msc'][[0, -1]]])
+            if days[0] == days[1]:
+                chunks = [(days[0], ticks)]
+            else:
+                keys = np.array([_day_of(t) for t in ticks['time_msc']])
+                chunks = [(day, ticks[keys == day]) for day in sorted(set(keys))]
+            for day, chunk in chunks:
+                self._append(symbol, day, chunk)
+            added += len(ticks)
+        self.recorded += added
+        return added
+
+    def _append(self, symbol, day, ticks):
+        point = self.points[symbol]
+        state = self.state.get(symbol)
+        data_path, meta_path = _paths(self.root, symbol, day)
+        if state is None or state['day'] != day:
+            # New day file: the first tick is the base, stored as a zero delta
+            first = ticks[0]
+            state = {'day': day, 'time_msc': int(first['time_msc']), 'same_ms': 0,
+                     **{name: int(round(first[name] / point)) for name in ('bid', 'ask', 'last')}}
+            os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+            with open(meta_path, "w") as f:
+                json.dump({'point': point, **{k: state[k] for k in ('time_msc', 'bid', 'ask', 'last')}}, f)
+            self.state[symbol] = state
+        prev_ms, prev_same = state['time_msc'], state['same_ms']
+        records = encode(ticks, point, state)
+        with open(data_path, "ab") as f:
+            f.write(records.tobytes())
+        same = int(np.count_nonzero(ticks['time_msc'] == state['time_msc']))
+        state['same_ms'] = same + (prev_same if state['time_msc'] == prev_ms else 0)
+
+    def run(self, interval=1.0):
+        while True:
+            self.poll()
+            time.sleep(interval)
+
+def main():
+    import MetaTrader5 as mt5
+    parser = argparse.ArgumentParser(description="Record ticks for the traded symbols.")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--root", default="ticks")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls")
+    parser.add_argument("--path", help="Path to terminal64.exe (default: attach to the running terminal)")
+    args = parser.parse_args()
+
+    if not (mt5.initialize(path=args.path) if args.path else mt5.initialize()):
+        print(f"MT5 initialization failed, error code: {mt5.last_error()}")
+        return
+    recorder = TickRecorder(mt5, args.root, args.symbols)
+    try:
+        print(f"Recording ticks for {', '.join(args.symbols)} into {args.root}/")
+        recorder.run(args.interval)
+    except KeyboardInterrupt:
+        print(f"Recorder stopped. Ticks recorded this session: {recorder.recorded}")
+    finally:
+        mt5.shutdown()
+
+if __name__ == "__main__":
+    main()
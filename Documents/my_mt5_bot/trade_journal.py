@@ -0,0 +1,142 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+# --- SQLite trade journal ---
+# Signals, orders, fills and closes are queued by the trading thread with
+# `journal.record(...)` (a non-blocking put) and written by a background thread
+# that drains the queue in batches, one transaction per batch, into a WAL-mode
+# database. Signal context (EMAs, nearest level, ATR, reason...) is stored as JSON
+# and serialized by the writer, not the trading thread. A batch whose write
+# fails (e.g. the file is locked by another bot) is kept and retried, up to
+# `max_attempts` writes, before its rows are dropped and counted in `errors`.
+#
+# Query example:
+#   sqlite3 trade_journal.db "SELECT * FROM events WHERE symbol='XAUUSDm' ORDER BY time DESC LIMIT 20"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    magic INTEGER NOT NULL DEFAULT 0,
+    kind TEXT NOT NULL,          -- signal | order | order_failed | close
+    side TEXT,
+    ticket INTEGER,
+    volume REAL,
+    price REAL,
+    sl REAL,
+    tp REAL,
+    retcode INTEGER,
+    context TEXT                 -- JSON
+);
+CREATE INDEX IF NOT EXISTS idx_events_symbol_time ON events (symbol, time);
+CREATE INDEX IF NOT EXISTS idx_events_magic_time ON events (magic, time);
+CREATE INDEX IF NOT EXISTS idx_events_time ON events (time);
+"""
+
+INSERT = ("INSERT INTO events (time, symbol, magic, kind, side, ticket, volume, price, sl, tp, retcode, context) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+_STOP = object()
+
+class TradeJournal:
+    """Batching background writer for the `events` table."""
+
+    def __init__(self, path, batch_size=1000, flush_interval=0.25, max_attempts=5, log=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.log = log or logging.getLogger(__name__)
+        self.queue = queue.SimpleQueue()
+        self.written = 0
+        self.errors = 0  # Rows dropped after max_attempts failed writes
+        db = sqlite3.connect(path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(SCHEMA)
+        db.close()
+        self.thread = threading.Thread(target=self._writer, name="trade-journal", daemon=True)
+        self.thread.start()
+
+    def record(self, kind, symbol, magic=0, side=None, ticket=None, volume=None, price=None, sl=None, tp=None,
+               retcode=None, context=None, timestamp=None):
+        """Queues one event; never blocks on disk."""
+        self.queue.put((timestamp if timestamp is not None else time.time(), symbol, magic, kind, side, ticket,
+                        volume, price, sl, tp, retcode, context))
+
+    def close(self):
+        """Flushes everything queued so far and stops the writer."""
+        self.queue.put(_STOP)
+        self.thread.join()
+
+    def _writer(self):
+        db = sqlite3.connect(self.path, timeout=30)  # Other bots may share the file
+        db.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; fsync on checkpoint, not every commit
+        batch = []  # Rows not written yet, kept across a failed write
+        attempts = 0
+        running = True
+        while running or batch:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            while item is not None:
+                if item is _STOP:
+                    running = False
+                    break
+                batch.append(_row(item))
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if not batch:
+                continue
+            try:
+                with db:
+                    db.executemany(INSERT, batch)
+                self.written += len(batch)
+                batch, attempts = [], 0
+            except sqlite3.Error:
+                attempts += 1
+                if attempts < self.max_attempts:
+                    self.log.warning("Journal write of %d rows failed (attempt %d of %d); retrying.",
+                                     len(batch), attempts, self.max_attempts, exc_info=True)
+                    time.sleep(self.flush_interval * attempts)
+                else:
+                    self.log.exception("Journal write failed %d times; dropping %d rows.", attempts, len(batch))
+                    self.errors += len(batch)
+                    batch, attempts = [], 0
+        db.close()
+
+def _row(item):
+    *columns, context = item
+    return (*columns, json.dumps(context, default=float) if context is not None else None)
+
+def query(path, symbol=None, magic=None, kind=None, since=None, limit=100):
+    """Reads journal events (newest first) as dicts, with context decoded."""
+    clauses, params = [], []
+    for column, value in (("symbol", symbol), ("magic", magic), ("kind", kind)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        clauses.append("time >= ?")
+        params.append(since)
+    sql = "SELECT * FROM events" + (" WHERE " + " AND ".join(clauses) if clauses else "")
+    sql += " ORDER BY time DESC LIMIT ?"
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    try:
+        rows = [dict(row) for row in db.execute(sql, (*params, limit))]
+    finally:
+        db.close()
+    for row in rows:
+        if row["context"]:
+            row["context"] = json.loads(row["context"])
+    return rows
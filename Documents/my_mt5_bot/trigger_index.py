@@ -0,0 +1,78 @@
+from collections import namedtuple
+import numpy as np
+
+# --- Price-alert trigger index ---
+# Between full passes the bot only needs to know when price reaches one of the
+# levels it is watching. Each symbol's active zones, widened by the entry
+# tolerance, are merged into disjoint price bands kept as two sorted arrays
+# (lows, highs). A price is located with one binary search, and a tick only
+# produces an event when the band it is in differs from the previous tick's:
+# entering a band, leaving it, or jumping straight from one band to another.
+# A batch of ticks is located with one searchsorted over all of them.
+
+# kind: 'enter' or 'exit'; low/high: the band; time_msc: of the tick (None for a single price)
+Trigger = namedtuple("Trigger", "symbol kind low high price time_msc")
+
+OUTSIDE = -1  # Band index of a price in no band
+
+class TriggerIndex:
+    """Sorted, disjoint alert bands per symbol and the band each symbol's price was last seen in."""
+    __slots__ = ("lows", "highs", "inside", "last_price")
+
+    def __init__(self):
+        self.lows = {}        # symbol -> band lows, ascending
+        self.highs = {}       # symbol -> band highs
+        self.inside = {}      # symbol -> band index of the last price, or OUTSIDE
+        self.last_price = {}
+
+    def set_bands(self, symbol, bands, price=None):
+        """
+        Replaces a symbol's bands ((low, high) pairs; overlapping ones are merged). `price` is
+        the price they were computed at, if newer than the last one checked.
+        """
+        lows, highs = [], []
+        for low, high in sorted(band for band in bands if band[0] <= band[1]):
+            if highs and low <= highs[-1]:
+                highs[-1] = max(highs[-1], high)
+            else:
+                lows.append(low)
+                highs.append(high)
+        self.lows[symbol], self.highs[symbol] = np.array(lows, dtype=float), np.array(highs, dtype=float)
+        if price is not None:
+            self.last_price[symbol] = float(price)
+        price = self.last_price.get(symbol)
+        # The caller has just evaluated at this price, so being inside a new band is not an event
+        self.inside[symbol] = self._locate(symbol, np.array([price]))[0] if price is not None else OUTSIDE
+
+    def _locate(self, symbol, prices):
+        lows, highs = self.lows.get(symbol), self.highs.get(symbol)
+        if lows is None or len(lows) == 0:
+            return np.full(len(prices), OUTSIDE)
+        i = np.searchsorted(lows, prices, 'right') - 1
+        inside = (i >= 0) & (prices <= highs[np.maximum(i, 0)])
+        return np.where(inside, i, OUTSIDE)
+
+    def check(self, symbol, price, time_msc=None):
+        """Events for one price."""
+        return self.check_ticks(symbol, np.array([price], dtype=float),
+                                None if time_msc is None else np.array([time_msc]))
+
+    def check_ticks(self, symbol, prices, times_msc=None):
+        """Events for a batch of prices (oldest first), from band changes between consecutive ticks."""
+        if len(prices) == 0:
+            return []
+        bands = self._locate(symbol, prices)
+        previous = np.concatenate(([self.inside.get(symbol, OUTSIDE)], bands[:-1]))
+        events = []
+        lows, highs = self.lows.get(symbol), self.highs.get(symbol)
+        for k in np.flatnonzero(bands != previous):
+            time_msc = int(times_msc[k]) if times_msc is not None else None
+            if previous[k] != OUTSIDE:
+                band = previous[k]
+                events.append(Trigger(symbol, 'exit', float(lows[band]), float(highs[band]), float(prices[k]), time_msc))
+            if bands[k] != OUTSIDE:
+                band = bands[k]
+                events.append(Trigger(symbol, 'enter', float(lows[band]), float(highs[band]), float(prices[k]), time_msc))
+        self.inside[symbol] = int(bands[-1])
+        self.last_price[symbol] = float(prices[-1])
+        return events
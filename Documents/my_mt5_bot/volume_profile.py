@@ -0,0 +1,210 @@
+import math
+from bisect import bisect_left, insort
+from collections import deque
+import numpy as np
+
+# --- Sliding-window volume profile ---
+# Each bar's volume is spread over fixed price buckets (multiples of the bucket
+# size) in proportion to how much of the bar's range each bucket covers. When a
+# bar closes its share is added; when it leaves the window the same shares are
+# subtracted, so an update costs time proportional to the bar's range in
+# buckets, not to the window. The bucket array grows when price leaves the
+# covered range. Bucket volumes are also kept in a sorted list, so the HVN/LVN
+# thresholds (volume ranks) are read without sorting the profile.
+#
+# Profiles are read out as parallel NumPy arrays (bucket mid-prices, volumes)
+# of the buckets some bar touched. build_profile computes the same profile in
+# one vectorized pass for a plain window of bars; there the thresholds come from
+# np.partition (linear-time selection) rather than a sort.
+#
+# Instead of a bar's range, the window can also take a bar's actual ticks:
+# tick_shares bins tick prices with integer bucket indices and np.bincount, and
+# the resulting run of buckets is added exactly like a bar's shares (see
+# tick_profile.py for fetching them).
+#
+# HVNs are not all equal: weighted_hvns pairs each node with its volume relative
+# to the average node, which scales the node's weight as an S/R level.
+
+HVN_RANK = 0.1  # Buckets at or above the volume of the top 10% rank are high volume nodes
+LVN_RANK = 0.9  # ...and at or below the 90% rank, low volume nodes
+VALUE_AREA_FRACTION = 0.7  # Share of the volume inside the value area
+GROWTH_HEADROOM = 0.25  # Spare buckets on each side when the array grows, as a fraction of the span
+
+def bar_shares(low, high, volume, bucket_size):
+    """(first bucket index, per-bucket volume) for one bar; a zero-range bar goes to the bucket holding its price."""
+    first = int(math.floor(low / bucket_size))
+    if high <= low:
+        return first, np.array([float(volume)])
+    last = max(first, int(math.ceil(high / bucket_size)) - 1)
+    edges = np.arange(first, last + 2) * bucket_size
+    overlap = np.minimum(edges[1:], high) - np.maximum(edges[:-1], low)
+    return first, volume * (overlap / (high - low))
+
+def tick_shares(prices, volumes, bucket_size):
+    """(first bucket index, per-bucket volume) for a run of ticks; `volumes` None counts each tick as one."""
+    buckets = np.floor(np.asarray(prices, dtype=float) / bucket_size).astype(np.int64)
+    first = int(buckets.min())
+    return first, np.bincount(buckets - first, weights=volumes).astype(float)
+
+def build_profile(lows, highs, volumes, bucket_size):
+    """(prices, volumes) of the touched buckets for a window of bars, in one vectorized pass."""
+    lows, highs, volumes = (np.asarray(a, dtype=float) for a in (lows, highs, volumes))
+    if len(lows) == 0:
+        return np.zeros(0), np.zeros(0)
+    first = np.floor(lows / bucket_size).astype(np.int64)
+    last = np.maximum(first, np.ceil(highs / bucket_size).astype(np.int64) - 1)
+    counts = last - first + 1
+    bar = np.repeat(np.arange(len(lows)), counts)
+    offsets = np.arange(len(bar)) - np.repeat(np.cumsum(counts) - counts, counts)
+    buckets = first[bar] + offsets
+    bar_range = (highs - lows)[bar]
+    overlap = np.minimum((buckets + 1) * bucket_size, highs[bar]) - np.maximum(buckets * bucket_size, lows[bar])
+    shares = volumes[bar] * np.divide(overlap, bar_range, out=np.ones_like(overlap), where=bar_range > 0)
+    base = buckets.min()
+    totals = np.bincount(buckets - base, weights=shares)
+    touched = np.bincount(buckets - base) > 0
+    return (np.flatnonzero(touched) + base + 0.5) * bucket_size, totals[touched]
+
+def node_thresholds(volumes):
+    """(hvn_threshold, lvn_threshold) by partial selection, or None for an empty profile."""
+    n = len(volumes)
+    if n == 0:
+        return None
+    # Ranks counted from the highest volume, as ascending positions
+    hvn_at, lvn_at = n - 1 - int(n * HVN_RANK), n - 1 - int(n * LVN_RANK)
+    selected = np.partition(volumes, (lvn_at, hvn_at))
+    return selected[hvn_at], selected[lvn_at]
+
+def split_nodes(prices, volumes, thresholds):
+    """(hvns, lvns) price lists for the given thresholds."""
+    if thresholds is None:
+        return [], []
+    hvn_threshold, lvn_threshold = thresholds
+    return prices[volumes >= hvn_threshold].tolist(), prices[volumes <= lvn_threshold].tolist()
+
+def weighted_hvns(prices, volumes, thresholds):
+    """
+    (price, weight) per HVN: the node's share of the profile volume over the average
+    HVN's share, so a typical node weighs 1 and a thin one less than a heavy one.
+    """
+    if thresholds is None:
+        return []
+    heavy = volumes >= thresholds[0]
+    node_volumes = volumes[heavy]
+    mean = float(node_volumes.mean()) if len(node_volumes) else 0.0
+    if mean <= 0:
+        return [(price, 1.0) for price in prices[heavy].tolist()]
+    return list(zip(prices[heavy].tolist(), (node_volumes / mean).tolist()))
+
+def value_area(prices, volumes, fraction=VALUE_AREA_FRACTION):
+    """
+    {'POC', 'VAH', 'VAL'}: the busiest bucket, widened one neighbouring bucket at a time
+    (the busier side first) until it holds `fraction` of the volume. None without volume.
+    """
+    total = float(volumes.sum()) if len(volumes) else 0.0
+    if total <= 0:
+        return None
+    poc = int(np.argmax(volumes))
+    lo = hi = poc
+    inside, target = float(volumes[poc]), total * fraction
+    while inside < target and (lo > 0 or hi < len(volumes) - 1):
+        below = volumes[lo - 1] if lo > 0 else -1.0
+        above = volumes[hi + 1] if hi < len(volumes) - 1 else -1.0
+        if above >= below:
+            hi += 1
+            inside += above
+        else:
+            lo -= 1
+            inside += below
+    return {'POC': float(prices[poc]), 'VAH': float(prices[hi]), 'VAL': float(prices[lo])}
+
+class VolumeProfileWindow:
+    """Volume profile of the last `window` closed bars on a fixed `bucket_size` price grid."""
+    __slots__ = ("bucket_size", "window", "origin", "volumes", "touches", "bars", "ranked")
+
+    def __init__(self, window, bucket_size):
+        self.bucket_size = bucket_size
+        self.window = window
+        self.origin = 0                           # bucket index of volumes[0]
+        self.volumes = np.zeros(0)                # volume per bucket
+        self.touches = np.zeros(0, dtype=np.int64)  # bars in the window overlapping each bucket
+        self.bars = deque()                       # (first bucket, shares) of each bar in the window
+        self.ranked = []                          # volumes of the touched buckets, ascending
+
+    def _reserve(self, first, last):
+        """Makes buckets first..last addressable, re-centring the array on the touched span."""
+        end = self.origin + len(self.volumes)
+        if first >= self.origin and last < end:
+            return
+        touched = np.flatnonzero(self.touches)
+        lo, hi = first, last
+        if len(touched):
+            lo, hi = min(lo, self.origin + touched[0]), max(hi, self.origin + touched[-1])
+        pad = int((hi - lo + 1) * GROWTH_HEADROOM) + 1
+        origin, size = lo - pad, hi - lo + 1 + 2 * pad
+        volumes, touches = np.zeros(size), np.zeros(size, dtype=np.int64)
+        if len(touched):
+            keep = slice(touched[0], touched[-1] + 1)
+            at = self.origin + touched[0] - origin
+            volumes[at:at + touched[-1] - touched[0] + 1] = self.volumes[keep]
+            touches[at:at + touched[-1] - touched[0] + 1] = self.touches[keep]
+        self.origin, self.volumes, self.touches = origin, volumes, touches
+
+    def _set(self, start, volumes, touches):
+        """Overwrites a run of buckets (array offsets), keeping the ranked volumes in step."""
+        ranked = self.ranked
+        for i in range(len(volumes)):
+            k = start + i
+            if self.touches[k]:
+                del ranked[bisect_left(ranked, self.volumes[k])]
+            value = float(volumes[i]) if touches[i] else 0.0  # Drop rounding residue once a bucket empties
+            self.volumes[k], self.touches[k] = value, touches[i]
+            if touches[i]:
+                insort(ranked, value)
+
+    def _apply(self, first, shares, sign):
+        """Adds (sign=1) or removes (sign=-1) one bar's shares; returns what it overwrote."""
+        self._reserve(first, first + len(shares) - 1)
+        start = first - self.origin
+        run = slice(start, start + len(shares))
+        saved = (start, self.volumes[run].copy(), self.touches[run].copy())
+        self._set(start, self.volumes[run] + sign * shares, self.touches[run] + sign)
+        return saved
+
+    def update(self, low, high, volume):
+        """Adds a closed bar, expiring the oldest one once the window is full."""
+        self.add(*bar_shares(low, high, volume, self.bucket_size))
+
+    def add(self, first, shares):
+        """Adds a closed bar already binned as (first bucket, shares), e.g. from its ticks."""
+        self._apply(first, shares, 1)
+        self.bars.append((first, shares))
+        if len(self.bars) > self.window:
+            self._apply(*self.bars.popleft(), -1)
+
+    def thresholds(self):
+        """(hvn_threshold, lvn_threshold) volumes, or None for an empty profile."""
+        ranked = self.ranked
+        n = len(ranked)
+        if n == 0:
+            return None
+        # Ranks counted from the highest volume
+        return ranked[n - 1 - int(n * HVN_RANK)], ranked[n - 1 - int(n * LVN_RANK)]
+
+    def profile(self, forming=None, forming_shares=None):
+        """
+        (prices, volumes, thresholds) of the touched buckets, optionally with a forming bar
+        included, as (low, high, volume) or binned (first, shares); the forming bar is not kept.
+        """
+        if forming is not None:
+            forming_shares = bar_shares(*forming, self.bucket_size)
+        saved = None
+        if forming_shares is not None:
+            saved = self._apply(*forming_shares, 1)
+        try:
+            touched = np.flatnonzero(self.touches)
+            prices = (touched + self.origin + 0.5) * self.bucket_size
+            return prices, self.volumes[touched], self.thresholds()
+        finally:
+            if saved is not None:
+                self._set(*saved)
@@ -0,0 +1,93 @@
+import math
+from collections import deque
+from session_profiles import session_key
+
+# --- Session and anchored VWAP ---
+# VWAP and its volume-weighted standard deviation come from three running sums
+# (volume, price * volume, price^2 * volume), so adding a bar is O(1). A
+# session VWAP resets its sums when a new session starts (a server day, i.e.
+# anchored at the daily open, or a London/New York window). Anchored VWAPs keep
+# the cumulative sums after each of the last `window` bars instead: the VWAP
+# from any anchor in that window is the difference of two entries, so an anchor
+# that moves (a new swing high) costs nothing extra.
+#
+# Prices are a bar's typical price (high + low + close) / 3.
+
+def typical_price(high, low, close):
+    return (high + low + close) / 3.0
+
+def _stats(volume, pv, p2v):
+    """(vwap, standard deviation) from the running sums; NaN without volume."""
+    if volume <= 0:
+        return math.nan, math.nan
+    mean = pv / volume
+    return mean, math.sqrt(max(0.0, p2v / volume - mean * mean))
+
+def bands(vwap, stdev, stdevs):
+    """{'VWAP', '+1SD', '-1SD', ...} for the band multipliers in `stdevs`."""
+    levels = {'VWAP': vwap}
+    for k in stdevs:
+        levels[f'+{k:g}SD'] = vwap + k * stdev
+        levels[f'-{k:g}SD'] = vwap - k * stdev
+    return levels
+
+class SessionVWAP:
+    """VWAP of the current `kind` session (see session_profiles.session_key); kept after a window closes."""
+    __slots__ = ("kind", "key", "volume", "pv", "p2v")
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.key = None
+        self.volume = self.pv = self.p2v = 0.0
+
+    def update(self, time, price, volume):
+        """Commits a closed bar opening at `time`."""
+        key = session_key(time, self.kind)
+        if key is None:
+            return
+        if key != self.key:
+            self.key = key
+            self.volume = self.pv = self.p2v = 0.0
+        self.volume += volume
+        self.pv += price * volume
+        self.p2v += price * price * volume
+
+    def peek(self, time, price, volume):
+        """(vwap, stdev) including a forming bar, without changing the state."""
+        key = session_key(time, self.kind)
+        if key is None:
+            return self.current
+        if key != self.key:
+            return _stats(volume, price * volume, price * price * volume)
+        return _stats(self.volume + volume, self.pv + price * volume, self.p2v + price * price * volume)
+
+    @property
+    def current(self):
+        return _stats(self.volume, self.pv, self.p2v)
+
+class AnchoredVWAP:
+    """VWAP from any of the last `window` closed bars (or the forming one) up to now."""
+    __slots__ = ("cums",)
+
+    def __init__(self, window):
+        # Running sums after each closed bar, newest last; the extra entry is the one before the oldest anchor
+        self.cums = deque([(0.0, 0.0, 0.0)], maxlen=window + 1)
+
+    def update(self, price, volume):
+        """Commits a closed bar."""
+        volume_sum, pv, p2v = self.cums[-1]
+        self.cums.append((volume_sum + volume, pv + price * volume, p2v + price * price * volume))
+
+    def since(self, bars_ago, forming=None):
+        """
+        (vwap, stdev) from the bar `bars_ago` bars back (0 = the forming bar, 1 = the last closed)
+        to now, including a forming bar (price, volume) if given; NaN if the anchor is out of range.
+        """
+        if bars_ago >= len(self.cums):
+            return math.nan, math.nan
+        last, before = self.cums[-1], self.cums[-1 - bars_ago]
+        volume, pv, p2v = (last[0] - before[0], last[1] - before[1], last[2] - before[2])
+        if forming is not None:
+            price, forming_volume = forming
+            volume, pv, p2v = volume + forming_volume, pv + price * forming_volume, p2v + price * price * forming_volume
+        return _stats(volume, pv, p2v)